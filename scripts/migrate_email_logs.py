@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Email Logs Migration Script
+Converts legacy one-document-per-recipient email_logs into email_log_buckets.
+
+Legacy logs are processed in _id order and deleted once their buckets are written,
+so the script can be stopped and re-run at any point.
+
+Usage: python scripts/migrate_email_logs.py [--batch-size 5000] [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server'))
+
+from app.core.config import settings
+from app.db.mongodb import MongoDB
+from app.services.email_log_store import bucket_floor, make_bucket_entry
+
+async def collection_size(db, name):
+    """Data and index size of a collection in bytes."""
+    try:
+        stats = await db.command("collStats", name)
+        return stats.get("size", 0), stats.get("totalIndexSize", 0), stats.get("count", 0)
+    except Exception:
+        return 0, 0, 0
+
+def build_buckets(logs):
+    """Group legacy logs into bucket documents of at most EMAIL_LOG_BUCKET_SIZE entries."""
+    groups = defaultdict(list)
+    for log in logs:
+        sent_at = log.get("sent_at")
+        if sent_at is None:
+            sent_at = log["_id"].generation_time.replace(tzinfo=None)
+        key = (
+            str(log.get("user_id")),
+            log.get("campaign_id"),
+            log.get("sender_email"),
+            log.get("subject") or "No Subject",
+            bucket_floor(sent_at)
+        )
+        entry = make_bucket_entry(
+            log.get("to_email"),
+            log.get("status", "sent"),
+            sent_at,
+            log.get("message_id"),
+            log.get("error_code"),
+            log.get("error_message")
+        )
+        if log.get("delivery_status"):
+            entry["d"] = log["delivery_status"]
+        groups[key].append(entry)
+
+    buckets = []
+    for (user_id, campaign_id, sender_email, subject, bucket_start), entries in groups.items():
+        for offset in range(0, len(entries), settings.EMAIL_LOG_BUCKET_SIZE):
+            chunk = entries[offset:offset + settings.EMAIL_LOG_BUCKET_SIZE]
+            buckets.append({
+                "user_id": user_id,
+                "campaign_id": campaign_id,
+                "sender_email": sender_email,
+                "subject": subject,
+                "bucket_start": bucket_start,
+                "count": len(chunk),
+                "sent": sum(1 for entry in chunk if entry["s"] == "sent"),
+                "failed": sum(1 for entry in chunk if entry["s"] == "failed"),
+                "entries": chunk
+            })
+    return buckets
+
+async def migrate_email_logs(batch_size, dry_run):
+    """Move legacy email_logs into buckets batch by batch."""
+    await MongoDB.connect_to_mongo()
+    db = MongoDB.get_database()
+
+    print("🔄 Migrating email_logs to email_log_buckets")
+    print("=" * 50)
+
+    legacy_before = await collection_size(db, "email_logs")
+    buckets_before = await collection_size(db, "email_log_buckets")
+    print(f"📊 email_logs: {legacy_before[2]} docs, {legacy_before[0] / 1e6:.1f} MB data, {legacy_before[1] / 1e6:.1f} MB indexes")
+
+    migrated = 0
+    written = 0
+    while True:
+        logs = await db.email_logs.find().sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not logs:
+            break
+
+        # A batch whose buckets were written before an interruption is only deleted
+        batch_marker = logs[0]["_id"]
+        buckets = build_buckets(logs)
+        if dry_run:
+            print(f"  Would convert {len(logs)} logs into {len(buckets)} buckets")
+            migrated += len(logs)
+            written += len(buckets)
+            break
+
+        if not await db.email_log_buckets.find_one({"migration_batch": batch_marker}, {"_id": 1}):
+            for bucket in buckets:
+                bucket["migration_batch"] = batch_marker
+            await db.email_log_buckets.insert_many(buckets, ordered=False)
+        await db.email_logs.delete_many({"_id": {"$in": [log["_id"] for log in logs]}})
+
+        migrated += len(logs)
+        written += len(buckets)
+        print(f"  ✅ {migrated} logs migrated into {written} buckets")
+
+    if not dry_run:
+        buckets_after = await collection_size(db, "email_log_buckets")
+        added_data = buckets_after[0] - buckets_before[0]
+        added_indexes = buckets_after[1] - buckets_before[1]
+        print(f"\n📊 email_log_buckets grew by {added_data / 1e6:.1f} MB data, {added_indexes / 1e6:.1f} MB indexes")
+
+    print(f"\n🎉 Migrated {migrated} logs into {written} buckets")
+    await MongoDB.close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert email_logs to bucketed storage")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--dry-run", action="store_true", help="Report the first batch without writing")
+    args = parser.parse_args()
+    asyncio.run(migrate_email_logs(args.batch_size, args.dry_run))
@@ -1,19 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta
 from ..deps import get_current_user
 from ...models.user import UserResponse
-from ...models.campaign import CampaignCreate, CampaignResponse
+from ...models.campaign import CampaignCreate, CampaignResponse, ScheduledCampaignCreate, ScheduledCampaignResponse
 from ...services.ses_manager import SESManager
 from ...services.template_service import TemplateService
 from ...services.sender_service import SenderService
 from ...services.subscription_service import SubscriptionService
+from ...services.checkpoint_service import CampaignCheckpoint, CheckpointService
+from ...services.send_scheduler import send_scheduler
+from ...services.sender_rotation import SenderRotation
+from ...services.suppression_service import SuppressionService
+from ...services.tracking_service import CampaignLinkMap, render_html_body, link_map_cache, tracking_configured
+from ...services.email_log_store import EmailLogStore
+from ...services.scheduler import campaign_scheduler, normalize_run_at
+from ...services.auth_service import AuthService
+from ...services.campaign_pacer import CampaignPacer
+from ...services.parse_service import parse_service
+from ...services.contact_patch_service import contact_patch_service
+from ...services.audience_service import audience_snapshot_service
+from ...services.email_normalizer import normalize_emails
+from ...services.list_contact_service import list_contact_service
+from ...services.send_window import WindowedDispatcher, resolve_timezone, window_release_times
+from ...core.config import settings
+from ...core.downloads import content_disposition
 from ...db.mongodb import MongoDB
 import pandas as pd
+import numpy as np
 import io
+import csv
+import zlib
+import asyncio
 import logging
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -62,7 +85,7 @@ async def validate_template_variables(
         file_doc = await file_collection.find_one({
             "_id": ObjectId(validation_request.file_id),
             "user_id": current_user.id
-        })
+        }, {"file_data": 0})
         
         if not file_doc:
             raise HTTPException(
@@ -70,20 +93,12 @@ async def validate_template_variables(
                 detail="Contact file not found"
             )
         
-        # Read file data from database
-        file_data = file_doc.get('file_data')
-        if not file_data:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File data not found"
-            )
-        
         try:
-            if file_doc['file_type'] == 'excel':
-                df = pd.read_excel(io.BytesIO(file_data))
-            else:
-                df = pd.read_csv(io.BytesIO(file_data))
-        except Exception as e:
+            # Columns added by row edits count too
+            df = await contact_patch_service.load_frame(
+                {**file_doc, "file_type": 'excel' if file_doc['file_type'] == 'excel' else 'csv'}
+            )
+        except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error reading file: {str(e)}"
@@ -125,20 +140,353 @@ async def validate_template_variables(
             detail=f"Validation failed: {str(e)}"
         )
 
+async def _load_campaign_dataframe(file_id: str, user_id: str) -> pd.DataFrame:
+    """Load the contacts of a processed file owned by the user.
+
+    The returned DataFrame may be shared through the parsed-file cache and must not be modified.
+    """
+    # Get file with user isolation - CRITICAL SECURITY CHECK
+    file_collection = MongoDB.get_collection("files")
+    file_doc = await file_collection.find_one({
+        "_id": ObjectId(file_id),
+        "user_id": user_id,  # 🔒 USER ISOLATION: Only user's own files
+        "is_active": True
+    }, {"file_data": 0})
+    
+    if not file_doc:
+        logger.warning(f"⚠️ File access denied: File {file_id} not found for user {user_id}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contact file not found"
+        )
+    
+    logger.info(f"📁 File access granted: {file_doc['filename']} for user {user_id}")
+    
+    if not file_doc.get('processed'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be processed before sending campaigns"
+        )
+    
+    if file_doc.get('file_type') != 'excel':
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only Excel files are supported for campaigns"
+        )
+    
+    # Parsed once per file version, with pending row edits replayed on top
+    return await contact_patch_service.load_frame(file_doc)
+
+async def _load_campaign_audience(source: dict, user_id: str) -> pd.DataFrame:
+    """Contacts of a campaign (or campaign request): its merged snapshot, its segment, else its contact file."""
+    if source.get("audience_snapshot_id"):
+        return await audience_snapshot_service.load(source["audience_snapshot_id"], user_id)
+    if source.get("segment"):
+        df = await list_contact_service.audience_frame(user_id, source["segment"])
+        if df.empty:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No contacts match this segment"
+            )
+        return df
+    return await _load_campaign_dataframe(source["file_id"], user_id)
+
+def _failed_rows_mask(checkpoint: CampaignCheckpoint, total_rows: int) -> pd.Series:
+    """Boolean mask of the rows whose last send attempt failed."""
+    bits = np.unpackbits(np.frombuffer(bytes(checkpoint.failed), dtype=np.uint8), bitorder="little")
+    return pd.Series(bits[:total_rows].astype(bool))
+
+def _build_campaign_emails(df: pd.DataFrame, template, subject_override: Optional[str],
+                           custom_message: Optional[str], template_service: TemplateService,
+                           skip_mask: Optional[pd.Series] = None, campaign_id: Optional[str] = None,
+                           track_opens: bool = False,
+                           link_map: Optional[CampaignLinkMap] = None) -> List[dict]:
+    """Validate the contact columns and render one email per valid row.
+
+    Addresses are trimmed and domain-lowercased, invalid ones dropped, and a repeated
+    address (in any case) is only sent to from its first row. Each email carries the
+    ``row_index`` of its source row so sends can be checkpointed.
+    Rows flagged in ``skip_mask`` (e.g. suppressed recipients) are never rendered.
+    With ``track_opens`` or a ``link_map`` each email also gets an HTML body carrying its
+    open pixel and/or click-tracked links; new links are added to ``link_map`` as they are seen.
+    """
+    # Get available columns
+    available_columns = [col.strip() for col in df.columns.tolist()]
+    
+    # Validate template variables against contact file columns
+    validation_result = template_service.validate_template_variables(
+        template.body, 
+        available_columns
+    )
+    
+    if not validation_result["is_valid"]:
+        missing_vars = ", ".join(validation_result["missing_variables"])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Template validation failed! Missing variables in contact file: {missing_vars}. Please upload a contact file with these columns or update your template."
+        )
+    
+    # Validate required columns
+    required_columns = ['email']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    
+    if missing_columns:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Missing required columns: {missing_columns}"
+        )
+    
+    # Normalize, validate and dedup the whole column at once; a repeated address is sent once
+    cleanup = normalize_emails(df['email'])
+    sendable = cleanup.sendable.to_numpy()
+    if skip_mask is not None:
+        sendable &= ~skip_mask.to_numpy()
+    addresses = cleanup.emails.to_numpy()
+    skipped_invalid = int((~cleanup.valid).sum())
+    skipped_duplicates = int(cleanup.duplicate.sum())
+    if skipped_invalid or skipped_duplicates:
+        logger.info(f"🧹 Skipping {skipped_invalid} invalid and {skipped_duplicates} duplicate addresses")
+    
+    # Prepare emails
+    emails = []
+    for row_index, (_, row) in enumerate(df.iterrows()):
+        if not sendable[row_index]:
+            continue
+        
+        email = addresses[row_index]
+        
+        # Create email content with variable substitution
+        subject = subject_override or template.subject
+        body = template.body
+        
+        # Replace all template variables with values from the row
+        for column in available_columns:
+            column_upper = column.upper()
+            if f'{{{column_upper}}}' in body:
+                value = str(row.get(column, '')).strip()
+                body = body.replace(f'{{{column_upper}}}', value)
+        
+        # Add custom message if provided
+        if custom_message:
+            body += f"\n\n{custom_message}"
+        
+        email_data = {
+            'email': email,
+            'subject': subject,
+            'body': body,
+            'row_index': row_index
+        }
+        if campaign_id and (track_opens or link_map is not None):
+            email_data['html_body'] = render_html_body(body, campaign_id, row_index, track_opens, link_map)
+        emails.append(email_data)
+    
+    if not emails:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No valid email addresses found in file"
+        )
+    
+    return emails
+
+async def _check_email_quota(subscription_service: SubscriptionService, current_user: UserResponse, needed: int) -> None:
+    """Raise 403 if the user's remaining monthly quota can't cover ``needed`` emails."""
+    limit_check = await subscription_service.check_email_limit(current_user)
+    if not limit_check["can_send"]:
+        remaining = limit_check.get("remaining", 0)
+    else:
+        remaining = limit_check.get("remaining", -1)
+        if remaining == -1:
+            return
+    
+    if needed > remaining:
+        # Get upgrade message
+        try:
+            upgrade_message = await subscription_service.get_upgrade_message(str(current_user.id), "emails")
+        except:
+            upgrade_message = "Please upgrade your plan to send more emails."
+        
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not enough email quota. You need {needed} emails but only have {remaining} remaining. {upgrade_message}"
+        )
+
+def _campaign_pacer(campaign_id: str, pacing: Optional[dict], remaining: int, started_at: datetime,
+                    checkpoint: CampaignCheckpoint) -> Optional[CampaignPacer]:
+    """Pacer for a campaign created with a target duration or rate, else None."""
+    if not pacing or not (pacing.get("spread_over_minutes") or pacing.get("max_rate_per_minute")):
+        return None
+    return CampaignPacer(
+        campaign_id,
+        remaining,
+        started_at,
+        spread_over_minutes=pacing.get("spread_over_minutes"),
+        max_rate_per_minute=pacing.get("max_rate_per_minute"),
+        quota_provider=ses_manager.get_send_quota,
+        heartbeat=lambda: CheckpointService().save(checkpoint)
+    )
+
+# Columns tried, in order, when a send-window campaign doesn't name its timezone column
+TIMEZONE_COLUMNS = ("timezone", "time_zone", "tz", "utc_offset")
+
+# Windowed and paced sends outlive their request; hold references so the tasks aren't garbage collected
+_windowed_sends = set()
+
+def _window_release_times(df: pd.DataFrame, send_window: dict, since: datetime) -> pd.Series:
+    """UTC release time of each file row for a send-window campaign started at ``since``.
+
+    Computing from the campaign start keeps release times stable across resumes; windows
+    that passed while a campaign was interrupted are simply due immediately.
+    """
+    column = send_window.get("timezone_column")
+    if column not in df.columns:
+        column = next((name for name in TIMEZONE_COLUMNS if name in df.columns), None)
+    timezones = df[column].reset_index(drop=True) if column else pd.Series([""] * len(df))
+    return window_release_times(timezones, send_window["hour"], send_window.get("default_timezone") or "UTC", since)
+
+async def _send_in_windows(campaign_oid: ObjectId, emails: List[dict], release_times: pd.Series,
+                           sender_email: str, user_id: str, checkpoint: CampaignCheckpoint,
+                           send_weight: float, sender_rotation: Optional[SenderRotation],
+                           start_time: datetime, pacing: Optional[dict] = None) -> None:
+    """Send a campaign bucket by bucket as each recipient timezone reaches its window.
+
+    Runs in the background, as do paced campaigns (every row released at once); the
+    checkpoint is saved while waiting between windows so the campaign isn't mistaken for
+    an interrupted one.
+    """
+    campaign_collection = MongoDB.get_collection("campaigns")
+    checkpoint_service = CheckpointService()
+    campaign_id = str(campaign_oid)
+    dispatcher = WindowedDispatcher(
+        [email for email in emails if not checkpoint.is_done(email['row_index'])],
+        release_times
+    )
+    stats = {}
+    logger.info(f"🕘 Campaign {campaign_id} split into {dispatcher.bucket_count} send windows, first at {dispatcher.next_release()} UTC")
+    await campaign_collection.update_one(
+        {"_id": campaign_oid},
+        {"$set": {"next_release_at": dispatcher.next_release()}}
+    )
+    
+    async def send(batch: List[dict]) -> None:
+        results = await ses_manager.send_bulk_emails(
+            batch,
+            sender_email,
+            user_id=user_id,
+            checkpoint=checkpoint,
+            campaign_id=campaign_id,
+            send_weight=send_weight,
+            sender_rotation=sender_rotation,
+            campaign_pacer=_campaign_pacer(campaign_id, pacing, len(batch), start_time, checkpoint)
+        )
+        stats['domain_stats'] = results['domain_stats']
+        stats['sender_stats'] = results.get('sender_stats')
+        await campaign_collection.update_one(
+            {"_id": campaign_oid},
+            {"$set": {
+                "successful": checkpoint.sent_count,
+                "failed": checkpoint.failed_count,
+                "next_release_at": dispatcher.next_release(),
+                "updated_at": datetime.utcnow()
+            }}
+        )
+    
+    try:
+        await dispatcher.run(send, heartbeat=lambda: checkpoint_service.save(checkpoint))
+    except Exception as e:
+        logger.error(f"Error in windowed send of campaign {campaign_id}: {e}")
+        await checkpoint_service.save(checkpoint)
+        await campaign_collection.update_one(
+            {"_id": campaign_oid},
+            {"$set": {"status": "interrupted", "error_message": str(e), "updated_at": datetime.utcnow()}}
+        )
+        return
+    
+    end_time = datetime.utcnow()
+    await campaign_collection.update_one(
+        {"_id": campaign_oid},
+        {"$set": {
+            "status": "completed",
+            "successful": checkpoint.sent_count,
+            "failed": checkpoint.failed_count,
+            "domain_stats": stats.get('domain_stats'),
+            "sender_stats": stats.get('sender_stats'),
+            "next_release_at": None,
+            "end_time": end_time,
+            "duration": (end_time - start_time).total_seconds(),
+            "updated_at": datetime.utcnow()
+        }}
+    )
+
+def _check_tracking(campaign_data: CampaignCreate) -> None:
+    """Refuse tracking whose links would point at an unreachable (unset or localhost) URL."""
+    if (campaign_data.track_opens or campaign_data.track_clicks) and not tracking_configured():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tracking is not available: TRACKING_BASE_URL is not configured"
+        )
+
+def _start_background_send(*args) -> None:
+    task = asyncio.create_task(_send_in_windows(*args))
+    _windowed_sends.add(task)
+    task.add_done_callback(_windowed_sends.discard)
+
+def _to_campaign_response(campaign: dict) -> CampaignResponse:
+    """Build a CampaignResponse from a campaign document."""
+    return CampaignResponse(
+        id=str(campaign["_id"]),
+        name=campaign["name"],
+        user_id=campaign["user_id"],
+        template_id=campaign["template_id"],
+        file_id=campaign.get("file_id"),
+        segment=campaign.get("segment"),
+        file_ids=campaign.get("file_ids"),
+        audience_snapshot_id=campaign.get("audience_snapshot_id"),
+        subject_override=campaign.get("subject_override"),
+        custom_message=campaign.get("custom_message"),
+        status=campaign["status"],
+        total_emails=campaign["total_emails"],
+        successful=campaign["successful"],
+        failed=campaign["failed"],
+        start_time=campaign.get("start_time"),
+        end_time=campaign.get("end_time"),
+        duration=campaign.get("duration"),
+        created_at=campaign["created_at"],
+        updated_at=campaign["updated_at"],
+        error_message=campaign.get("error_message"),
+        parent_campaign_id=campaign.get("parent_campaign_id")
+    )
+
 @router.post("/", response_model=CampaignResponse)
 async def create_and_send_campaign(
     campaign_data: CampaignCreate,
-    current_user: UserResponse = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_current_user),
+    idempotency_key_header: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """Create and send a campaign using existing processed file and template."""
     try:
         logger.info(f"🚀 Campaign creation initiated for user {current_user.id}")
-        logger.info(f"📋 Campaign details: Template ID: {campaign_data.template_id}, File ID: {campaign_data.file_id}")
+        logger.info(f"📋 Campaign details: Template ID: {campaign_data.template_id}, File ID: {campaign_data.file_id or campaign_data.file_ids or 'segment'}")
+        
+        campaign_collection = MongoDB.get_collection("campaigns")
+        
+        # A retried request with the same key gets the original campaign back
+        idempotency_key = campaign_data.idempotency_key or idempotency_key_header
+        if idempotency_key:
+            existing_campaign = await campaign_collection.find_one({
+                "user_id": current_user.id,
+                "idempotency_key": idempotency_key
+            })
+            if existing_campaign:
+                logger.info(f"🔁 Idempotent replay of campaign {existing_campaign['_id']} for user {current_user.id}")
+                return _to_campaign_response(existing_campaign)
+        
+        _check_tracking(campaign_data)
         
         # Initialize services
         subscription_service = SubscriptionService()
         sender_service = SenderService()
         template_service = TemplateService()
+        checkpoint_service = CheckpointService()
         
         # Get user's default sender email
         default_sender = await sender_service.get_default_sender(str(current_user.id))
@@ -152,6 +500,12 @@ async def create_and_send_campaign(
         sender_email = default_sender['email']
         logger.info(f"📧 Using sender email: {sender_email} for user {current_user.id}")
         
+        sender_rotation = None
+        if campaign_data.sender_rotation:
+            verified_senders = await sender_service.get_verified_senders(str(current_user.id))
+            sender_rotation = SenderRotation([sender['email'] for sender in verified_senders] or [sender_email])
+            logger.info(f"🔄 Rotating across {len(sender_rotation.sender_emails)} senders for user {current_user.id}")
+        
         # Get template with user isolation
         template = await template_service.get_template_by_id(
             campaign_data.template_id, 
@@ -159,163 +513,150 @@ async def create_and_send_campaign(
         )
         logger.info(f"📝 Template retrieved: {template.name} for user {current_user.id}")
         
-        # Get file with user isolation - CRITICAL SECURITY CHECK
-        file_collection = MongoDB.get_collection("files")
-        file_doc = await file_collection.find_one({
-            "_id": ObjectId(campaign_data.file_id),
-            "user_id": current_user.id,  # 🔒 USER ISOLATION: Only user's own files
-            "is_active": True
-        })
-        
-        if not file_doc:
-            logger.warning(f"⚠️ File access denied: File {campaign_data.file_id} not found for user {current_user.id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Contact file not found"
+        # Merged files and segments change as contacts do, so their audience is frozen once
+        # the campaign is created; resumes and retries then see the rows as first sent
+        snapshot_source = None
+        if campaign_data.file_ids:
+            df, snapshot_source = await audience_snapshot_service.merge(
+                current_user.id,
+                campaign_data.file_ids,
+                campaign_data.merge_rules,
+                campaign_data.merge_default_rule
             )
-        
-        logger.info(f"📁 File access granted: {file_doc['filename']} for user {current_user.id}")
-        
-        if not file_doc.get('processed'):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File must be processed before sending campaigns"
-            )
-        
-        # Read file data from database
-        file_data = file_doc.get('file_data')
-        if not file_data:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File data not found"
-            )
-        
-        # Convert file data to DataFrame - fix the DataFrame constructor issue
-        if file_doc.get('file_type') == 'excel':
-            df = pd.read_excel(io.BytesIO(file_data))
         else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only Excel files are supported for campaigns"
-            )
-        
-        # Get available columns
-        available_columns = [col.strip() for col in df.columns.tolist()]
-        
-        # Validate template variables against contact file columns
-        validation_result = template_service.validate_template_variables(
-            template.body, 
-            available_columns
+            df = await _load_campaign_audience(campaign_data.model_dump(), current_user.id)
+            if campaign_data.segment:
+                snapshot_source = {"segment": campaign_data.segment.model_dump()}
+        
+        # Drop bounced, complained and unsubscribed recipients before rendering
+        suppressed_mask = None
+        suppressed_count = 0
+        if 'email' in df.columns:
+            suppressed_mask = await SuppressionService().suppressed_mask(df['email'], current_user.id)
+            suppressed_count = int(suppressed_mask.sum())
+            if suppressed_count:
+                logger.info(f"🚫 Skipping {suppressed_count} suppressed recipients for user {current_user.id}")
+        
+        # The id is allocated up front so tracking tokens can be rendered into each email
+        campaign_oid = ObjectId()
+        link_map = CampaignLinkMap() if campaign_data.track_clicks else None
+        emails = _build_campaign_emails(
+            df,
+            template,
+            campaign_data.subject_override,
+            campaign_data.custom_message,
+            template_service,
+            skip_mask=suppressed_mask,
+            campaign_id=str(campaign_oid),
+            track_opens=campaign_data.track_opens,
+            link_map=link_map
         )
         
-        if not validation_result["is_valid"]:
-            missing_vars = ", ".join(validation_result["missing_variables"])
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Template validation failed! Missing variables in contact file: {missing_vars}. Please upload a contact file with these columns or update your template."
-            )
-        
-        # Validate required columns
-        required_columns = ['email']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Missing required columns: {missing_columns}"
-            )
-        
-        # Prepare emails
-        emails = []
-        for _, row in df.iterrows():
-            email = row['email'].strip()
-            
-            if not email or '@' not in email:
-                continue
-            
-            # Create email content with variable substitution
-            subject = campaign_data.subject_override or template.subject
-            body = template.body
-            
-            # Replace all template variables with values from the row
-            for column in available_columns:
-                column_upper = column.upper()
-                if f'{{{column_upper}}}' in body:
-                    value = str(row.get(column, '')).strip()
-                    body = body.replace(f'{{{column_upper}}}', value)
-            
-            # Add custom message if provided
-            if campaign_data.custom_message:
-                body += f"\n\n{campaign_data.custom_message}"
-            
-            emails.append({
-                'email': email,
-                'subject': subject,
-                'body': body
-            })
-        
-        if not emails:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No valid email addresses found in file"
-            )
-        
         # Check subscription limits before sending
-        limit_check = await subscription_service.check_email_limit(current_user)
-        if not limit_check["can_send"]:
-            # Check if user needs more emails than remaining
-            remaining = limit_check.get("remaining", 0)
-            if len(emails) > remaining:
-                # Get upgrade message
-                try:
-                    upgrade_message = await subscription_service.get_upgrade_message(str(current_user.id), "emails")
-                except:
-                    upgrade_message = "Please upgrade your plan to send more emails."
-                
+        await _check_email_quota(subscription_service, current_user, len(emails))
+        
+        send_window = None
+        if campaign_data.send_window_hour is not None:
+            if resolve_timezone(campaign_data.default_timezone, None) is None:
                 raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Not enough email quota. You need {len(emails)} emails but only have {remaining} remaining. {upgrade_message}"
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown timezone: {campaign_data.default_timezone}"
                 )
-        else:
-            # Check if user has enough emails remaining
-            remaining = limit_check.get("remaining", -1)
-            if remaining != -1 and len(emails) > remaining:
-                try:
-                    upgrade_message = await subscription_service.get_upgrade_message(str(current_user.id), "emails")
-                except:
-                    upgrade_message = "Please upgrade your plan to send more emails."
-                
+            if campaign_data.spread_over_minutes:
                 raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Not enough email quota. You need {len(emails)} emails but only have {remaining} remaining. {upgrade_message}"
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="A send window campaign can't also be spread over a duration; use max_rate_per_minute instead"
                 )
+            send_window = {
+                "hour": campaign_data.send_window_hour,
+                "timezone_column": campaign_data.timezone_column,
+                "default_timezone": campaign_data.default_timezone
+            }
+        
+        # Stored only now, so requests rejected above leave no snapshot behind
+        audience_snapshot = None
+        if snapshot_source is not None:
+            audience_snapshot = await audience_snapshot_service.save(current_user.id, df, snapshot_source)
         
         # Create campaign record
-        campaign_collection = MongoDB.get_collection("campaigns")
         campaign_dict = {
+            "_id": campaign_oid,
             "name": campaign_data.name,
             "user_id": current_user.id,
             "template_id": campaign_data.template_id,
             "file_id": campaign_data.file_id,
+            "segment": campaign_data.segment.model_dump() if campaign_data.segment else None,
+            "file_ids": audience_snapshot.get("file_ids") if audience_snapshot else None,
+            "audience_snapshot_id": str(audience_snapshot["_id"]) if audience_snapshot else None,
+            "duplicates_merged": audience_snapshot.get("duplicates_merged") if audience_snapshot else None,
             "subject_override": campaign_data.subject_override,
             "custom_message": campaign_data.custom_message,
             "sender_email": sender_email,
+            "sender_pool": sender_rotation.sender_emails if sender_rotation else None,
+            "track_opens": campaign_data.track_opens,
+            "track_clicks": campaign_data.track_clicks,
+            "links": link_map.urls if link_map else [],
+            "send_window": send_window,
+            "pacing": {
+                "spread_over_minutes": campaign_data.spread_over_minutes,
+                "max_rate_per_minute": campaign_data.max_rate_per_minute
+            },
             "status": "sending",
             "total_emails": len(emails),
+            "suppressed": suppressed_count,
             "successful": 0,
             "failed": 0,
             "start_time": datetime.utcnow(),
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
+        if idempotency_key:
+            campaign_dict["idempotency_key"] = idempotency_key
         
-        campaign_result = await campaign_collection.insert_one(campaign_dict)
+        try:
+            campaign_result = await campaign_collection.insert_one(campaign_dict)
+        except DuplicateKeyError:
+            # A concurrent request with the same key won the insert
+            if audience_snapshot is not None:
+                await audience_snapshot_service.release(audience_snapshot["_id"])
+            existing_campaign = await campaign_collection.find_one({
+                "user_id": current_user.id,
+                "idempotency_key": idempotency_key
+            })
+            return _to_campaign_response(existing_campaign)
         campaign_id = str(campaign_result.inserted_id)
         
+        # Checkpoint every file row so an interrupted send can be resumed
+        checkpoint = await checkpoint_service.create(campaign_id, df)
+        
+        # Send-window and paced campaigns run past the request; the campaign is returned as sending
+        if send_window or campaign_data.spread_over_minutes or campaign_data.max_rate_per_minute:
+            release_times = (
+                _window_release_times(df, send_window, campaign_dict["start_time"]) if send_window
+                else pd.Series([campaign_dict["start_time"]] * len(df))
+            )
+            _start_background_send(
+                campaign_oid, emails, release_times, sender_email,
+                current_user.id, checkpoint, await subscription_service.get_send_weight(current_user.id),
+                sender_rotation, campaign_dict["start_time"], campaign_dict["pacing"]
+            )
+            return _to_campaign_response(campaign_dict)
+        
         # Send bulk emails using AWS SES with user's verified sender email
         logger.info(f"Starting mass email campaign for {len(emails)} recipients from {sender_email}")
         
-        results = await ses_manager.send_bulk_emails(emails, sender_email, user_id=current_user.id)
+        results = await ses_manager.send_bulk_emails(
+            emails,
+            sender_email,
+            user_id=current_user.id,
+            checkpoint=checkpoint,
+            campaign_id=campaign_id,
+            send_weight=await subscription_service.get_send_weight(current_user.id),
+            sender_rotation=sender_rotation,
+            campaign_pacer=_campaign_pacer(
+                campaign_id, campaign_dict["pacing"], len(emails), campaign_dict["start_time"], checkpoint
+            )
+        )
         
         # Calculate duration
         end_time = datetime.utcnow()
@@ -329,6 +670,8 @@ async def create_and_send_campaign(
                     "status": "completed",
                     "successful": results['successful'],
                     "failed": results['failed'],
+                    "domain_stats": results['domain_stats'],
+                    "sender_stats": results.get('sender_stats'),
                     "end_time": end_time,
                     "duration": duration,
                     "updated_at": datetime.utcnow()
@@ -339,25 +682,7 @@ async def create_and_send_campaign(
         # Get updated campaign
         updated_campaign = await campaign_collection.find_one({"_id": campaign_result.inserted_id})
         
-        return CampaignResponse(
-            id=str(updated_campaign["_id"]),
-            name=updated_campaign["name"],
-            user_id=updated_campaign["user_id"],
-            template_id=updated_campaign["template_id"],
-            file_id=updated_campaign["file_id"],
-            subject_override=updated_campaign.get("subject_override"),
-            custom_message=updated_campaign.get("custom_message"),
-            status=updated_campaign["status"],
-            total_emails=updated_campaign["total_emails"],
-            successful=updated_campaign["successful"],
-            failed=updated_campaign["failed"],
-            start_time=updated_campaign["start_time"],
-            end_time=updated_campaign.get("end_time"),
-            duration=updated_campaign.get("duration"),
-            created_at=updated_campaign["created_at"],
-            updated_at=updated_campaign["updated_at"],
-            error_message=updated_campaign.get("error_message")
-        )
+        return _to_campaign_response(updated_campaign)
         
     except HTTPException:
         raise
@@ -368,6 +693,490 @@ async def create_and_send_campaign(
             detail=f"Campaign failed: {str(e)}"
         )
 
+def _to_schedule_response(schedule: dict) -> ScheduledCampaignResponse:
+    """Build a ScheduledCampaignResponse from a scheduled_campaigns document."""
+    return ScheduledCampaignResponse(
+        id=str(schedule["_id"]),
+        name=schedule["campaign"]["name"],
+        status=schedule["status"],
+        run_at=schedule["run_at"],
+        recurrence=schedule.get("recurrence"),
+        run_count=schedule.get("run_count", 0),
+        last_run_at=schedule.get("last_run_at"),
+        last_campaign_id=schedule.get("last_campaign_id"),
+        last_error=schedule.get("last_error"),
+        created_at=schedule["created_at"]
+    )
+
+async def run_scheduled_campaign(schedule: dict) -> Optional[str]:
+    """Send one occurrence of a scheduled campaign as its owner; returns the campaign id."""
+    user = await AuthService().get_user_by_email(schedule["user_email"])
+    if user is None or user.id != schedule["user_id"]:
+        raise ValueError("Schedule owner no longer exists")
+    
+    # The occurrence is the idempotency key, so a re-fired claim can't send twice
+    campaign_data = CampaignCreate(
+        **schedule["campaign"],
+        idempotency_key=f"schedule:{schedule['_id']}:{schedule['run_at']:%Y%m%dT%H%M%S}"
+    )
+    campaign = await create_and_send_campaign(campaign_data, user, None)
+    return campaign.id
+
+@router.post("/schedules", response_model=ScheduledCampaignResponse, status_code=status.HTTP_201_CREATED)
+async def schedule_campaign(
+    schedule_data: ScheduledCampaignCreate,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Schedule a campaign to be sent later, once or on a recurring basis."""
+    run_at = normalize_run_at(schedule_data.run_at)
+    if run_at < datetime.utcnow() - timedelta(minutes=1):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Scheduled time is in the past"
+        )
+    
+    # Fail fast on templates and files the user can't access
+    _check_tracking(schedule_data)
+    await TemplateService().get_template_by_id(schedule_data.template_id, current_user.id)
+    for file_id in [schedule_data.file_id] if schedule_data.file_id else schedule_data.file_ids or []:
+        if not ObjectId.is_valid(file_id) or not await MongoDB.get_collection("files").find_one(
+            {"_id": ObjectId(file_id), "user_id": current_user.id, "is_active": True},
+            {"_id": 1}
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Contact file not found"
+            )
+    
+    schedule = {
+        "user_id": current_user.id,
+        "user_email": current_user.email,
+        "campaign": schedule_data.model_dump(exclude={"run_at", "recurrence", "idempotency_key"}),
+        "run_at": run_at,
+        "recurrence": schedule_data.recurrence,
+        "status": "scheduled",
+        "run_count": 0,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+    result = await MongoDB.get_collection("scheduled_campaigns").insert_one(schedule)
+    schedule["_id"] = result.inserted_id
+    campaign_scheduler.notify(str(result.inserted_id), run_at)
+    
+    logger.info(f"⏰ Campaign '{schedule_data.name}' scheduled for {run_at} ({schedule_data.recurrence or 'once'}) by user {current_user.id}")
+    return _to_schedule_response(schedule)
+
+@router.get("/schedules", response_model=List[ScheduledCampaignResponse])
+async def get_scheduled_campaigns(
+    current_user: UserResponse = Depends(get_current_user),
+    limit: int = 50,
+    skip: int = 0
+):
+    """List the current user's scheduled campaigns, soonest first."""
+    cursor = MongoDB.get_collection("scheduled_campaigns").find(
+        {"user_id": current_user.id, "status": {"$ne": "cancelled"}}
+    ).sort("run_at", 1).skip(skip).limit(min(limit, 200))
+    return [_to_schedule_response(schedule) async for schedule in cursor]
+
+@router.delete("/schedules/{schedule_id}")
+async def cancel_scheduled_campaign(
+    schedule_id: str,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Cancel a scheduled campaign that hasn't started sending."""
+    if not ObjectId.is_valid(schedule_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid schedule ID"
+        )
+    result = await MongoDB.get_collection("scheduled_campaigns").update_one(
+        {"_id": ObjectId(schedule_id), "user_id": current_user.id, "status": "scheduled"},
+        {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}}
+    )
+    if result.modified_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No pending schedule found"
+        )
+    return {"message": "Scheduled campaign cancelled"}
+
+@router.post("/{campaign_id}/resume", response_model=CampaignResponse)
+async def resume_campaign(
+    campaign_id: str,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Resume an interrupted campaign, skipping recipients already recorded in its checkpoint."""
+    try:
+        if not ObjectId.is_valid(campaign_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid campaign ID"
+            )
+        
+        subscription_service = SubscriptionService()
+        template_service = TemplateService()
+        checkpoint_service = CheckpointService()
+        campaign_collection = MongoDB.get_collection("campaigns")
+        
+        campaign = await campaign_collection.find_one({
+            "_id": ObjectId(campaign_id),
+            "user_id": current_user.id
+        })
+        
+        if not campaign:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Campaign not found"
+            )
+        
+        if campaign["status"] not in ("sending", "interrupted"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Only interrupted campaigns can be resumed (status: {campaign['status']})"
+            )
+        
+        # A campaign still flushing checkpoints is being sent by a live worker
+        if campaign["status"] == "sending" and not await checkpoint_service.is_stale(campaign_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Campaign is still sending"
+            )
+        
+        checkpoint = await checkpoint_service.load(campaign_id)
+        if checkpoint is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No checkpoint recorded for this campaign"
+            )
+        
+        template = await template_service.get_template_by_id(campaign["template_id"], current_user.id)
+        df = await _load_campaign_audience(campaign, current_user.id)
+        
+        if not checkpoint.matches(df):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Contact file changed since the campaign started; it cannot be resumed"
+            )
+        
+        suppressed_mask = None
+        if 'email' in df.columns:
+            suppressed_mask = await SuppressionService().suppressed_mask(df['email'], current_user.id)
+        
+        # A retry campaign only ever covers the rows its parent failed
+        if campaign.get("parent_campaign_id"):
+            parent_checkpoint = await checkpoint_service.load(campaign["parent_campaign_id"])
+            if parent_checkpoint is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Parent campaign checkpoint not found"
+                )
+            retry_skip = ~_failed_rows_mask(parent_checkpoint, len(df))
+            suppressed_mask = retry_skip if suppressed_mask is None else (retry_skip | suppressed_mask)
+        
+        # Extend the stored link map so already-sent click tokens keep their indexes
+        link_map = CampaignLinkMap(campaign.get("links")) if campaign.get("track_clicks") and tracking_configured() else None
+        emails = _build_campaign_emails(
+            df,
+            template,
+            campaign.get("subject_override"),
+            campaign.get("custom_message"),
+            template_service,
+            skip_mask=suppressed_mask,
+            campaign_id=campaign_id,
+            track_opens=campaign.get("track_opens", False) and tracking_configured(),
+            link_map=link_map
+        )
+        remaining = sum(1 for email in emails if not checkpoint.is_done(email['row_index']))
+        await _check_email_quota(subscription_service, current_user, remaining)
+        
+        # Claim the campaign; the status/updated_at guard stops two concurrent resumes
+        claim = await campaign_collection.update_one(
+            {
+                "_id": campaign["_id"],
+                "status": campaign["status"],
+                "updated_at": campaign["updated_at"]
+            },
+            {"$set": {
+                "status": "sending",
+                "links": link_map.urls if link_map else campaign.get("links", []),
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        if claim.modified_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Campaign was resumed by another request"
+            )
+        link_map_cache.invalidate(campaign_id)
+        await checkpoint_service.save(checkpoint)
+        
+        # Rotate only across pool senders that are still verified
+        sender_rotation = None
+        if campaign.get("sender_pool"):
+            verified_senders = await SenderService().get_verified_senders(str(current_user.id))
+            pool = [sender['email'] for sender in verified_senders if sender['email'] in campaign["sender_pool"]]
+            if pool:
+                sender_rotation = SenderRotation(pool)
+        
+        logger.info(f"Resuming campaign {campaign_id} at row {checkpoint.row_offset}: {remaining} recipients left")
+        
+        # Windows that passed while the campaign was down are sent now, the rest at their local hour
+        pacing = campaign.get("pacing") or {}
+        if campaign.get("send_window") or pacing.get("spread_over_minutes") or pacing.get("max_rate_per_minute"):
+            start_time = campaign.get("start_time") or campaign["created_at"]
+            release_times = (
+                _window_release_times(df, campaign["send_window"], start_time) if campaign.get("send_window")
+                else pd.Series([start_time] * len(df))
+            )
+            _start_background_send(
+                campaign["_id"], emails, release_times,
+                campaign["sender_email"], current_user.id, checkpoint,
+                await subscription_service.get_send_weight(current_user.id), sender_rotation, start_time,
+                campaign.get("pacing")
+            )
+            return _to_campaign_response(await campaign_collection.find_one({"_id": campaign["_id"]}))
+        
+        results = await ses_manager.send_bulk_emails(
+            emails,
+            campaign["sender_email"],
+            user_id=current_user.id,
+            checkpoint=checkpoint,
+            campaign_id=campaign_id,
+            send_weight=await subscription_service.get_send_weight(current_user.id),
+            sender_rotation=sender_rotation,
+            # The original deadline still applies, so a late resume catches up
+            campaign_pacer=_campaign_pacer(
+                campaign_id, campaign.get("pacing"), remaining, campaign.get("start_time") or campaign["created_at"],
+                checkpoint
+            )
+        )
+        
+        end_time = datetime.utcnow()
+        start_time = campaign.get("start_time") or campaign["created_at"]
+        await campaign_collection.update_one(
+            {"_id": campaign["_id"]},
+            {
+                "$set": {
+                    "status": "completed",
+                    "successful": checkpoint.sent_count,
+                    "failed": checkpoint.failed_count,
+                    "domain_stats": results['domain_stats'],
+                    "sender_stats": results.get('sender_stats'),
+                    "end_time": end_time,
+                    "duration": (end_time - start_time).total_seconds(),
+                    "updated_at": datetime.utcnow()
+                }
+            }
+        )
+        
+        updated_campaign = await campaign_collection.find_one({"_id": campaign["_id"]})
+        return _to_campaign_response(updated_campaign)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming campaign {campaign_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Campaign resume failed: {str(e)}"
+        )
+
+@router.post("/{campaign_id}/retry-failed", response_model=CampaignResponse)
+async def retry_failed_recipients(
+    campaign_id: str,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Resend only the recipients a completed campaign failed, as a child campaign."""
+    try:
+        if not ObjectId.is_valid(campaign_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid campaign ID"
+            )
+        
+        checkpoint_service = CheckpointService()
+        campaign_collection = MongoDB.get_collection("campaigns")
+        
+        parent = await campaign_collection.find_one({
+            "_id": ObjectId(campaign_id),
+            "user_id": current_user.id
+        })
+        
+        if not parent:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Campaign not found"
+            )
+        
+        if parent["status"] != "completed":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Only completed campaigns can be retried (status: {parent['status']})"
+            )
+        
+        # The checkpoint's failure bitmap is the campaign's failure index
+        parent_checkpoint = await checkpoint_service.load(campaign_id)
+        if parent_checkpoint is None or parent_checkpoint.failed_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Campaign has no failed recipients to retry"
+            )
+        
+        # One retry at a time: the parent's "retrying" field is claimed atomically and
+        # points at the active child; a claim whose child has since finished is stale
+        child_oid = ObjectId()
+        child_id = str(child_oid)
+        previous_retry = parent.get("retrying")
+        if previous_retry and not await campaign_collection.find_one(
+            {"_id": ObjectId(previous_retry), "status": {"$in": ["sending", "interrupted"]}},
+            {"_id": 1}
+        ):
+            await campaign_collection.update_one(
+                {"_id": parent["_id"], "retrying": previous_retry},
+                {"$unset": {"retrying": ""}}
+            )
+        claimed = await campaign_collection.find_one_and_update(
+            {"_id": parent["_id"], "retrying": {"$exists": False}},
+            {"$set": {"retrying": child_id}}
+        )
+        if claimed is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A retry of this campaign is already in progress"
+            )
+        try:
+            return await _run_retry(parent, parent_checkpoint, child_oid, current_user)
+        finally:
+            # An interrupted child keeps the claim until it is resumed and finishes
+            child = await campaign_collection.find_one({"_id": child_oid}, {"status": 1})
+            if child is None or child["status"] not in ("sending", "interrupted"):
+                await campaign_collection.update_one(
+                    {"_id": parent["_id"], "retrying": child_id},
+                    {"$unset": {"retrying": ""}}
+                )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrying failed recipients of campaign {campaign_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Campaign retry failed: {str(e)}"
+        )
+
+async def _run_retry(parent: dict, parent_checkpoint: CampaignCheckpoint, child_oid: ObjectId,
+                     current_user: UserResponse) -> CampaignResponse:
+    """Build and send the child campaign of a claimed retry."""
+    subscription_service = SubscriptionService()
+    template_service = TemplateService()
+    checkpoint_service = CheckpointService()
+    campaign_collection = MongoDB.get_collection("campaigns")
+    campaign_id = str(parent["_id"])
+    template = await template_service.get_template_by_id(parent["template_id"], current_user.id)
+    df = await _load_campaign_audience(parent, current_user.id)
+    
+    if not parent_checkpoint.matches(df):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Contact file changed since the campaign was sent; failed rows can't be matched"
+        )
+    
+    skip_mask = ~_failed_rows_mask(parent_checkpoint, len(df))
+    suppressed_count = 0
+    if 'email' in df.columns:
+        suppressed_mask = await SuppressionService().suppressed_mask(df['email'], current_user.id)
+        suppressed_count = int((suppressed_mask & ~skip_mask).sum())
+        skip_mask |= suppressed_mask
+    
+    child_id = str(child_oid)
+    link_map = CampaignLinkMap() if parent.get("track_clicks") and tracking_configured() else None
+    emails = _build_campaign_emails(
+        df,
+        template,
+        parent.get("subject_override"),
+        parent.get("custom_message"),
+        template_service,
+        skip_mask=skip_mask,
+        campaign_id=child_id,
+        track_opens=parent.get("track_opens", False) and tracking_configured(),
+        link_map=link_map
+    )
+    
+    await _check_email_quota(subscription_service, current_user, len(emails))
+    
+    sender_rotation = None
+    if parent.get("sender_pool"):
+        verified_senders = await SenderService().get_verified_senders(str(current_user.id))
+        pool = [sender['email'] for sender in verified_senders if sender['email'] in parent["sender_pool"]]
+        if pool:
+            sender_rotation = SenderRotation(pool)
+    
+    child_dict = {
+        "_id": child_oid,
+        "name": f"{parent['name']} (retry)"[:100],
+        "user_id": current_user.id,
+        "parent_campaign_id": campaign_id,
+        "template_id": parent["template_id"],
+        "file_id": parent.get("file_id"),
+        "segment": parent.get("segment"),
+        "file_ids": parent.get("file_ids"),
+        "audience_snapshot_id": parent.get("audience_snapshot_id"),
+        "subject_override": parent.get("subject_override"),
+        "custom_message": parent.get("custom_message"),
+        "sender_email": parent["sender_email"],
+        "sender_pool": parent.get("sender_pool"),
+        "track_opens": parent.get("track_opens", False),
+        "track_clicks": parent.get("track_clicks", False),
+        "links": link_map.urls if link_map else [],
+        "status": "sending",
+        "total_emails": len(emails),
+        "suppressed": suppressed_count,
+        "successful": 0,
+        "failed": 0,
+        "start_time": datetime.utcnow(),
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+    await campaign_collection.insert_one(child_dict)
+    await campaign_collection.update_one(
+        {"_id": parent["_id"]},
+        {"$push": {"retry_campaign_ids": child_id}, "$set": {"updated_at": datetime.utcnow()}}
+    )
+    
+    checkpoint = await checkpoint_service.create(child_id, df)
+    
+    logger.info(f"🔁 Retrying {len(emails)} failed recipients of campaign {campaign_id} as {child_id}")
+    
+    results = await ses_manager.send_bulk_emails(
+        emails,
+        parent["sender_email"],
+        user_id=current_user.id,
+        checkpoint=checkpoint,
+        campaign_id=child_id,
+        send_weight=await subscription_service.get_send_weight(current_user.id),
+        sender_rotation=sender_rotation
+    )
+    
+    end_time = datetime.utcnow()
+    await campaign_collection.update_one(
+        {"_id": child_oid},
+        {
+            "$set": {
+                "status": "completed",
+                "successful": results['successful'],
+                "failed": results['failed'],
+                "domain_stats": results['domain_stats'],
+                "sender_stats": results.get('sender_stats'),
+                "end_time": end_time,
+                "duration": (end_time - child_dict["start_time"]).total_seconds(),
+                "updated_at": datetime.utcnow()
+            }
+        }
+    )
+    
+    child = await campaign_collection.find_one({"_id": child_oid})
+    return _to_campaign_response(child)
+
 @router.get("/", response_model=List[CampaignResponse])
 async def get_user_campaigns(
     current_user: UserResponse = Depends(get_current_user),
@@ -390,7 +1199,10 @@ async def get_user_campaigns(
                 name=campaign["name"],
                 user_id=campaign["user_id"],
                 template_id=campaign["template_id"],
-                file_id=campaign["file_id"],
+                file_id=campaign.get("file_id"),
+                segment=campaign.get("segment"),
+                file_ids=campaign.get("file_ids"),
+                audience_snapshot_id=campaign.get("audience_snapshot_id"),
                 subject_override=campaign.get("subject_override"),
                 custom_message=campaign.get("custom_message"),
                 status=campaign["status"],
@@ -437,7 +1249,10 @@ async def get_campaign_history(
                 name=campaign["name"],
                 user_id=campaign["user_id"],
                 template_id=campaign["template_id"],
-                file_id=campaign["file_id"],
+                file_id=campaign.get("file_id"),
+                segment=campaign.get("segment"),
+                file_ids=campaign.get("file_ids"),
+                audience_snapshot_id=campaign.get("audience_snapshot_id"),
                 subject_override=campaign.get("subject_override"),
                 custom_message=campaign.get("custom_message"),
                 status=campaign["status"],
@@ -499,10 +1314,7 @@ async def send_mass_email(
         # Read file content
         content = await file.read()
         
-        if file.filename.endswith('.xlsx'):
-            df = pd.read_excel(io.BytesIO(content))
-        else:
-            df = pd.read_csv(io.BytesIO(content))
+        df = await parse_service.read_table(content, 'excel' if file.filename.endswith('.xlsx') else 'csv')
         
         # Get available columns
         available_columns = [col.strip() for col in df.columns.tolist()]
@@ -532,12 +1344,15 @@ async def send_mass_email(
         
         # Prepare emails
         emails = []
-        for _, row in df.iterrows():
-            email = row['email'].strip()
-            
-            if not email or '@' not in email:
+        cleanup = normalize_emails(df['email'])
+        sendable = cleanup.sendable.to_numpy()
+        addresses = cleanup.emails.to_numpy()
+        for row_index, (_, row) in enumerate(df.iterrows()):
+            if not sendable[row_index]:
                 continue
             
+            email = addresses[row_index]
+            
             # Create email content with variable substitution
             subject = campaign_request.subject_override or template.subject
             body = template.body
@@ -724,6 +1539,12 @@ async def get_sending_statistics(current_user: UserResponse = Depends(get_curren
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get statistics: {str(e)}"
         ) 
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats(current_user: UserResponse = Depends(get_current_user)):
+    """Get the send scheduler's queue depth and wait times for the current user."""
+    return send_scheduler.get_stats(current_user.id)
+
 @router.get("/{campaign_id}/status")
 async def get_campaign_status(
     campaign_id: str,
@@ -743,6 +1564,28 @@ async def get_campaign_status(
                 detail="Campaign not found"
             )
         
+        # In-flight counters live in the checkpoint until the campaign completes
+        if campaign["status"] in ("sending", "interrupted"):
+            checkpoint_doc = await MongoDB.get_collection("campaign_checkpoints").find_one(
+                {"campaign_id": campaign_id},
+                {"sent_count": 1, "failed_count": 1}
+            )
+            if checkpoint_doc:
+                campaign["successful"] = checkpoint_doc.get("sent_count", campaign["successful"])
+                campaign["failed"] = checkpoint_doc.get("failed_count", campaign["failed"])
+        
+        # Paced campaigns project from their current rate, others from observed throughput
+        projected_finish_at = None
+        if campaign["status"] == "sending":
+            done = campaign["successful"] + campaign["failed"]
+            left = max(0, campaign["total_emails"] - done)
+            rate_per_minute = (campaign.get("pacing") or {}).get("rate_per_minute")
+            elapsed = (datetime.utcnow() - campaign["start_time"]).total_seconds()
+            if rate_per_minute:
+                projected_finish_at = datetime.utcnow() + timedelta(minutes=left / rate_per_minute)
+            elif done and elapsed > 0 and not campaign.get("send_window"):
+                projected_finish_at = datetime.utcnow() + timedelta(seconds=left * elapsed / done)
+        
         return {
             "id": str(campaign["_id"]),
             "name": campaign["name"],
@@ -753,6 +1596,13 @@ async def get_campaign_status(
             "start_time": campaign["start_time"],
             "end_time": campaign.get("end_time"),
             "duration": campaign.get("duration"),
+            "domain_stats": campaign.get("domain_stats", []),
+            "next_release_at": campaign.get("next_release_at"),
+            "projected_finish_at": projected_finish_at,
+            "opens": campaign.get("opens", 0),
+            "unique_opens": campaign.get("unique_opens", 0),
+            "clicks": campaign.get("clicks", 0),
+            "unique_clicks": campaign.get("unique_clicks", 0),
             "progress_percentage": (
                 ((campaign["successful"] + campaign["failed"]) / campaign["total_emails"] * 100)
                 if campaign["total_emails"] > 0 else 0
@@ -767,3 +1617,134 @@ async def get_campaign_status(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get campaign status: {str(e)}"
         )
+
+@router.get("/{campaign_id}/analytics")
+async def get_campaign_analytics(
+    campaign_id: str,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Get per-campaign send analytics: totals, error codes, delivery outcomes and sends per minute."""
+    try:
+        if not ObjectId.is_valid(campaign_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid campaign ID"
+            )
+        
+        campaign = await MongoDB.get_collection("campaigns").find_one(
+            {"_id": ObjectId(campaign_id), "user_id": current_user.id},
+            {"name": 1, "status": 1, "total_emails": 1, "opens": 1, "unique_opens": 1,
+             "clicks": 1, "unique_clicks": 1, "link_clicks": 1, "links": 1}
+        )
+        
+        if not campaign:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Campaign not found"
+            )
+        
+        analytics = await EmailLogStore().campaign_analytics(campaign_id)
+        
+        links = campaign.get("links", [])
+        link_clicks = campaign.get("link_clicks", {})
+        analytics.update({
+            "id": campaign_id,
+            "name": campaign["name"],
+            "status": campaign["status"],
+            "total_emails": campaign.get("total_emails", 0),
+            "opens": campaign.get("opens", 0),
+            "unique_opens": campaign.get("unique_opens", 0),
+            "clicks": campaign.get("clicks", 0),
+            "unique_clicks": campaign.get("unique_clicks", 0),
+            "links": [
+                {"url": url, "clicks": link_clicks.get(str(index), 0)}
+                for index, url in enumerate(links)
+            ]
+        })
+        return analytics
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting campaign analytics: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get campaign analytics: {str(e)}"
+        )
+
+EXPORT_COLUMNS = ["to_email", "status", "error_code", "error_message", "delivery_status",
+                  "message_id", "sender_email", "sent_at"]
+
+def _archived_months(campaign: dict) -> List[str]:
+    """Monthly archive collections that may hold this campaign's logs."""
+    if settings.EMAIL_LOG_ARCHIVE_MODE != "collection":
+        return []
+    start = campaign.get("start_time") or campaign["created_at"]
+    end = campaign.get("end_time") or datetime.utcnow()
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}_{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+async def _stream_campaign_csv(campaign_id: str, archive_months: List[str], compress: bool,
+                               rows_per_chunk: int = 1000):
+    """Encode a campaign's log entries as CSV chunks, gzip-compressed on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+
+    def take_chunk() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    async for entry in EmailLogStore().iter_campaign_entries(campaign_id, archive_months):
+        writer.writerow(entry)
+        rows += 1
+        if rows % rows_per_chunk == 0:
+            chunk = take_chunk()
+            if chunk:
+                yield chunk
+
+    chunk = take_chunk()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+@router.get("/{campaign_id}/export")
+async def export_campaign_results(
+    campaign_id: str,
+    compress: bool = True,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Download per-recipient delivery results of a campaign as (gzipped) CSV."""
+    if not ObjectId.is_valid(campaign_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid campaign ID"
+        )
+    
+    campaign = await MongoDB.get_collection("campaigns").find_one(
+        {"_id": ObjectId(campaign_id), "user_id": current_user.id},
+        {"name": 1, "start_time": 1, "end_time": 1, "created_at": 1}
+    )
+    
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    filename = f"campaign_{campaign_id}_results.csv" + (".gz" if compress else "")
+    logger.info(f"📤 Exporting results of campaign {campaign_id} for user {current_user.id}")
+    return StreamingResponse(
+        _stream_campaign_csv(campaign_id, _archived_months(campaign), compress),
+        media_type="application/gzip" if compress else "text/csv",
+        headers={"Content-Disposition": content_disposition(filename)}
+    )
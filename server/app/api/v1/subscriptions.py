@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from app.api.deps import get_current_user
 from app.services.subscription_service import SubscriptionService
 from app.services.payment_method_service import PaymentMethodService
+from app.services.email_log_store import EmailLogStore
 from app.models.subscription import SubscriptionResponse, UsageStats
 from app.models.payment_method import PaymentMethodResponse
 import stripe
@@ -86,6 +87,20 @@ async def get_usage_stats(current_user = Depends(get_current_user)):
     
     return response
 
+@router.get("/usage/history")
+async def get_usage_history(months: int = 12, current_user = Depends(get_current_user)):
+    """Get emails sent and failed per month, including archived history."""
+    try:
+        now = datetime.utcnow()
+        months = max(1, min(months, 60))
+        year, month = divmod(now.year * 12 + now.month - 1 - (months - 1), 12)
+        since = datetime(year, month + 1, 1)
+        history = await EmailLogStore().monthly_usage(current_user.id, since)
+        return {"user_id": current_user.id, "months": history}
+    except Exception as e:
+        logger.error(f"Error getting usage history: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get usage history")
+
 @router.get("/plans")
 async def get_available_plans():
     """Get available subscription plans."""
@@ -17,6 +17,60 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str = os.getenv("AWS_SECRET_ACCESS_KEY", "")
     SENDER_EMAIL: str = os.getenv("DEFAULT_SENDER_EMAIL", "")
     DEFAULT_SENDER_EMAIL: str = os.getenv("DEFAULT_SENDER_EMAIL", "")
+    SES_MAX_SEND_RATE: float = float(os.getenv("SES_MAX_SEND_RATE", "14"))
+    # Per-recipient-domain send rates (emails/second) as "domain:rate,..."
+    DOMAIN_SEND_RATES: str = os.getenv(
+        "DOMAIN_SEND_RATES",
+        "gmail.com:5,googlemail.com:5,outlook.com:4,hotmail.com:4,live.com:4,yahoo.com:3"
+    )
+    DEFAULT_DOMAIN_SEND_RATE: float = float(os.getenv("DEFAULT_DOMAIN_SEND_RATE", "10"))
+    SENDER_IDENTITY_SEND_RATE: float = float(os.getenv("SENDER_IDENTITY_SEND_RATE", "5"))
+    
+    # Suppression lists above this size are held as a Bloom filter with an exact Mongo fallback
+    SUPPRESSION_BLOOM_THRESHOLD: int = int(os.getenv("SUPPRESSION_BLOOM_THRESHOLD", "200000"))
+    SUPPRESSION_CACHE_TTL: int = int(os.getenv("SUPPRESSION_CACHE_TTL", "300"))
+    
+    # Shared secret expected as ?token= on the SES/SNS event webhook; the webhook refuses
+    # every request until it is set
+    SES_WEBHOOK_TOKEN: str = os.getenv("SES_WEBHOOK_TOKEN", "")
+    # SNS topic ARNs (comma-separated) whose notifications and subscriptions are accepted
+    SES_SNS_TOPIC_ARNS: str = os.getenv("SES_SNS_TOPIC_ARNS", "")
+    # Only for local load tests: accept unsigned messages (hard bounces from them are then
+    # suppressed for the sending user only, and subscriptions are never confirmed)
+    SES_VERIFY_SNS_SIGNATURES: bool = os.getenv("SES_VERIFY_SNS_SIGNATURES", "true").lower() == "true"
+    
+    # Public base URL of this API, used for open/click tracking links in emails; tracking
+    # is refused until it is set to a non-localhost URL
+    TRACKING_BASE_URL: str = os.getenv("TRACKING_BASE_URL", "").rstrip("/")
+    
+    # Send ledger: an unsent claim older than the lease is retried; entries expire after the TTL
+    SEND_LEDGER_LEASE_SECONDS: int = int(os.getenv("SEND_LEDGER_LEASE_SECONDS", "300"))
+    SEND_LEDGER_TTL_DAYS: int = int(os.getenv("SEND_LEDGER_TTL_DAYS", "30"))
+    
+    # Frozen campaign audiences are released this long after a send last loaded them
+    AUDIENCE_SNAPSHOT_TTL_DAYS: int = int(os.getenv("AUDIENCE_SNAPSHOT_TTL_DAYS", "30"))
+    
+    # Parsed contact files kept in memory for campaign sends, resumes and retries
+    PARSED_FILE_CACHE_SIZE: int = int(os.getenv("PARSED_FILE_CACHE_SIZE", "8"))
+    
+    # Spreadsheet parsing runs in a process pool off the event loop
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", "2"))
+    PARSE_QUEUE_SIZE: int = int(os.getenv("PARSE_QUEUE_SIZE", "8"))
+    PARSE_TIMEOUT_SECONDS: float = float(os.getenv("PARSE_TIMEOUT_SECONDS", "60"))
+    
+    # Row edits are kept as a patch log and folded back into the file once this many are
+    # pending or the file has been idle this long
+    FILE_PATCH_COMPACT_AFTER: int = int(os.getenv("FILE_PATCH_COMPACT_AFTER", "500"))
+    FILE_PATCH_COMPACT_IDLE_SECONDS: int = int(os.getenv("FILE_PATCH_COMPACT_IDLE_SECONDS", "300"))
+    
+    # Email logs are stored as one bucket document per campaign/sender/time window
+    EMAIL_LOG_BUCKET_MINUTES: int = int(os.getenv("EMAIL_LOG_BUCKET_MINUTES", "60"))
+    EMAIL_LOG_BUCKET_SIZE: int = int(os.getenv("EMAIL_LOG_BUCKET_SIZE", "500"))
+    # Logs older than this many days are rolled into summaries and archived ("collection" or "file")
+    EMAIL_LOG_HOT_DAYS: int = int(os.getenv("EMAIL_LOG_HOT_DAYS", "90"))
+    EMAIL_LOG_ARCHIVE_MODE: str = os.getenv("EMAIL_LOG_ARCHIVE_MODE", "collection")
+    EMAIL_LOG_ARCHIVE_DIR: str = os.getenv("EMAIL_LOG_ARCHIVE_DIR", "archives/email_logs")
+    EMAIL_LOG_ARCHIVE_ENABLED: bool = os.getenv("EMAIL_LOG_ARCHIVE_ENABLED", "true").lower() == "true"
     
     # Stripe Configuration
     STRIPE_SECRET_KEY: str = os.getenv("STRIPE_SECRET_KEY", "")
@@ -0,0 +1,11 @@
+import re
+from urllib.parse import quote
+
+def content_disposition(filename: str) -> str:
+    """``attachment`` header value safe for any filename.
+
+    Header values must be latin-1, so the name goes in ``filename*`` percent-encoded
+    as UTF-8 (RFC 5987), with an ASCII-only ``filename`` fallback for old clients.
+    """
+    fallback = re.sub(r'[^A-Za-z0-9._ -]', "_", filename).strip() or "download"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
@@ -55,18 +55,68 @@ class MongoDB:
             await cls.database.email_campaigns.create_index("status")
             await cls.database.email_campaigns.create_index("scheduled_at")
             
-            # Email logs indexes
-            await cls.database.email_logs.create_index("user_id")
-            await cls.database.email_logs.create_index("campaign_id")
-            await cls.database.email_logs.create_index("customer_id")
-            await cls.database.email_logs.create_index("status")
-            await cls.database.email_logs.create_index("sent_at")
+            # Campaigns collection indexes
+            await cls.database.campaigns.create_index(
+                [("user_id", 1), ("idempotency_key", 1)],
+                unique=True,
+                partialFilterExpression={"idempotency_key": {"$type": "string"}}
+            )
+            await cls.database.campaigns.create_index("parent_campaign_id", sparse=True)
+            
+            # Scheduled campaigns indexes
+            await cls.database.scheduled_campaigns.create_index([("status", 1), ("run_at", 1)])
+            await cls.database.scheduled_campaigns.create_index([("user_id", 1), ("run_at", 1)])
+            
+            # Campaign checkpoints indexes
+            await cls.database.campaign_checkpoints.create_index("campaign_id", unique=True)
+            
+            # Email log buckets indexes (scripts/migrate_email_logs.py moves legacy email_logs)
+            await cls.database.email_log_buckets.create_index([("user_id", 1), ("bucket_start", 1)])
+            await cls.database.email_log_buckets.create_index([("campaign_id", 1), ("bucket_start", 1)])
+            await cls.database.email_log_buckets.create_index("entries.m", sparse=True)
+            await cls.database.email_log_summaries.create_index(
+                [("user_id", 1), ("campaign_id", 1), ("day", 1)],
+                unique=True
+            )
+            await cls.database.email_log_summaries.create_index("campaign_id")
+            await cls.database.email_log_summaries.create_index([("user_id", 1), ("day", 1)])
+            # Legacy email_logs are still counted until the migration has emptied them
+            await cls.database.email_logs.create_index([("user_id", 1), ("sent_at", 1), ("status", 1)])
+            
+            # Tracking opens/clicks (_id is "<campaign_id>:<row_index>")
+            await cls.database.tracking_opens.create_index("campaign_id")
+            await cls.database.tracking_clicks.create_index("campaign_id")
+            
+            # Suppressions collection indexes (user_id None = global)
+            await cls.database.suppressions.create_index([("user_id", 1), ("email", 1)], unique=True)
+            await cls.database.suppressions.create_index([("user_id", 1), ("created_at", -1)])
             
             # Files collection indexes
             await cls.database.files.create_index("user_id")
             await cls.database.files.create_index("file_type")
             await cls.database.files.create_index("upload_date")
             await cls.database.files.create_index("is_active")
+            await cls.database.files.create_index("patched_at", sparse=True)
+            await cls.database.files.create_index("content_hash", sparse=True)
+            
+            # Contacts materialized from processed files, queried by segments (case-insensitive)
+            contact_collation = {"locale": "en", "strength": 2}
+            await cls.database.list_contacts.create_index([("user_id", 1), ("email_key", 1)], collation=contact_collation)
+            await cls.database.list_contacts.create_index([("user_id", 1), ("list_id", 1)], collation=contact_collation)
+            await cls.database.list_contacts.create_index([("list_id", 1), ("row_id", 1)], collation=contact_collation)
+            await cls.database.list_contacts.create_index([("attributes.$**", 1)], collation=contact_collation)
+            
+            # Send ledger entries only need to outlive resumes and retries of their campaign
+            await cls.database.send_ledger.create_index(
+                "claimed_at", expireAfterSeconds=settings.SEND_LEDGER_TTL_DAYS * 86400
+            )
+            
+            # Row patch log over contact files
+            await cls.database.file_patches.create_index([("file_id", 1), ("seq", 1)], unique=True)
+            
+            # Merged multi-file campaign audiences
+            await cls.database.audience_snapshots.create_index([("user_id", 1), ("created_at", -1)])
+            await cls.database.audience_snapshots.create_index("expires_at")
             
             # Templates collection indexes
             await cls.database.templates.create_index("user_id")
@@ -4,7 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 # from fastapi.staticfiles import StaticFiles
 import os
 from app.api.v1 import auth, campaigns, subscriptions, gmail_oauth, google_auth
-from app.routes import auth as auth_routes, senders, templates, files, stats, folders, contacts
+from app.routes import auth as auth_routes, senders, templates, files, stats, folders, contacts, suppressions, ses_events, tracking, segments
 
 app = FastAPI()
 
@@ -33,6 +33,10 @@ app.include_router(files.router, prefix="/api/files", tags=["files"])
 app.include_router(stats.router, prefix="/api/stats", tags=["stats"])
 app.include_router(folders.router, prefix="/api/folders", tags=["folders"])
 app.include_router(contacts.router, prefix="/api/contacts", tags=["contacts"])
+app.include_router(suppressions.router, prefix="/api/suppressions", tags=["suppressions"])
+app.include_router(ses_events.router, prefix="/api/ses", tags=["ses"])
+app.include_router(tracking.router, prefix="/api/t", tags=["tracking"])
+app.include_router(segments.router, prefix="/api/segments", tags=["segments"])
 app.include_router(subscriptions.router, prefix="/api/v1/subscriptions", tags=["subscriptions"])
 
 @app.on_event("startup")
@@ -40,10 +44,42 @@ async def startup_event():
     from app.db.mongodb import MongoDB
     await MongoDB.connect_to_mongo()
     print("✅ MongoDB connected successfully")
+    
+    # Campaigns left in "sending" by a dead process become resumable
+    from app.services.checkpoint_service import CheckpointService
+    await CheckpointService().mark_interrupted_campaigns()
+    
+    # Scheduled and recurring campaigns live in Mongo; this process dispatches its share
+    from app.services.scheduler import campaign_scheduler
+    campaign_scheduler.start(fire=campaigns.run_scheduled_campaign)
+    
+    # Roll old email logs into summaries and archive them once a day
+    from app.core.config import settings
+    if settings.EMAIL_LOG_ARCHIVE_ENABLED:
+        import asyncio
+        from app.services.archive_service import EmailLogArchiver
+        asyncio.create_task(EmailLogArchiver().run_periodically())
+    
+    # Fold row edits on contact files back into the stored files
+    import asyncio
+    from app.services.contact_patch_service import contact_patch_service
+    asyncio.create_task(contact_patch_service.run_periodically())
+    
+    # Release frozen campaign audiences nothing has loaded for a while
+    from app.services.audience_service import audience_snapshot_service
+    asyncio.create_task(audience_snapshot_service.run_periodically())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     from app.db.mongodb import MongoDB
+    from app.services.ses_event_service import ses_event_ingestor
+    from app.services.tracking_service import tracking_recorder
+    from app.services.scheduler import campaign_scheduler
+    from app.services.parse_service import parse_service
+    await campaign_scheduler.stop()
+    parse_service.shutdown()
+    await ses_event_ingestor.flush()
+    await tracking_recorder.flush()
     await MongoDB.close_mongo_connection()
     print("✅ MongoDB connection closed")
 
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field, ConfigDict, GetJsonSchemaHandler
-from typing import Optional, Any, List
+from pydantic import BaseModel, Field, ConfigDict, GetJsonSchemaHandler, model_validator
+from typing import Optional, Any, Dict, List, Literal
 from datetime import datetime
 from bson import ObjectId
+from .segment import SegmentQuery
 
 class PyObjectId(ObjectId):
     @classmethod
@@ -21,9 +22,44 @@ class PyObjectId(ObjectId):
 class CampaignCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     template_id: str = Field(..., description="Template ID to use for the campaign")
-    file_id: str = Field(..., description="File ID containing contacts")
+    file_id: Optional[str] = Field(None, description="File ID containing contacts")
+    segment: Optional[SegmentQuery] = Field(None, description="Send to the contacts matching this segment instead of a single file")
+    file_ids: Optional[List[str]] = Field(None, min_length=2, max_length=50, description="Merge these files into one audience, each address once")
+    merge_rules: Dict[str, Literal["first", "last", "concat"]] = Field(default_factory=dict, description="Per-column rule for contacts found in several files: first or last non-empty value in file order, or all distinct values")
+    merge_default_rule: Literal["first", "last", "concat"] = Field("first", description="Rule for columns without an entry in merge_rules")
     subject_override: Optional[str] = Field(None, max_length=200)
     custom_message: Optional[str] = Field(None, description="Additional custom message to append")
+    idempotency_key: Optional[str] = Field(None, max_length=128, description="Client key that makes retried create requests return the original campaign")
+    sender_rotation: bool = Field(False, description="Spread the campaign across all of the user's verified senders")
+    track_opens: bool = Field(False, description="Embed an open-tracking pixel (adds an HTML part; requires TRACKING_BASE_URL)")
+    track_clicks: bool = Field(False, description="Rewrite links into tracked redirects (adds an HTML part; requires TRACKING_BASE_URL)")
+    send_window_hour: Optional[int] = Field(None, ge=0, le=23, description="Deliver at this hour of each recipient's local day instead of immediately")
+    timezone_column: Optional[str] = Field(None, description="Contact column holding an IANA timezone or UTC offset (defaults to a 'timezone', 'tz' or 'utc_offset' column)")
+    default_timezone: str = Field("UTC", description="Timezone for contacts without a usable timezone value")
+    spread_over_minutes: Optional[int] = Field(None, ge=1, le=10080, description="Spread delivery evenly over this many minutes instead of sending as fast as possible")
+    max_rate_per_minute: Optional[int] = Field(None, ge=1, description="Never send this campaign faster than this many emails per minute")
+
+    @model_validator(mode="after")
+    def check_audience(self):
+        if sum(audience is not None for audience in (self.file_id, self.segment, self.file_ids)) != 1:
+            raise ValueError("Provide exactly one of file_id, file_ids or segment")
+        return self
+
+class ScheduledCampaignCreate(CampaignCreate):
+    run_at: datetime = Field(..., description="When to send (UTC unless an offset is given)")
+    recurrence: Optional[str] = Field(None, pattern="^(hourly|daily|weekly)$")
+
+class ScheduledCampaignResponse(BaseModel):
+    id: str
+    name: str
+    status: str
+    run_at: datetime
+    recurrence: Optional[str] = None
+    run_count: int = 0
+    last_run_at: Optional[datetime] = None
+    last_campaign_id: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime
 
 class CampaignUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
@@ -35,10 +71,13 @@ class CampaignInDB(BaseModel):
     name: str
     user_id: str
     template_id: str
-    file_id: str
+    file_id: Optional[str] = None
+    segment: Optional[dict] = None
+    file_ids: Optional[List[str]] = None
+    audience_snapshot_id: Optional[str] = None
     subject_override: Optional[str] = None
     custom_message: Optional[str] = None
-    status: str = Field(default="pending", pattern="^(pending|sending|completed|failed)$")
+    status: str = Field(default="pending", pattern="^(pending|sending|interrupted|completed|failed)$")
     total_emails: int = Field(default=0)
     successful: int = Field(default=0)
     failed: int = Field(default=0)
@@ -60,7 +99,10 @@ class CampaignResponse(BaseModel):
     name: str
     user_id: str
     template_id: str
-    file_id: str
+    file_id: Optional[str] = None
+    segment: Optional[dict] = None
+    file_ids: Optional[List[str]] = None
+    audience_snapshot_id: Optional[str] = None
     subject_override: Optional[str] = None
     custom_message: Optional[str] = None
     status: str
@@ -73,6 +115,7 @@ class CampaignResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     error_message: Optional[str] = None
+    parent_campaign_id: Optional[str] = None
 
     model_config = ConfigDict(
         json_encoders={ObjectId: str}
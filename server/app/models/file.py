@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List, Literal
 from datetime import datetime
 from bson import ObjectId
 
@@ -27,16 +27,27 @@ class FileBase(BaseModel):
 
 class FileCreate(FileBase):
     user_id: str = Field(..., description="User ID who uploaded the file")
-    file_data: bytes = Field(..., description="File binary data")
+    content_hash: str = Field(..., description="SHA-256 of the file content, the key of its stored blob")
 
 class FileUpdate(BaseModel):
     description: Optional[str] = Field(None, description="File description")
     folder_id: Optional[str] = Field(None, description="Folder ID for organization")
 
+class ContactPatchOperation(BaseModel):
+    op: Literal["insert", "update", "delete"] = Field(..., description="Row operation")
+    row_id: Optional[int] = Field(None, ge=0, description="Row to update or delete, as returned by the preview")
+    values: Optional[Dict[str, Any]] = Field(None, description="Column values to insert or change")
+
+class ContactPatchRequest(BaseModel):
+    operations: List[ContactPatchOperation] = Field(..., min_length=1, max_length=1000)
+    base_version: int = Field(..., ge=0, description="File version the row ids were read from (from the preview)")
+
 class FileInDB(FileBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     user_id: str
-    file_data: bytes
+    # Contents live in the shared blob store under content_hash; file_data only on legacy documents
+    file_data: Optional[bytes] = None
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the file contents in the blob store")
     upload_date: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = Field(default=True)
     processed: bool = Field(default=False)
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+
+class SegmentFilter(BaseModel):
+    field: str = Field(..., min_length=1, max_length=100, description="'email', or a contact column such as 'company'")
+    op: Literal["eq", "ne", "in", "nin", "contains", "exists"] = Field("eq", description="Comparison (case-insensitive)")
+    value: Any = Field(None, description="Value to compare with; a list for 'in'/'nin', a boolean for 'exists'")
+
+class SegmentQuery(BaseModel):
+    filters: List[SegmentFilter] = Field(default_factory=list, max_length=20, description="All filters must match")
+    list_ids: Optional[List[str]] = Field(None, max_length=100, description="Only contacts from these files (default: all)")
+
+class SegmentPreviewRequest(SegmentQuery):
+    offset: int = Field(0, ge=0)
+    limit: int = Field(100, ge=1, le=1000)
+
+class SegmentPreviewResponse(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    contacts: List[Dict[str, Any]]
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class SuppressionCreate(BaseModel):
+    email: str = Field(..., min_length=3, max_length=320)
+    reason: str = Field(default="manual", pattern="^(hard_bounce|complaint|unsubscribe|manual)$")
+
+class SuppressionResponse(BaseModel):
+    email: str
+    reason: str
+    is_global: bool = False
+    created_at: datetime
+    source_campaign_id: Optional[str] = None
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+import mimetypes
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
 from typing import List, Optional
-from ..models.file import FileResponse
+from ..models.file import FileResponse, ContactPatchRequest
 from ..services.file_service import FileService
+from ..services.contact_patch_service import contact_patch_service
 from ..api.deps import get_current_user
+from ..core.downloads import content_disposition
 from ..models.user import UserResponse
 
 router = APIRouter()
@@ -68,11 +71,22 @@ async def process_file(
 @router.get("/{file_id}/preview")
 async def preview_file(
     file_id: str,
+    offset: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    sort: Optional[str] = Query(None, description="Column to sort by, prefixed with '-' for descending"),
     current_user: UserResponse = Depends(get_current_user)
 ):
-    """Preview a file's data."""
+    """Preview a file's data; pass offset/limit (and optionally columns, sort) for a single page."""
     file_service = FileService()
-    return await file_service.preview_file(file_id, current_user.id)
+    return await file_service.preview_file(
+        file_id,
+        current_user.id,
+        offset=offset,
+        limit=limit,
+        columns=[column.strip() for column in columns.split(",") if column.strip()] if columns else None,
+        sort=sort
+    )
 
 @router.put("/{file_id}/update")
 async def update_file(
@@ -84,6 +98,33 @@ async def update_file(
     file_service = FileService()
     return await file_service.update_file_data(file_id, current_user.id, update_data)
 
+@router.patch("/{file_id}/contacts")
+async def patch_file_contacts(
+    file_id: str,
+    patch: ContactPatchRequest,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Insert, update or delete individual contact rows by row id."""
+    return await contact_patch_service.apply(
+        file_id,
+        current_user.id,
+        [operation.model_dump() for operation in patch.operations],
+        base_version=patch.base_version
+    )
+
+@router.get("/{file_id}/export")
+async def export_file(
+    file_id: str,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Download a file in its original format, including any row edits."""
+    file_doc, content = await contact_patch_service.export(file_id, current_user.id)
+    return Response(
+        content=content,
+        media_type=mimetypes.guess_type(file_doc["filename"])[0] or "application/octet-stream",
+        headers={"Content-Disposition": content_disposition(file_doc["filename"])}
+    )
+
 @router.put("/{file_id}/rename")
 async def rename_file(
     file_id: str,
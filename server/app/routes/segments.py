@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from ..models.segment import SegmentPreviewRequest, SegmentPreviewResponse
+from ..services.list_contact_service import list_contact_service
+from ..api.deps import get_current_user
+from ..models.user import UserResponse
+
+router = APIRouter()
+
+@router.post("/preview", response_model=SegmentPreviewResponse)
+async def preview_segment(
+    segment: SegmentPreviewRequest,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Count the current user's contacts matching a segment and return one page of them."""
+    total, contacts = await list_contact_service.query(
+        current_user.id,
+        segment.model_dump(exclude={"offset", "limit"}),
+        offset=segment.offset,
+        limit=segment.limit
+    )
+    return SegmentPreviewResponse(total=total, offset=segment.offset, limit=segment.limit, contacts=contacts)
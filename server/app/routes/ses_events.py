@@ -0,0 +1,107 @@
+import hmac
+import json
+import logging
+from typing import Any, Dict, Optional
+import httpx
+from fastapi import APIRouter, HTTPException, Request, status
+from ..core.config import settings
+from ..services.ses_event_service import ses_event_ingestor, parse_ses_notification
+from ..services.sns_verifier import is_sns_url, sns_message_verifier
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def _check_token(token: Optional[str]) -> None:
+    if not settings.SES_WEBHOOK_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="SES webhook is not configured"
+        )
+    if not token or not hmac.compare_digest(token, settings.SES_WEBHOOK_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook token"
+        )
+
+def _allowed_topic(topic_arn: Optional[str]) -> bool:
+    allowed = {arn.strip() for arn in settings.SES_SNS_TOPIC_ARNS.split(",") if arn.strip()}
+    return bool(topic_arn) and topic_arn in allowed
+
+async def _authenticate(message: Dict[str, Any]) -> bool:
+    """Whether a message may be trusted: signed by SNS and from an allowed topic."""
+    if not await sns_message_verifier.verify(message):
+        logger.warning(f"⚠️ Rejected SNS message {message.get('MessageId')} with an invalid signature")
+        return False
+    if not _allowed_topic(message.get("TopicArn")):
+        logger.warning(f"⚠️ Rejected SNS message from topic {message.get('TopicArn')} (not in SES_SNS_TOPIC_ARNS)")
+        return False
+    return True
+
+async def _confirm_subscription(message: Dict[str, Any]) -> None:
+    subscribe_url = message.get("SubscribeURL")
+    if not is_sns_url(subscribe_url):
+        logger.warning(f"⚠️ Refused SNS subscription with SubscribeURL {subscribe_url!r}")
+        return
+    try:
+        async with httpx.AsyncClient(timeout=10, follow_redirects=False) as client:
+            await client.get(subscribe_url)
+        logger.info(f"✅ Confirmed SNS subscription for {message.get('TopicArn')}")
+    except Exception as e:
+        logger.error(f"Error confirming SNS subscription: {e}")
+
+@router.post("/events", status_code=status.HTTP_202_ACCEPTED)
+async def receive_ses_events(request: Request, token: Optional[str] = None):
+    """SNS webhook for SES Bounce, Complaint and Delivery notifications.
+
+    Accepts a single SNS message or a JSON array of them. Each message must carry a
+    valid SNS signature and come from a topic in ``SES_SNS_TOPIC_ARNS``; others are
+    skipped. Events are buffered and applied in bulk, so the response only confirms
+    they were queued.
+    """
+    _check_token(token)
+
+    # SNS posts JSON with a text/plain content type, so parse the raw body
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid JSON body"
+        )
+
+    messages = payload if isinstance(payload, list) else [payload]
+    events = []
+    for message in messages:
+        if not isinstance(message, dict):
+            continue
+        authenticated = settings.SES_VERIFY_SNS_SIGNATURES and await _authenticate(message)
+        if settings.SES_VERIFY_SNS_SIGNATURES and not authenticated:
+            continue
+        if message.get("Type") == "SubscriptionConfirmation":
+            if authenticated:
+                await _confirm_subscription(message)
+            continue
+        try:
+            events.extend(
+                {**event, "authenticated": authenticated}
+                for event in parse_ses_notification(message)
+            )
+        except (ValueError, TypeError) as e:
+            logger.error(f"Error parsing SES notification: {e}")
+
+    if events and ses_event_ingestor.is_full:
+        # Let SNS redeliver later instead of dropping feedback
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Event buffer full"
+        )
+
+    queued = ses_event_ingestor.submit(events) if events else 0
+    return {"queued": queued}
+
+@router.get("/events/stats")
+async def get_ses_event_stats(token: Optional[str] = None):
+    """Ingestion counters for this process."""
+    _check_token(token)
+    return ses_event_ingestor.get_stats()
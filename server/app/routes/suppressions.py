@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from ..models.suppression import SuppressionCreate, SuppressionResponse
+from ..services.suppression_service import SuppressionService
+from ..api.deps import get_current_user
+from ..models.user import UserResponse
+
+router = APIRouter()
+
+@router.get("/", response_model=List[SuppressionResponse])
+async def get_suppressions(
+    skip: int = 0,
+    limit: int = 100,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Get the current user's suppressed addresses."""
+    suppression_service = SuppressionService()
+    entries = await suppression_service.get_suppressions(current_user.id, skip=skip, limit=min(limit, 1000))
+    return [
+        SuppressionResponse(
+            email=entry["email"],
+            reason=entry.get("reason", "manual"),
+            is_global=False,
+            created_at=entry["created_at"],
+            source_campaign_id=entry.get("source_campaign_id")
+        ) for entry in entries
+    ]
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def add_suppression(
+    suppression: SuppressionCreate,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Suppress an address so the current user's campaigns never send to it."""
+    suppression_service = SuppressionService()
+    await suppression_service.add_suppression(current_user.id, suppression.email, suppression.reason)
+    return {"message": "Address suppressed", "email": suppression.email.strip().lower()}
+
+@router.delete("/{email}")
+async def remove_suppression(
+    email: str,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Remove an address from the current user's suppression list."""
+    suppression_service = SuppressionService()
+    if not await suppression_service.remove_suppression(current_user.id, email):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Suppression not found"
+        )
+    return {"message": "Suppression removed"}
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import RedirectResponse, Response
+from ..services.tracking_service import (
+    TRACKING_PIXEL, read_open_token, read_click_token, tracking_recorder, link_map_cache
+)
+
+router = APIRouter()
+
+_PIXEL_HEADERS = {
+    "Cache-Control": "no-store, no-cache, must-revalidate, private",
+    "Pragma": "no-cache"
+}
+
+@router.get("/o/{token}.gif", include_in_schema=False)
+async def track_open(token: str):
+    """Serve the open-tracking pixel and record the open."""
+    decoded = read_open_token(token)
+    if decoded is not None:
+        tracking_recorder.record_open(*decoded)
+    # Always answer with the pixel so broken tokens don't render as broken images
+    return Response(content=TRACKING_PIXEL, media_type="image/gif", headers=_PIXEL_HEADERS)
+
+@router.get("/c/{token}", include_in_schema=False)
+async def track_click(token: str):
+    """Record a click and redirect to the campaign link."""
+    decoded = read_click_token(token)
+    url = await link_map_cache.get_url(decoded[0], decoded[2]) if decoded is not None else None
+    if url is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Link not found"
+        )
+    tracking_recorder.record_click(*decoded)
+    return RedirectResponse(url, status_code=status.HTTP_302_FOUND)
@@ -0,0 +1,189 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import socket
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from ..core.config import settings
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+# Quota counts the current billing period from hot logs, so never archive inside it
+MIN_HOT_DAYS = 35
+
+# Lease document in ``task_leases`` that lets one process per interval run the archiver
+ARCHIVER_LEASE_ID = "email_log_archiver"
+
+def archive_collection_name(bucket_start: datetime) -> str:
+    """Monthly archive collection for a bucket."""
+    return f"email_log_archive_{bucket_start:%Y_%m}"
+
+def summarize_buckets(buckets: List[Dict[str, Any]]) -> Dict[tuple, Dict[str, Dict[str, int]]]:
+    """Roll bucket entries up into per (user, campaign, day) totals."""
+    summaries = defaultdict(lambda: {"totals": defaultdict(int), "error_codes": defaultdict(int),
+                                     "delivery": defaultdict(int)})
+    for bucket in buckets:
+        for entry in bucket.get("entries", []):
+            day = entry["t"].replace(hour=0, minute=0, second=0, microsecond=0)
+            summary = summaries[(bucket["user_id"], bucket.get("campaign_id"), day)]
+            summary["totals"][entry["s"]] += 1
+            if entry["s"] == "failed":
+                summary["error_codes"][entry.get("c") or "Unknown"] += 1
+            if entry.get("d"):
+                summary["delivery"][entry["d"]] += 1
+    return summaries
+
+class EmailLogArchiver:
+    """Moves email log buckets older than the hot horizon out of ``email_log_buckets``.
+
+    Each batch is claimed with an ``archiving`` marker, rolled into ``email_log_summaries``,
+    copied to a monthly archive collection (or a gzip JSON-lines file per batch under
+    ``EMAIL_LOG_ARCHIVE_DIR``) and then deleted. Every step is idempotent per batch, so an
+    interrupted run is finished by the next one.
+    """
+
+    def __init__(self, hot_days: Optional[int] = None, mode: Optional[str] = None,
+                 archive_dir: Optional[str] = None, batch_size: int = 1000):
+        self.hot_days = max(hot_days or settings.EMAIL_LOG_HOT_DAYS, MIN_HOT_DAYS)
+        self.mode = mode or settings.EMAIL_LOG_ARCHIVE_MODE
+        self.archive_dir = archive_dir or settings.EMAIL_LOG_ARCHIVE_DIR
+        self.batch_size = batch_size
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        now = now or datetime.utcnow()
+        return (now - timedelta(days=self.hot_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archive everything older than the cutoff."""
+        buckets_collection = MongoDB.get_collection("email_log_buckets")
+        archived = {"batches": 0, "buckets": 0}
+
+        # Finish batches an earlier run claimed but didn't complete
+        for batch_id in await buckets_collection.distinct("archiving", {"archiving": {"$exists": True}}):
+            archived["buckets"] += await self._archive_batch(batch_id)
+            archived["batches"] += 1
+
+        cutoff = self.cutoff(now)
+        while True:
+            ids = [
+                bucket["_id"] async for bucket in buckets_collection.find(
+                    {"bucket_start": {"$lt": cutoff}, "archiving": {"$exists": False}},
+                    {"_id": 1}
+                ).limit(self.batch_size)
+            ]
+            if not ids:
+                break
+            batch_id = uuid.uuid4().hex
+            await buckets_collection.update_many(
+                {"_id": {"$in": ids}, "archiving": {"$exists": False}},
+                {"$set": {"archiving": batch_id}}
+            )
+            archived["buckets"] += await self._archive_batch(batch_id)
+            archived["batches"] += 1
+
+        if archived["buckets"]:
+            logger.info(f"📦 Archived {archived['buckets']} email log buckets older than {cutoff:%Y-%m-%d}")
+        return archived
+
+    async def _archive_batch(self, batch_id: str) -> int:
+        buckets_collection = MongoDB.get_collection("email_log_buckets")
+        buckets = await buckets_collection.find({"archiving": batch_id}).to_list(length=None)
+        if not buckets:
+            return 0
+
+        await self._write_summaries(batch_id, buckets)
+        if self.mode == "file":
+            self._write_file(batch_id, buckets)
+        else:
+            await self._write_collections(buckets)
+
+        result = await buckets_collection.delete_many({"archiving": batch_id})
+        return result.deleted_count
+
+    async def _write_summaries(self, batch_id: str, buckets: List[Dict[str, Any]]) -> None:
+        """Add the batch's totals to the daily summaries exactly once.
+
+        The ``batches`` guard makes a replayed batch miss every summary it already counted;
+        the resulting upsert collides with the unique key and is ignored.
+        """
+        operations = []
+        for (user_id, campaign_id, day), summary in summarize_buckets(buckets).items():
+            increments = {f"totals.{status}": count for status, count in summary["totals"].items()}
+            increments.update({f"error_codes.{code}": count for code, count in summary["error_codes"].items()})
+            increments.update({f"delivery.{status}": count for status, count in summary["delivery"].items()})
+            operations.append(UpdateOne(
+                {"user_id": user_id, "campaign_id": campaign_id, "day": day, "batches": {"$ne": batch_id}},
+                {"$inc": increments, "$push": {"batches": batch_id}},
+                upsert=True
+            ))
+        try:
+            await MongoDB.get_collection("email_log_summaries").bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+
+    async def _write_collections(self, buckets: List[Dict[str, Any]]) -> None:
+        by_month = defaultdict(list)
+        for bucket in buckets:
+            bucket.pop("archiving", None)
+            by_month[archive_collection_name(bucket["bucket_start"])].append(bucket)
+        for collection_name, month_buckets in by_month.items():
+            archive_collection = MongoDB.get_collection(collection_name)
+            # Campaign exports still read archived months
+            await archive_collection.create_index([("campaign_id", 1), ("bucket_start", 1)])
+            try:
+                await archive_collection.insert_many(month_buckets, ordered=False)
+            except BulkWriteError as e:
+                # Buckets copied by an interrupted run keep their _id
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+
+    def _write_file(self, batch_id: str, buckets: List[Dict[str, Any]]) -> None:
+        by_month = defaultdict(list)
+        for bucket in buckets:
+            bucket.pop("archiving", None)
+            by_month[f"{bucket['bucket_start']:%Y_%m}"].append(bucket)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for month, month_buckets in by_month.items():
+            # One file per batch and month; a replayed batch simply rewrites it
+            path = os.path.join(self.archive_dir, f"email_logs_{month}_{batch_id}.jsonl.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as archive_file:
+                for bucket in month_buckets:
+                    archive_file.write(json.dumps(bucket, default=str) + "\n")
+
+    async def claim_run(self, lease: timedelta, now: Optional[datetime] = None) -> bool:
+        """Take the archiver lease if no other process took it within ``lease``.
+
+        Every worker runs ``run_periodically``; the conditional upsert on one lease
+        document lets only the first of them archive in each interval.
+        """
+        now = now or datetime.utcnow()
+        try:
+            await MongoDB.get_collection("task_leases").find_one_and_update(
+                {"_id": ARCHIVER_LEASE_ID, "claimed_at": {"$lt": now - lease}},
+                {"$set": {"claimed_at": now, "holder": f"{socket.gethostname()}:{os.getpid()}"}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The lease exists and is still held
+            return False
+
+    async def run_periodically(self, interval_hours: float = 24) -> None:
+        """Archive once per interval across all processes for the lifetime of this one."""
+        # Slightly shorter than the interval, so the holder's next wakeup can renew it
+        lease = timedelta(hours=interval_hours * 0.9)
+        while True:
+            try:
+                if await self.claim_run(lease):
+                    await self.run()
+            except Exception as e:
+                logger.error(f"Error archiving email logs: {e}")
+            await asyncio.sleep(interval_hours * 3600)
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from fastapi import HTTPException, status
+from ..core.config import settings
+from ..db.mongodb import MongoDB
+from .contact_patch_service import contact_patch_service
+from .email_normalizer import normalize_emails
+from .file_blob_store import file_blob_store
+from .list_contact_service import attribute_name
+from .parse_service import deserialize_frame, serialize_frame
+from .parsed_file_cache import parsed_file_cache
+
+logger = logging.getLogger(__name__)
+
+# How a column is resolved when one address appears in several rows: the first or last
+# non-empty value in list order, or every distinct value joined with "; "
+MERGE_RULES = ("first", "last", "concat")
+
+def _distinct_values(values: pd.Series) -> List[str]:
+    return list(dict.fromkeys(str(value) for value in values.dropna()))
+
+def _union(first: Any, second: Any) -> List[str]:
+    """Distinct values of two "concat" cells, as lists, in order."""
+    first = first if isinstance(first, list) else []
+    second = second if isinstance(second, list) else []
+    return list(dict.fromkeys(first + second))
+
+class AudienceMerger:
+    """Unions contact lists into one audience keyed by normalized email.
+
+    Lists are merged one at a time into a running frame holding one row per distinct
+    address: each is reduced to its valid rows with normalized column names, blank cells
+    as missing and its ``email_key``, collapsed to one row per address, and then folded
+    into the running frame column by column with that column's conflict rule. Memory is
+    bounded by the distinct contacts rather than the total rows, and contacts keep the
+    order in which their address first appeared. "concat" columns are carried as lists
+    of distinct values and joined with "; " by ``result``.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, str]] = None, default_rule: str = "first"):
+        self.rules = {attribute_name(column): rule for column, rule in (rules or {}).items()}
+        self.default_rule = default_rule
+        self.input_rows = 0
+        self.invalid_rows = 0
+        self._merged: Optional[pd.DataFrame] = None
+
+    def _rule(self, column: str) -> str:
+        return "first" if column == "email" else self.rules.get(column, self.default_rule)
+
+    def add(self, df: pd.DataFrame) -> None:
+        self.input_rows += len(df)
+        df = df.rename(columns=attribute_name)
+        # "Email" and "email" in one file normalize to the same name; the first one wins
+        df = df.loc[:, ~df.columns.duplicated()]
+        if "email" not in df.columns:
+            self.invalid_rows += len(df)
+            return
+        cleanup = normalize_emails(df["email"])
+        valid = cleanup.valid.to_numpy()
+        self.invalid_rows += int((~valid).sum())
+        if not valid.any():
+            return
+
+        part = df.iloc[np.flatnonzero(valid)].reset_index(drop=True)
+        part["email"] = cleanup.emails[valid].to_numpy()
+        for column in part.columns:
+            if part[column].dtype == object:
+                blank = part[column].astype(str).str.strip() == ""
+                if blank.any():
+                    part[column] = part[column].mask(blank)
+
+        # One row per address within this list
+        groups = part.groupby(part["email"].str.lower().rename("_key"), sort=False)
+        reduced = pd.DataFrame({
+            column: groups[column].apply(_distinct_values) if self._rule(column) == "concat"
+            else groups[column].agg(self._rule(column))
+            for column in part.columns
+        })
+        self._fold(reduced)
+
+    def _fold(self, part: pd.DataFrame) -> None:
+        """Merge one list's reduced rows into the running frame."""
+        merged = self._merged
+        if merged is None:
+            self._merged = part
+            return
+        for column in part.columns:
+            incoming = part[column].reindex(merged.index)
+            current = merged[column] if column in merged.columns else pd.Series(np.nan, index=merged.index, dtype=object)
+            rule = self._rule(column)
+            if rule == "concat":
+                merged[column] = pd.Series([_union(a, b) for a, b in zip(current, incoming)], index=merged.index, dtype=object)
+            elif rule == "last":
+                merged[column] = incoming.combine_first(current)
+            else:
+                merged[column] = current.combine_first(incoming)
+        fresh = part.loc[~part.index.isin(merged.index)]
+        self._merged = pd.concat([merged, fresh], sort=False)
+
+    def result(self) -> pd.DataFrame:
+        if self._merged is None:
+            return pd.DataFrame(columns=["email"])
+        merged, self._merged = self._merged, None
+        for column in merged.columns:
+            if self._rule(column) == "concat":
+                merged[column] = [
+                    "; ".join(values) if isinstance(values, list) and values else None
+                    for values in merged[column]
+                ]
+        return merged.reset_index(drop=True)
+
+class AudienceSnapshotService:
+    """Campaign audiences frozen at creation, so every send of a campaign sees the same rows.
+
+    Multi-file campaigns are merged into one and segment campaigns take the contacts
+    matching at creation. The contacts are stored as parquet (dtypes kept) in a blob,
+    spilled to GridFS when large, and ``audience_snapshots`` records where they came
+    from. Campaigns, their resumes and retries load the snapshot (once per process
+    through the parsed-file cache) instead of the sources. A snapshot is released
+    ``AUDIENCE_SNAPSHOT_TTL_DAYS`` after it was last loaded.
+    """
+
+    def _get_collection(self):
+        return MongoDB.get_collection("audience_snapshots")
+
+    def _expires_at(self) -> datetime:
+        return datetime.utcnow() + timedelta(days=settings.AUDIENCE_SNAPSHOT_TTL_DAYS)
+
+    async def merge(self, user_id: str, file_ids: List[str], rules: Optional[Dict[str, str]] = None,
+                    default_rule: str = "first") -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """(contacts, merge summary) of the user's files merged in order; nothing is stored."""
+        files_collection = MongoDB.get_collection("files")
+        merger = AudienceMerger(rules, default_rule)
+        file_ids = list(dict.fromkeys(file_ids))
+        for file_id in file_ids:
+            file_doc = await files_collection.find_one(
+                {"_id": ObjectId(file_id), "user_id": user_id, "is_active": True},
+                {"file_data": 0}
+            ) if ObjectId.is_valid(file_id) else None
+            if not file_doc:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Contact file {file_id} not found"
+                )
+            if file_doc.get("file_type") not in ("excel", "csv"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Only Excel and CSV files can be merged"
+                )
+            try:
+                merger.add(await contact_patch_service.load_frame(file_doc))
+            except ValueError as e:
+                logger.error(f"Error parsing file {file_id} for merge: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Error reading file {file_doc['filename']}. Please check the file format."
+                )
+
+        merged = merger.result()
+        if merged.empty:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No valid email addresses found in the selected files"
+            )
+        summary = {
+            "file_ids": file_ids,
+            "rules": merger.rules,
+            "default_rule": default_rule,
+            "input_rows": merger.input_rows,
+            "invalid_rows": merger.invalid_rows,
+            "contacts": len(merged),
+            "duplicates_merged": merger.input_rows - merger.invalid_rows - len(merged)
+        }
+        logger.info(
+            f"🔗 Merged {len(file_ids)} files for user {user_id}: {merger.input_rows} rows into "
+            f"{len(merged)} contacts ({summary['duplicates_merged']} duplicates, {merger.invalid_rows} invalid)"
+        )
+        return merged, summary
+
+    async def save(self, user_id: str, df: pd.DataFrame, source: Dict[str, Any]) -> Dict[str, Any]:
+        """Store ``df`` as a new snapshot; ``source`` describes where the contacts came from."""
+        content = await asyncio.to_thread(serialize_frame, df)
+        content_hash, _ = await file_blob_store.acquire(content)
+        snapshot = {
+            **source,
+            "user_id": user_id,
+            "content_hash": content_hash,
+            "file_size": len(content),
+            "contacts": len(df),
+            "created_at": datetime.utcnow(),
+            "expires_at": self._expires_at()
+        }
+        try:
+            result = await self._get_collection().insert_one(snapshot)
+        except Exception:
+            await file_blob_store.release(content_hash)
+            raise
+        snapshot["_id"] = result.inserted_id
+        parsed_file_cache.put(("snapshot", content_hash), df)
+        return snapshot
+
+    async def load(self, snapshot_id: str, user_id: str) -> pd.DataFrame:
+        """Contacts of a snapshot; shared through the parsed-file cache and must not be modified."""
+        snapshot = await self._get_collection().find_one_and_update(
+            {"_id": ObjectId(snapshot_id), "user_id": user_id},
+            {"$set": {"expires_at": self._expires_at()}}
+        )
+        if not snapshot:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Audience snapshot not found or expired"
+            )
+        cache_key = ("snapshot", snapshot["content_hash"])
+        df = parsed_file_cache.get(cache_key)
+        if df is None:
+            content = await file_blob_store.get(snapshot["content_hash"])
+            if content is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Audience snapshot not found or expired"
+                )
+            df = await asyncio.to_thread(deserialize_frame, content)
+            parsed_file_cache.put(cache_key, df)
+        return df
+
+    async def release(self, snapshot_id: Any) -> None:
+        """Delete a snapshot and drop its blob reference."""
+        snapshot = await self._get_collection().find_one_and_delete({"_id": ObjectId(snapshot_id)})
+        if snapshot:
+            await file_blob_store.release(snapshot.get("content_hash"))
+
+    async def expire(self, now: Optional[datetime] = None) -> int:
+        """Release every snapshot past its expiry."""
+        now = now or datetime.utcnow()
+        expired = 0
+        cursor = self._get_collection().find({"expires_at": {"$lt": now}}, {"_id": 1})
+        async for snapshot in cursor:
+            await self.release(snapshot["_id"])
+            expired += 1
+        if expired:
+            logger.info(f"🗑️ Released {expired} expired audience snapshots")
+        return expired
+
+    async def run_periodically(self, interval_seconds: float = 3600) -> None:
+        """Release expired snapshots once per interval for the lifetime of the process."""
+        while True:
+            try:
+                await self.expire()
+            except Exception as e:
+                logger.error(f"Error releasing audience snapshots: {e}")
+            await asyncio.sleep(interval_seconds)
+
+audience_snapshot_service = AudienceSnapshotService()
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from bson import ObjectId
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+class CampaignPacer:
+    """Spreads one campaign's sends over a target duration and/or caps its rate.
+
+    The rate is recomputed every ``refresh_interval`` seconds as the remaining recipients
+    over the remaining time, so a campaign that fell behind catches up, then limited to
+    this campaign's share of the SES max send rate (split across every paced campaign
+    running in the process) and scaled down when the SES 24-hour headroom can't cover
+    what all paced campaigns still have to send. Slots are handed out one at a time;
+    the fair send scheduler still applies after pacing.
+    """
+
+    # Paced campaigns currently sending in this process
+    _active: Dict[str, "CampaignPacer"] = {}
+
+    def __init__(self, campaign_id: str, total: int, started_at: datetime,
+                 spread_over_minutes: Optional[int] = None, max_rate_per_minute: Optional[int] = None,
+                 quota_provider: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None,
+                 heartbeat: Optional[Callable[[], Awaitable[None]]] = None,
+                 refresh_interval: float = 30, heartbeat_interval: float = 60):
+        self.campaign_id = campaign_id
+        self.remaining = total
+        self.deadline = started_at + timedelta(minutes=spread_over_minutes) if spread_over_minutes else None
+        self.max_rate = max_rate_per_minute / 60 if max_rate_per_minute else None
+        self.quota_provider = quota_provider
+        self.heartbeat = heartbeat
+        self.refresh_interval = refresh_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.rate: Optional[float] = None
+        self._next_slot = 0.0
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def active_count(cls) -> int:
+        return len(cls._active)
+
+    def start(self) -> None:
+        CampaignPacer._active[self.campaign_id] = self
+
+    def finish(self) -> None:
+        CampaignPacer._active.pop(self.campaign_id, None)
+
+    def sent(self) -> None:
+        """Count one recipient as handled (sent, failed or skipped)."""
+        self.remaining = max(0, self.remaining - 1)
+
+    def projected_finish(self) -> Optional[datetime]:
+        if not self.rate:
+            return None
+        return datetime.utcnow() + timedelta(seconds=self.remaining / self.rate)
+
+    async def _refresh(self) -> None:
+        now = datetime.utcnow()
+        rate = float("inf")
+        if self.deadline is not None:
+            # Past the deadline the campaign only catches up as fast as the caps allow
+            seconds_left = (self.deadline - now).total_seconds()
+            if seconds_left > 0:
+                rate = self.remaining / seconds_left
+        if self.max_rate is not None:
+            rate = min(rate, self.max_rate)
+
+        if self.quota_provider is not None:
+            quota = await self.quota_provider()
+            if quota.get('success'):
+                limits = quota['quota']
+                rate = min(rate, limits['max_send_rate'] / max(1, self.active_count()))
+                headroom = max(0.0, limits['max_24_hour_send'] - limits['sent_last_24_hours'])
+                pending = sum(pacer.remaining for pacer in CampaignPacer._active.values()) or self.remaining
+                if headroom < pending:
+                    # Share what's left of the rolling 24-hour quota across the day
+                    rate = min(rate, headroom / 86400 * self.remaining / pending)
+
+        if rate == float("inf"):
+            rate = None
+        if rate != self.rate:
+            if rate == 0:
+                logger.info(f"🐢 Campaign {self.campaign_id} paused: no SES 24-hour quota left, {self.remaining} to send")
+            else:
+                logger.info(f"🐢 Campaign {self.campaign_id} paced at {rate * 60 if rate else 0:.1f}/min, {self.remaining} left")
+        self.rate = rate
+        self._refreshed_at = time.monotonic()
+        await self._save()
+
+    async def _save(self) -> None:
+        try:
+            await MongoDB.get_collection("campaigns").update_one(
+                {"_id": ObjectId(self.campaign_id)},
+                {"$set": {
+                    "pacing.rate_per_minute": self.rate * 60 if self.rate is not None else None,
+                    "pacing.projected_finish_at": self.projected_finish(),
+                    "pacing.updated_at": datetime.utcnow()
+                }}
+            )
+        except Exception as e:
+            logger.error(f"Error saving pacing for campaign {self.campaign_id}: {e}")
+
+    async def wait(self) -> None:
+        """Wait for this campaign's next send slot."""
+        async with self._lock:
+            if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                await self._refresh()
+            # Out of SES headroom: hold the campaign until a refresh finds some
+            while self.rate == 0:
+                await asyncio.sleep(max(0.0, self._refreshed_at + self.refresh_interval - time.monotonic()))
+                if self.heartbeat is not None:
+                    await self.heartbeat()
+                await self._refresh()
+            if self.rate is None:
+                return
+            now = time.monotonic()
+            # A slow pace can leave minutes between sends; keep the campaign looking alive
+            while self._next_slot - time.monotonic() > self.heartbeat_interval and self.heartbeat is not None:
+                await asyncio.sleep(self.heartbeat_interval)
+                await self.heartbeat()
+            if self._next_slot > time.monotonic():
+                await asyncio.sleep(self._next_slot - time.monotonic())
+            self._next_slot = max(now, self._next_slot) + 1 / self.rate
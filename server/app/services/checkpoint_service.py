@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+import pandas as pd
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+def audience_fingerprint(df: pd.DataFrame) -> str:
+    """Hash of a campaign audience's recipients in row order.
+
+    Checkpoint bitmaps are positional, so a resume or retry is only valid while every
+    row still holds the same address; edits to other columns don't move anyone.
+    """
+    column = df["email"] if "email" in df.columns else df
+    hashed = pd.util.hash_pandas_object(column.astype(str), index=False)
+    return hashlib.sha256(hashed.to_numpy().tobytes()).hexdigest()
+
+class CampaignCheckpoint:
+    """Per-campaign progress: a sent/failed bitmap over file rows plus a contiguous row offset."""
+
+    def __init__(self, campaign_id: str, total_rows: int, sent_bitmap: Optional[bytes] = None,
+                 failed_bitmap: Optional[bytes] = None, flush_every: int = 100,
+                 flush_interval: float = 5.0, fingerprint: Optional[str] = None):
+        self.campaign_id = campaign_id
+        self.total_rows = total_rows
+        self.fingerprint = fingerprint
+        size = (total_rows + 7) // 8
+        self.sent = bytearray(sent_bitmap) if sent_bitmap else bytearray(size)
+        self.failed = bytearray(failed_bitmap) if failed_bitmap else bytearray(size)
+        self.row_offset = 0
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+        self._advance_offset()
+
+    @staticmethod
+    def _test(bitmap: bytearray, index: int) -> bool:
+        return bool(bitmap[index >> 3] & (1 << (index & 7)))
+
+    def is_sent(self, row_index: int) -> bool:
+        return self._test(self.sent, row_index)
+
+    def is_failed(self, row_index: int) -> bool:
+        return self._test(self.failed, row_index)
+
+    def is_done(self, row_index: int) -> bool:
+        """Check if a row was already attempted (sent or failed)."""
+        if row_index < self.row_offset:
+            return True
+        return self.is_sent(row_index) or self.is_failed(row_index)
+
+    def mark(self, row_index: int, success: bool) -> None:
+        """Record the outcome for a row."""
+        bit = 1 << (row_index & 7)
+        if success:
+            self.sent[row_index >> 3] |= bit
+            self.failed[row_index >> 3] &= ~bit
+        else:
+            self.failed[row_index >> 3] |= bit
+        self._dirty += 1
+        if row_index == self.row_offset:
+            self._advance_offset()
+
+    def _advance_offset(self) -> None:
+        while self.row_offset < self.total_rows and (
+            self.is_sent(self.row_offset) or self.is_failed(self.row_offset)
+        ):
+            self.row_offset += 1
+
+    @property
+    def sent_count(self) -> int:
+        return sum(bin(b).count("1") for b in self.sent)
+
+    @property
+    def failed_count(self) -> int:
+        return sum(bin(b).count("1") for b in self.failed)
+
+    def failed_rows(self):
+        """Yield the row indices whose last attempt failed."""
+        for byte_index, byte in enumerate(self.failed):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield byte_index * 8 + bit
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """Whether ``df`` has the rows this checkpoint was recorded against."""
+        if len(df) != self.total_rows:
+            return False
+        # Checkpoints written before fingerprints can only be checked by size
+        return self.fingerprint is None or audience_fingerprint(df) == self.fingerprint
+
+    def should_flush(self) -> bool:
+        if not self._dirty:
+            return False
+        return (self._dirty >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "campaign_id": self.campaign_id,
+            "total_rows": self.total_rows,
+            "fingerprint": self.fingerprint,
+            "row_offset": self.row_offset,
+            "sent_bitmap": bytes(self.sent),
+            "failed_bitmap": bytes(self.failed),
+            "sent_count": self.sent_count,
+            "failed_count": self.failed_count,
+            "updated_at": datetime.utcnow()
+        }
+
+class CheckpointService:
+    def __init__(self, stale_after_seconds: int = 120):
+        self.stale_after = timedelta(seconds=stale_after_seconds)
+
+    def _get_checkpoints_collection(self):
+        """Get campaign checkpoints collection."""
+        return MongoDB.get_collection("campaign_checkpoints")
+
+    async def create(self, campaign_id: str, audience: pd.DataFrame) -> CampaignCheckpoint:
+        """Create an empty checkpoint for a new campaign run over ``audience``."""
+        checkpoint = CampaignCheckpoint(campaign_id, len(audience), fingerprint=audience_fingerprint(audience))
+        await self.save(checkpoint)
+        return checkpoint
+
+    async def load(self, campaign_id: str) -> Optional[CampaignCheckpoint]:
+        """Load the persisted checkpoint for a campaign."""
+        doc = await self._get_checkpoints_collection().find_one({"campaign_id": campaign_id})
+        if not doc:
+            return None
+        return CampaignCheckpoint(
+            campaign_id,
+            doc["total_rows"],
+            sent_bitmap=doc.get("sent_bitmap"),
+            failed_bitmap=doc.get("failed_bitmap"),
+            fingerprint=doc.get("fingerprint")
+        )
+
+    async def save(self, checkpoint: CampaignCheckpoint) -> None:
+        """Persist the checkpoint bitmaps and offset."""
+        try:
+            await self._get_checkpoints_collection().update_one(
+                {"campaign_id": checkpoint.campaign_id},
+                {"$set": checkpoint.to_document()},
+                upsert=True
+            )
+            checkpoint._dirty = 0
+            checkpoint._last_flush = time.monotonic()
+        except Exception as e:
+            # A missed flush only widens the resume window; don't break sending
+            logger.error(f"Error saving checkpoint for campaign {checkpoint.campaign_id}: {e}")
+
+    async def maybe_save(self, checkpoint: CampaignCheckpoint) -> None:
+        """Persist the checkpoint if enough rows or time have passed since the last flush."""
+        if checkpoint.should_flush():
+            await self.save(checkpoint)
+
+    async def is_stale(self, campaign_id: str) -> bool:
+        """Check whether the run owning this checkpoint has stopped flushing."""
+        doc = await self._get_checkpoints_collection().find_one(
+            {"campaign_id": campaign_id},
+            {"updated_at": 1}
+        )
+        if not doc or not doc.get("updated_at"):
+            return True
+        return datetime.utcnow() - doc["updated_at"] > self.stale_after
+
+    async def mark_interrupted_campaigns(self) -> int:
+        """Flag campaigns stuck in 'sending' whose checkpoint stopped updating."""
+        try:
+            campaigns_collection = MongoDB.get_collection("campaigns")
+            cutoff = datetime.utcnow() - self.stale_after
+            interrupted = 0
+            async for campaign in campaigns_collection.find({"status": "sending"}, {"_id": 1}):
+                doc = await self._get_checkpoints_collection().find_one(
+                    {"campaign_id": str(campaign["_id"])},
+                    {"updated_at": 1}
+                )
+                if doc and doc.get("updated_at") and doc["updated_at"] > cutoff:
+                    continue
+                await campaigns_collection.update_one(
+                    {"_id": campaign["_id"], "status": "sending"},
+                    {"$set": {"status": "interrupted", "updated_at": datetime.utcnow()}}
+                )
+                interrupted += 1
+            if interrupted:
+                logger.info(f"Marked {interrupted} stale campaigns as interrupted")
+            return interrupted
+        except Exception as e:
+            logger.error(f"Error marking interrupted campaigns: {e}")
+            return 0
@@ -0,0 +1,405 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from bson import ObjectId
+from pymongo import ReturnDocument
+from fastapi import HTTPException, status
+from ..core.config import settings
+from ..db.mongodb import MongoDB
+from .parse_service import parse_service, deserialize_frame, serialize_frame
+from .parsed_file_cache import parsed_file_cache
+from .file_blob_store import file_blob_store, get_file_bytes
+from .list_contact_service import list_contact_service
+
+logger = logging.getLogger(__name__)
+
+PATCHABLE_FILE_TYPES = ("excel", "csv")
+
+def has_edits(file_doc: Dict[str, Any]) -> bool:
+    """Whether a file's contents differ from its stored bytes (pending or compacted row patches)."""
+    return bool(file_doc.get("snapshot_hash")) or file_doc.get("patch_seq", 0) > file_doc.get("compacted_seq", 0)
+
+def apply_patches(df: pd.DataFrame, patches: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Replay patch documents (in seq order) over a frame indexed by row id."""
+    inserted: Dict[int, Dict[str, Any]] = {}
+    updates: Dict[int, Dict[str, Any]] = {}
+    deleted = set()
+    for patch in patches:
+        row_id = patch["row_id"]
+        values = patch.get("values") or {}
+        if patch["op"] == "insert":
+            inserted[row_id] = dict(values)
+        elif patch["op"] == "update":
+            if row_id in inserted:
+                inserted[row_id].update(values)
+            elif row_id not in deleted:
+                updates.setdefault(row_id, {}).update(values)
+        elif inserted.pop(row_id, None) is None:
+            deleted.add(row_id)
+            updates.pop(row_id, None)
+
+    # Patch values are keyed by column name as shown in the preview
+    labels = {str(column): column for column in df.columns}
+    df = df.copy()
+    for values in (*updates.values(), *inserted.values()):
+        for name in values:
+            if name not in labels:
+                labels[name] = name
+                df[name] = None
+
+    changes: Dict[Any, Dict[int, Any]] = {}
+    for row_id, values in updates.items():
+        for name, value in values.items():
+            changes.setdefault(labels[name], {})[row_id] = value
+    for column, values in changes.items():
+        rows = [row_id for row_id in values if row_id in df.index]
+        if not rows:
+            continue
+        if df[column].dtype != object:
+            df[column] = df[column].astype(object)
+        df.loc[rows, column] = [values[row_id] for row_id in rows]
+
+    if deleted:
+        df = df.drop(index=[row_id for row_id in deleted if row_id in df.index])
+    if inserted:
+        rows = pd.DataFrame(
+            [{labels[name]: value for name, value in values.items()} for values in inserted.values()],
+            index=list(inserted.keys()),
+            columns=df.columns
+        )
+        df = pd.concat([df, rows.astype(object)])
+    return df
+
+class ContactPatchService:
+    """Row-level edits to contact files, kept as an append-only log over the parsed data.
+
+    A row id is the row's position in the file as last written (``base_version``);
+    inserted rows get ids past the end. Every operation is a ``file_patches`` document
+    with a per-file ``seq``. Readers get the parsed file with the log replayed on top,
+    and the replay is cached next to the parse and extended with only the new patches,
+    so an edit is one small write instead of re-encoding the whole workbook. Compaction
+    folds the log in the background into a parquet snapshot of the edited frame
+    (``snapshot_hash``), which keeps dtypes and row ids; the uploaded bytes are never
+    rewritten, and the original format is only produced on export. Only replacing the
+    whole file renumbers rows and bumps ``base_version``.
+    """
+
+    def __init__(self, compact_after: Optional[int] = None, idle_seconds: Optional[int] = None):
+        self.compact_after = compact_after or settings.FILE_PATCH_COMPACT_AFTER
+        self.idle_seconds = idle_seconds or settings.FILE_PATCH_COMPACT_IDLE_SECONDS
+
+    def _get_files_collection(self):
+        return MongoDB.get_collection("files")
+
+    def _get_patches_collection(self):
+        return MongoDB.get_collection("file_patches")
+
+    async def _base_frame(self, file_doc: Dict[str, Any]) -> Tuple[tuple, pd.DataFrame]:
+        """(cache key, frame) of the file's last compacted snapshot, else of its parsed bytes."""
+        cache_key = parsed_file_cache.key(file_doc)
+        df = parsed_file_cache.get(cache_key)
+        if df is None and file_doc.get("snapshot_hash"):
+            snapshot = await file_blob_store.get(file_doc["snapshot_hash"])
+            if snapshot is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File data not found"
+                )
+            df = await asyncio.to_thread(deserialize_frame, snapshot)
+            parsed_file_cache.put(cache_key, df)
+        elif df is None:
+            file_data = await get_file_bytes(file_doc)
+            if not file_data:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File data not found"
+                )
+            df = await parse_service.read_table(file_data, file_doc["file_type"])
+            parsed_file_cache.put(cache_key, df)
+        return cache_key, df
+
+    async def replay(self, file_doc: Dict[str, Any]) -> Tuple[tuple, Optional[int], pd.DataFrame]:
+        """(cache key, seq, frame) of a file with its pending patches applied.
+
+        ``file_doc`` is the file document without ``file_data``. The frame is indexed by
+        row id; seq is None when no patches are pending. Parse errors raise ValueError.
+        """
+        cache_key, df = await self._base_frame(file_doc)
+        compacted = file_doc.get("compacted_seq", 0)
+        target = file_doc.get("patch_seq", 0)
+        if target <= compacted:
+            return cache_key, None, df
+
+        seq = compacted
+        cached = parsed_file_cache.get_patched(cache_key, str(file_doc["_id"]))
+        if cached is not None:
+            seq, df = cached
+            if seq >= target:
+                return cache_key, seq, df
+
+        patches = await self._get_patches_collection().find(
+            {"file_id": str(file_doc["_id"]), "seq": {"$gt": seq, "$lte": target}}
+        ).sort("seq", 1).to_list(length=None)
+        # Only replay an unbroken run; operations still being written are picked up next time
+        run = []
+        for patch in patches:
+            if patch["seq"] != seq + len(run) + 1:
+                break
+            run.append(patch)
+        if run:
+            df = apply_patches(df, run)
+            seq = run[-1]["seq"]
+            parsed_file_cache.put_patched(cache_key, str(file_doc["_id"]), seq, df)
+        return cache_key, (seq if seq > compacted else None), df
+
+    async def load_frame(self, file_doc: Dict[str, Any]) -> pd.DataFrame:
+        """Current contacts of a file, with positional rows; shared and must not be modified."""
+        _, _, df = await self.replay(file_doc)
+        return df if df.index.equals(pd.RangeIndex(len(df))) else df.reset_index(drop=True)
+
+    async def apply(self, file_id: str, user_id: str, operations: List[Dict[str, Any]],
+                    base_version: int) -> Dict[str, Any]:
+        """Append row operations to a file's patch log."""
+        try:
+            files_collection = self._get_files_collection()
+            if not ObjectId.is_valid(file_id):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid file ID"
+                )
+            file_doc = await files_collection.find_one(
+                {"_id": ObjectId(file_id), "user_id": user_id, "is_active": True},
+                {"file_data": 0}
+            )
+            if not file_doc:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="File not found"
+                )
+            if file_doc.get("file_type") not in PATCHABLE_FILE_TYPES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File type not supported for updates"
+                )
+            version = file_doc.get("base_version", 0)
+            if base_version != version:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="The file has been rewritten since it was loaded. Reload it to get current row ids."
+                )
+
+            for operation in operations:
+                if operation["op"] != "insert" and operation.get("row_id") is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"'{operation['op']}' operations need a row_id"
+                    )
+                if operation["op"] != "delete" and not operation.get("values"):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"'{operation['op']}' operations need values"
+                    )
+
+            try:
+                _, _, df = await self.replay(file_doc)
+            except ValueError as e:
+                logger.error(f"Error parsing file {file_id} for patching: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Error processing file. Please check the file format."
+                )
+            referenced = [operation["row_id"] for operation in operations if operation["op"] != "insert"]
+            unknown = sorted(set(referenced) - set(df.index[df.index.isin(referenced)]))
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Unknown row ids: {', '.join(str(row_id) for row_id in unknown[:20])}"
+                )
+
+            if "next_row_id" not in file_doc:
+                # First edit since the file was last written: new rows start after the base rows
+                _, base = await self._base_frame(file_doc)
+                await files_collection.update_one(
+                    {"_id": file_doc["_id"], "next_row_id": {"$exists": False}},
+                    {"$set": {"next_row_id": len(base), "base_version": version}}
+                )
+
+            inserts = sum(1 for operation in operations if operation["op"] == "insert")
+            deletes = sum(1 for operation in operations if operation["op"] == "delete")
+            updated = await files_collection.find_one_and_update(
+                {"_id": file_doc["_id"], "base_version": version},
+                {
+                    "$inc": {"patch_seq": len(operations), "next_row_id": inserts, "contacts_count": inserts - deletes},
+                    "$set": {"patched_at": datetime.utcnow()}
+                },
+                projection={"patch_seq": 1, "next_row_id": 1, "contacts_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="The file has been rewritten since it was loaded. Reload it to get current row ids."
+                )
+
+            seq = updated["patch_seq"] - len(operations)
+            next_row_id = updated["next_row_id"] - inserts
+            now = datetime.utcnow()
+            patches = []
+            inserted_row_ids = []
+            for operation in operations:
+                seq += 1
+                row_id = operation.get("row_id")
+                if operation["op"] == "insert":
+                    row_id = next_row_id
+                    next_row_id += 1
+                    inserted_row_ids.append(row_id)
+                patches.append({
+                    "file_id": file_id,
+                    "seq": seq,
+                    "op": operation["op"],
+                    "row_id": row_id,
+                    "values": operation.get("values"),
+                    "created_at": now
+                })
+            await self._get_patches_collection().insert_many(patches)
+            if file_doc.get("processed"):
+                await self._refresh_list_contacts(
+                    {**file_doc, "patch_seq": updated["patch_seq"]},
+                    [patch["row_id"] for patch in patches]
+                )
+
+            logger.info(f"📝 Patched file {file_id}: {len(operations)} row operations (seq {updated['patch_seq']})")
+            return {
+                "file_id": file_id,
+                "message": "File updated successfully",
+                "base_version": version,
+                "patch_seq": updated["patch_seq"],
+                "applied": len(operations),
+                "inserted_row_ids": inserted_row_ids,
+                "contacts_count": updated.get("contacts_count")
+            }
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error patching file {file_id}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"File update failed: {str(e)}"
+            )
+
+    async def _refresh_list_contacts(self, file_doc: Dict[str, Any], row_ids: List[int]) -> None:
+        # Segments are derived data; a failure here must not fail the edit
+        try:
+            _, _, df = await self.replay(file_doc)
+            await list_contact_service.refresh_rows(file_doc, df, sorted(set(row_ids)))
+        except Exception as e:
+            logger.error(f"Error refreshing contacts of file {file_doc['_id']}: {e}")
+
+    async def export(self, file_id: str, user_id: str) -> Tuple[Dict[str, Any], bytes]:
+        """(file document, bytes) of the file in its original format with pending patches applied."""
+        files_collection = self._get_files_collection()
+        if not ObjectId.is_valid(file_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid file ID"
+            )
+        file_doc = await files_collection.find_one(
+            {"_id": ObjectId(file_id), "user_id": user_id, "is_active": True},
+            {"file_data": 0}
+        )
+        if not file_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found"
+            )
+        if not has_edits(file_doc):
+            return file_doc, await get_file_bytes(file_doc)
+        try:
+            _, _, df = await self.replay(file_doc)
+        except ValueError as e:
+            logger.error(f"Error parsing file {file_id} for export: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Error processing file. Please check the file format."
+            )
+        return file_doc, await parse_service.write_table(df.reset_index(drop=True), file_doc["file_type"])
+
+    async def compact(self, file_id: str) -> bool:
+        """Fold a file's pending patches into its snapshot; False if there was nothing to do or it raced an edit."""
+        files_collection = self._get_files_collection()
+        file_doc = await files_collection.find_one({"_id": ObjectId(file_id), "is_active": True}, {"file_data": 0})
+        if not file_doc:
+            return False
+        target = file_doc.get("patch_seq", 0)
+        if target <= file_doc.get("compacted_seq", 0):
+            return False
+        _, seq, df = await self.replay(file_doc)
+        if seq != target:
+            # Some operations of the last edit are still being written
+            return False
+
+        # The frame keeps its row ids and dtypes, so readers and clients see no change
+        snapshot = await asyncio.to_thread(serialize_frame, df)
+        snapshot_hash, _ = await file_blob_store.acquire(snapshot)
+        result = await files_collection.update_one(
+            {"_id": file_doc["_id"], "patch_seq": target, "base_version": file_doc.get("base_version", 0)},
+            {"$set": {
+                "snapshot_hash": snapshot_hash,
+                "contacts_count": len(df),
+                "compacted_seq": target,
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        if result.modified_count == 0:
+            await file_blob_store.release(snapshot_hash)
+            return False
+        parsed_file_cache.put(("snapshot", snapshot_hash), df)
+        await file_blob_store.release(file_doc.get("snapshot_hash"))
+        await self._get_patches_collection().delete_many({"file_id": file_id, "seq": {"$lte": target}})
+        logger.info(f"🗜️ Compacted {target - file_doc.get('compacted_seq', 0)} row patches into file {file_id}")
+        return True
+
+    async def discard(self, file_id: str, through_seq: int) -> None:
+        """Drop a file's patches up to ``through_seq`` after its contents were replaced wholesale."""
+        await self._get_patches_collection().delete_many({"file_id": file_id, "seq": {"$lte": through_seq}})
+
+    async def compact_pending(self, now: Optional[datetime] = None) -> int:
+        """Compact every file with enough pending patches or no edits for a while."""
+        now = now or datetime.utcnow()
+        pending = {"$subtract": ["$patch_seq", {"$ifNull": ["$compacted_seq", 0]}]}
+        cursor = self._get_files_collection().find(
+            {
+                "patched_at": {"$exists": True},
+                "is_active": True,
+                "$expr": {"$and": [
+                    {"$gt": [pending, 0]},
+                    {"$or": [
+                        {"$gte": [pending, self.compact_after]},
+                        {"$lt": ["$patched_at", now - timedelta(seconds=self.idle_seconds)]}
+                    ]}
+                ]}
+            },
+            {"_id": 1}
+        )
+        compacted = 0
+        async for file_doc in cursor:
+            try:
+                if await self.compact(str(file_doc["_id"])):
+                    compacted += 1
+            except Exception as e:
+                logger.error(f"Error compacting file {file_doc['_id']}: {e}")
+        return compacted
+
+    async def run_periodically(self, interval_seconds: float = 60) -> None:
+        """Compact pending patch logs once per interval for the lifetime of the process."""
+        while True:
+            try:
+                await self.compact_pending()
+            except Exception as e:
+                logger.error(f"Error compacting file patches: {e}")
+            await asyncio.sleep(interval_seconds)
+
+contact_patch_service = ContactPatchService()
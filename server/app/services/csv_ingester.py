@@ -0,0 +1,197 @@
+import codecs
+import csv
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Header cells that mark the start of a contact table
+HEADER_KEYWORDS = {'name', 'email', 'e-mail', 'contact', 'phone', 'address', 'first_name', 'last_name'}
+
+# A header-like row this many rows after the previous one starts a second table
+SECTION_GAP = 5
+
+# Bytes looked at to detect the encoding and dialect
+SAMPLE_BYTES = 64 * 1024
+
+def iter_chunks(data: bytes, chunk_size: int) -> Iterator[memoryview]:
+    """``data`` in slices of ``chunk_size`` bytes, without copying."""
+    view = memoryview(data)
+    for offset in range(0, len(data), chunk_size):
+        yield view[offset:offset + chunk_size]
+
+def detect_encoding(sample: bytes) -> str:
+    """Encoding of a CSV from its first bytes: BOM, then UTF-8, else Windows-1252."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the end of the sample is still UTF-8
+        if e.start < len(sample) - 3:
+            return 'cp1252'
+    return 'utf-8'
+
+def detect_dialect(sample: str):
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t|')
+    except csv.Error:
+        return csv.excel
+
+def progress_document(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Ingestion progress as stored on the file document under ``processing``."""
+    done = totals["bytes_processed"] >= totals["total_bytes"] or totals["multiple_sections"]
+    return {
+        "status": "completed" if done else "processing",
+        "percent": round(totals["bytes_processed"] / totals["total_bytes"] * 100, 1) if totals["total_bytes"] else 100.0,
+        **totals,
+        "updated_at": datetime.utcnow()
+    }
+
+def classify_row(row: List[str], header_names: set) -> str:
+    """'skip' (comment or empty line), 'blank', 'header' (header-like) or 'data'."""
+    if not row or row[0].lstrip().startswith('#'):
+        return 'skip'
+    joined = ''.join(row)
+    if not joined.strip():
+        return 'blank'
+    # Rows carrying an address are data; only the rest are compared against header names
+    if '@' in joined:
+        return 'data'
+    cells = {cell.strip().lower() for cell in row}
+    if cells & HEADER_KEYWORDS or cells == header_names:
+        return 'header'
+    return 'data'
+
+class CSVIngester:
+    """Single-pass, bounded-memory CSV validation.
+
+    The file, as bytes or as chunks streamed from storage, is decoded chunk by chunk with
+    an incremental decoder and fed line by line into one ``csv.reader``, so neither the
+    decoded text nor the rows are ever held in full. Encoding and dialect are detected
+    from the first ``SAMPLE_BYTES``. Rows are counted and
+    checked as they stream past, and a second header-like row well after the first marks
+    the file as containing multiple data sections. ``on_progress`` is called with the
+    running totals at most every ``progress_interval`` seconds.
+    """
+
+    def __init__(self, chunk_size: int = 1 << 20, progress_interval: float = 1.0, email_batch_size: int = 10000):
+        self.chunk_size = chunk_size
+        self.progress_interval = progress_interval
+        self.email_batch_size = email_batch_size
+
+    def _lines(self, chunks: Iterable[bytes], encoding: str, totals: Dict[str, Any],
+               on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[str]:
+        """Decoded lines of byte ``chunks``."""
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        pending = ''
+        processed = 0
+        last_report = time.monotonic()
+        for chunk in chunks:
+            lines = (pending + decoder.decode(chunk)).splitlines(keepends=True)
+            # The last line may continue in the next chunk
+            pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+            yield from lines
+            processed += len(chunk)
+            totals['bytes_processed'] = processed
+            if on_progress is not None and time.monotonic() - last_report >= self.progress_interval:
+                on_progress(dict(totals))
+                last_report = time.monotonic()
+        yield from (pending + decoder.decode(b'', True)).splitlines(keepends=True)
+
+    def ingest(self, source: Union[bytes, Iterable[bytes]],
+               on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+               on_emails: Optional[Callable[[List[str]], None]] = None,
+               total_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Validate and count a CSV file; returns the detected format and row totals.
+
+        ``source`` is the file's bytes or an iterable of byte chunks (``total_bytes`` then
+        sizes the progress percentage). With ``on_emails`` the email cell of every data row
+        is handed over in batches of ``email_batch_size``, so callers can check addresses
+        as they stream past.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            total_bytes = len(source)
+            chunks = iter_chunks(source, self.chunk_size)
+        else:
+            # Re-slice whatever the source yields so decoding works on bounded chunks
+            chunks = (part for chunk in source for part in iter_chunks(chunk, self.chunk_size))
+        # Peek at the start for detection, then replay it ahead of the rest
+        head, head_size = [], 0
+        for chunk in chunks:
+            head.append(chunk)
+            head_size += len(chunk)
+            if head_size >= SAMPLE_BYTES:
+                break
+        sample = b''.join(head)[:SAMPLE_BYTES]
+        chunks = itertools.chain(head, chunks)
+
+        encoding = detect_encoding(sample)
+        dialect = detect_dialect(sample.decode(encoding, errors='ignore'))
+        totals: Dict[str, Any] = {
+            "total_bytes": total_bytes or 0,
+            "bytes_processed": 0,
+            "encoding": encoding,
+            "delimiter": dialect.delimiter,
+            "quotechar": dialect.quotechar or '"',
+            "columns": [],
+            "rows": 0,
+            "non_empty_rows": 0,
+            "valid_emails": 0,
+            "malformed_rows": 0,
+            "multiple_sections": False
+        }
+
+        header: Optional[List[str]] = None
+        header_names = set()
+        email_column = None
+        last_header_row = 0
+        emails: List[str] = []
+        for row in csv.reader(self._lines(chunks, encoding, totals, on_progress), dialect):
+            kind = classify_row(row, header_names)
+            if kind == 'skip':
+                continue
+            if header is None:
+                if kind == 'blank':
+                    continue
+                header = [cell.strip() for cell in row]
+                header_names = {name.lower() for name in header if name}
+                totals["columns"] = header
+                if 'email' in header_names:
+                    email_column = [name.lower() for name in header].index('email')
+                continue
+
+            totals["rows"] += 1
+            if kind == 'blank':
+                continue
+            if kind == 'header':
+                # A repeated header (or a new one) more than a few rows on starts a second table
+                if totals["rows"] - last_header_row > SECTION_GAP:
+                    totals["multiple_sections"] = True
+                    break
+                last_header_row = totals["rows"]
+                continue
+
+            totals["non_empty_rows"] += 1
+            if len(row) != len(header):
+                totals["malformed_rows"] += 1
+            if email_column is not None and email_column < len(row) and '@' in row[email_column]:
+                totals["valid_emails"] += 1
+            if on_emails is not None and email_column is not None:
+                emails.append(row[email_column] if email_column < len(row) else '')
+                if len(emails) >= self.email_batch_size:
+                    on_emails(emails)
+                    emails = []
+
+        if emails:
+            on_emails(emails)
+        if not totals["multiple_sections"]:
+            totals["total_bytes"] = totals["bytes_processed"] = max(totals["total_bytes"], totals["bytes_processed"])
+        if on_progress is not None:
+            on_progress(dict(totals))
+        return totals
@@ -11,6 +11,7 @@ except ImportError:
 import io
 from ..db.mongodb import MongoDB
 from ..models.customer import CustomerCreate, Customer
+from .parse_service import parse_service
 
 logger = logging.getLogger(__name__)
 
@@ -40,9 +41,9 @@ class CustomerService:
             
             # Determine file type and read accordingly
             if file.filename.endswith('.xlsx'):
-                df = pd.read_excel(io.BytesIO(content))
+                df = await parse_service.read_table(content, 'excel')
             elif file.filename.endswith('.csv'):
-                df = pd.read_csv(io.BytesIO(content))
+                df = await parse_service.read_table(content, 'csv')
             else:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
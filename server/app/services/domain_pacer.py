@@ -0,0 +1,105 @@
+import asyncio
+import time
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def parse_domain_rates(spec: str) -> Dict[str, float]:
+    """Parse a ``domain:rate,domain:rate`` setting into a dict."""
+    rates = {}
+    for item in (spec or "").split(","):
+        if ":" not in item:
+            continue
+        domain, rate = item.rsplit(":", 1)
+        try:
+            rates[domain.strip().lower()] = float(rate)
+        except ValueError:
+            logger.warning(f"Ignoring invalid domain send rate: {item}")
+    return rates
+
+class DomainLane:
+    """Recipients of one mailbox domain, paced at that domain's rate."""
+
+    def __init__(self, domain: str, rate: float):
+        self.domain = domain
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.rate = rate
+        self.emails = deque()
+        self.next_at = 0.0
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.paced_wait = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+class DomainPacer:
+    """Shards a campaign's recipients by domain and interleaves them across paced lanes.
+
+    ``next`` always hands out the email from the lane that may send soonest, so one
+    throttled provider never holds up the others; the SES-wide rate is still enforced
+    by the send scheduler afterwards.
+    """
+
+    def __init__(self, emails: List[Dict], domain_rates: Optional[Dict[str, float]] = None,
+                 default_rate: Optional[float] = None):
+        self.domain_rates = domain_rates if domain_rates is not None else parse_domain_rates(settings.DOMAIN_SEND_RATES)
+        self.default_rate = default_rate if default_rate is not None else settings.DEFAULT_DOMAIN_SEND_RATE
+        self.lanes: Dict[str, DomainLane] = {}
+        for email in emails:
+            domain = email['email'].rsplit('@', 1)[-1].strip().lower()
+            lane = self.lanes.get(domain)
+            if lane is None:
+                lane = DomainLane(domain, self.domain_rates.get(domain, self.default_rate))
+                self.lanes[domain] = lane
+            lane.emails.append(email)
+            lane.total += 1
+
+    async def next(self) -> Optional[Tuple[DomainLane, Dict]]:
+        """Reserve and wait for the next paced send, or return None when all lanes are drained."""
+        lane = None
+        for candidate in self.lanes.values():
+            if candidate.emails and (lane is None or candidate.next_at < lane.next_at):
+                lane = candidate
+        if lane is None:
+            return None
+
+        # Reserve the slot before sleeping so concurrent workers pick other lanes
+        now = time.monotonic()
+        send_at = max(now, lane.next_at)
+        lane.next_at = send_at + lane.interval
+        email = lane.emails.popleft()
+        if lane.started_at is None:
+            lane.started_at = send_at
+
+        if send_at > now:
+            lane.paced_wait += send_at - now
+            await asyncio.sleep(send_at - now)
+        return lane, email
+
+    def record(self, lane: DomainLane, success: bool) -> None:
+        """Record the outcome of a send made from a lane."""
+        if success:
+            lane.sent += 1
+        else:
+            lane.failed += 1
+        lane.finished_at = time.monotonic()
+
+    def get_stats(self) -> List[Dict]:
+        """Per-domain lane stats, largest lanes first."""
+        stats = []
+        for lane in sorted(self.lanes.values(), key=lambda l: l.total, reverse=True):
+            duration = (lane.finished_at - lane.started_at) if lane.started_at and lane.finished_at else 0.0
+            stats.append({
+                "domain": lane.domain,
+                "rate_limit": lane.rate,
+                "total": lane.total,
+                "sent": lane.sent,
+                "failed": lane.failed,
+                "paced_wait_seconds": round(lane.paced_wait, 3),
+                "duration_seconds": round(duration, 3)
+            })
+        return stats
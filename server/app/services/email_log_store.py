@@ -0,0 +1,299 @@
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Any, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from ..core.config import settings
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+# Entry fields are single letters: each bucket holds hundreds of them
+ENTRY_FIELDS = {
+    "r": "to_email",
+    "s": "status",
+    "m": "message_id",
+    "t": "sent_at",
+    "c": "error_code",
+    "x": "error_message",
+    "d": "delivery_status"
+}
+
+def bucket_floor(moment: datetime, bucket_minutes: Optional[int] = None) -> datetime:
+    """Start of the log bucket containing ``moment``."""
+    bucket_minutes = bucket_minutes or settings.EMAIL_LOG_BUCKET_MINUTES
+    minutes = moment.hour * 60 + moment.minute
+    start = minutes - minutes % bucket_minutes
+    return moment.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0)
+
+def make_bucket_entry(to_email: str, status: str, sent_at: datetime, message_id: Optional[str] = None,
+                      error_code: Optional[str] = None, error_message: Optional[str] = None) -> Dict[str, Any]:
+    """Compact bucket entry; empty fields are left out."""
+    entry = {"r": to_email, "s": status, "t": sent_at}
+    if message_id:
+        entry["m"] = message_id
+    if error_code:
+        entry["c"] = error_code
+    if error_message:
+        entry["x"] = error_message
+    return entry
+
+class EmailLogStore:
+    """Single access point for per-recipient send logs.
+
+    Logs are stored bucketed in ``email_log_buckets``: one document per (user, campaign,
+    sender, subject, time bucket) carrying the shared fields once plus a capped array of
+    compact per-recipient entries and running ``sent``/``failed`` totals. Buckets older
+    than the hot horizon are moved out by ``EmailLogArchiver`` and only their daily
+    summaries remain, so readers add ``email_log_summaries`` to the hot counts; quota also
+    counts legacy ``email_logs`` documents that have not been migrated yet. Writers
+    (the SES send path), readers (quota, usage, campaign analytics) and SES feedback all
+    go through this class.
+    """
+
+    def _get_collection(self):
+        """Get email log buckets collection."""
+        return MongoDB.get_collection("email_log_buckets")
+
+    def _get_summaries_collection(self):
+        """Get daily summaries of archived email logs."""
+        return MongoDB.get_collection("email_log_summaries")
+
+    async def log(self, user_id: str, to_email: str, sender_email: str, subject: Optional[str],
+                  message_id: Optional[str] = None, status: str = 'sent',
+                  error_code: Optional[str] = None, error_message: Optional[str] = None,
+                  campaign_id: Optional[str] = None) -> bool:
+        """Append one send attempt to the current bucket, opening a new bucket when it is full."""
+        collection = self._get_collection()
+        if collection is None:
+            logger.warning("Email logs collection not available, skipping email logging")
+            return False
+        sent_at = datetime.utcnow()
+        result = await collection.update_one(
+            {
+                "user_id": str(user_id),
+                "campaign_id": campaign_id,
+                "sender_email": sender_email,
+                "subject": subject or "No Subject",
+                "bucket_start": bucket_floor(sent_at),
+                "count": {"$lt": settings.EMAIL_LOG_BUCKET_SIZE}
+            },
+            {
+                "$push": {"entries": make_bucket_entry(
+                    to_email, status, sent_at, message_id, error_code, error_message
+                )},
+                "$inc": {"count": 1, "sent": int(status == 'sent'), "failed": int(status == 'failed')}
+            },
+            upsert=True
+        )
+        return bool(result.modified_count or result.upserted_id)
+
+    async def count_sent(self, user_id: str, period_start: datetime, period_end: datetime) -> int:
+        """Successful sends by a user within a billing period.
+
+        Buckets entirely inside the period contribute their ``sent`` total; only the
+        buckets straddling the period edges are filtered entry by entry.
+        """
+        collection = self._get_collection()
+        if collection is None:
+            return 0
+        bucket_span = timedelta(minutes=settings.EMAIL_LOG_BUCKET_MINUTES)
+        pipeline = [
+            {"$match": {
+                "user_id": user_id,
+                "bucket_start": {"$gte": bucket_floor(period_start), "$lt": period_end}
+            }},
+            {"$project": {"sent": {"$cond": [
+                {"$and": [
+                    {"$gte": ["$bucket_start", period_start]},
+                    {"$lte": ["$bucket_start", period_end - bucket_span]}
+                ]},
+                "$sent",
+                {"$size": {"$filter": {
+                    "input": "$entries",
+                    "cond": {"$and": [
+                        {"$eq": ["$$this.s", "sent"]},
+                        {"$gte": ["$$this.t", period_start]},
+                        {"$lt": ["$$this.t", period_end]}
+                    ]}
+                }}}
+            ]}}},
+            {"$group": {"_id": None, "sent": {"$sum": "$sent"}}}
+        ]
+        result = await collection.aggregate(pipeline).to_list(length=1)
+        hot_sent = result[0]["sent"] if result else 0
+
+        # Days moved out by the archiver only survive as daily summaries; a day the period
+        # only partly covers counts in proportion to the covered part
+        day_ms = 24 * 60 * 60 * 1000
+        archived = await self._get_summaries_collection().aggregate([
+            {"$match": {
+                "user_id": user_id,
+                "day": {"$gte": period_start.replace(hour=0, minute=0, second=0, microsecond=0), "$lt": period_end}
+            }},
+            {"$project": {"sent": {"$multiply": [
+                {"$ifNull": ["$totals.sent", 0]},
+                {"$divide": [
+                    {"$subtract": [
+                        {"$min": [{"$add": ["$day", day_ms]}, period_end]},
+                        {"$max": ["$day", period_start]}
+                    ]},
+                    day_ms
+                ]}
+            ]}}},
+            {"$group": {"_id": None, "sent": {"$sum": "$sent"}}}
+        ]).to_list(length=1)
+        archived_sent = round(archived[0]["sent"]) if archived else 0
+
+        # Logs written before bucketing stay in email_logs until scripts/migrate_email_logs.py moves them
+        legacy_sent = await MongoDB.get_collection("email_logs").count_documents({
+            "user_id": user_id,
+            "sent_at": {"$gte": period_start, "$lt": period_end},
+            "status": "sent"
+        })
+        return hot_sent + archived_sent + legacy_sent
+
+    async def campaign_analytics(self, campaign_id: str) -> Dict[str, Any]:
+        """Sent/failed totals, error-code and delivery breakdowns and sends per minute.
+
+        One aggregation over the campaign's buckets via the (campaign_id, bucket_start) index.
+        """
+        pipeline = [
+            {"$match": {"campaign_id": campaign_id}},
+            {"$facet": {
+                "totals": [
+                    {"$group": {"_id": None, "sent": {"$sum": "$sent"}, "failed": {"$sum": "$failed"}}}
+                ],
+                "by_error_code": [
+                    {"$match": {"failed": {"$gt": 0}}},
+                    {"$unwind": "$entries"},
+                    {"$match": {"entries.s": "failed"}},
+                    {"$group": {"_id": {"$ifNull": ["$entries.c", "Unknown"]}, "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}}
+                ],
+                "by_delivery_status": [
+                    {"$unwind": "$entries"},
+                    {"$match": {"entries.d": {"$ne": None}}},
+                    {"$group": {"_id": "$entries.d", "count": {"$sum": 1}}}
+                ],
+                "per_minute": [
+                    {"$unwind": "$entries"},
+                    {"$group": {
+                        "_id": {"$dateToString": {"format": "%Y-%m-%dT%H:%M:00Z", "date": "$entries.t"}},
+                        "sent": {"$sum": {"$cond": [{"$eq": ["$entries.s", "sent"]}, 1, 0]}},
+                        "failed": {"$sum": {"$cond": [{"$eq": ["$entries.s", "failed"]}, 1, 0]}}
+                    }},
+                    {"$sort": {"_id": 1}}
+                ]
+            }}
+        ]
+        facets = (await self._get_collection().aggregate(pipeline).to_list(length=1))[0]
+
+        totals = facets["totals"][0] if facets["totals"] else {}
+        analytics = {
+            "sent": totals.get("sent", 0),
+            "failed": totals.get("failed", 0),
+            "error_codes": {item["_id"]: item["count"] for item in facets["by_error_code"]},
+            "delivery": {item["_id"]: item["count"] for item in facets["by_delivery_status"]},
+            "sends_per_minute": [
+                {"minute": item["_id"], "sent": item["sent"], "failed": item["failed"]}
+                for item in facets["per_minute"]
+            ]
+        }
+
+        # Archived days only keep daily totals; per-minute detail stays with the hot logs
+        async for summary in self._get_summaries_collection().find({"campaign_id": campaign_id}):
+            analytics["sent"] += summary.get("totals", {}).get("sent", 0)
+            analytics["failed"] += summary.get("totals", {}).get("failed", 0)
+            for field in ("error_codes", "delivery"):
+                for key, count in summary.get(field, {}).items():
+                    analytics[field][key] = analytics[field].get(key, 0) + count
+        return analytics
+
+    async def monthly_usage(self, user_id: str, since: datetime) -> List[Dict[str, Any]]:
+        """Sent/failed per calendar month from ``since``, combining hot logs and archived summaries."""
+        months: Dict[str, Dict[str, int]] = {}
+
+        def add(month: str, sent: int, failed: int) -> None:
+            totals = months.setdefault(month, {"sent": 0, "failed": 0})
+            totals["sent"] += sent
+            totals["failed"] += failed
+
+        async for item in self._get_collection().aggregate([
+            {"$match": {"user_id": user_id, "bucket_start": {"$gte": since}}},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m", "date": "$bucket_start"}},
+                "sent": {"$sum": "$sent"},
+                "failed": {"$sum": "$failed"}
+            }}
+        ]):
+            add(item["_id"], item["sent"], item["failed"])
+
+        async for item in self._get_summaries_collection().aggregate([
+            {"$match": {"user_id": user_id, "day": {"$gte": since}}},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m", "date": "$day"}},
+                "sent": {"$sum": "$totals.sent"},
+                "failed": {"$sum": "$totals.failed"}
+            }}
+        ]):
+            add(item["_id"], item["sent"], item["failed"])
+
+        return [{"month": month, **totals} for month, totals in sorted(months.items())]
+
+    async def iter_campaign_entries(self, campaign_id: str, archive_months: Iterable[str] = (),
+                                    batch_size: int = 200) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a campaign's log entries expanded to full field names, oldest bucket first.
+
+        ``archive_months`` ("YYYY_MM") adds the matching monthly archive collections. Only
+        one cursor batch of buckets is held in memory at a time.
+        """
+        collection_names = [f"email_log_archive_{month}" for month in archive_months]
+        collection_names.append("email_log_buckets")
+        projection = {"sender_email": 1, "entries": 1, "_id": 0}
+        for collection_name in collection_names:
+            cursor = MongoDB.get_collection(collection_name).find(
+                {"campaign_id": campaign_id},
+                projection
+            ).sort("bucket_start", 1).batch_size(batch_size)
+            async for bucket in cursor:
+                for entry in bucket.get("entries", []):
+                    expanded = {name: entry.get(key) for key, name in ENTRY_FIELDS.items()}
+                    expanded["sender_email"] = bucket.get("sender_email")
+                    yield expanded
+
+    async def find_by_message_ids(self, message_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Owner, campaign and delivery status of logged sends, keyed by SES message id."""
+        pipeline = [
+            {"$match": {"entries.m": {"$in": message_ids}}},
+            {"$unwind": "$entries"},
+            {"$match": {"entries.m": {"$in": message_ids}}},
+            {"$project": {
+                "user_id": 1,
+                "campaign_id": 1,
+                "message_id": "$entries.m",
+                "delivery_status": "$entries.d"
+            }}
+        ]
+        return {
+            log["message_id"]: log
+            async for log in self._get_collection().aggregate(pipeline)
+        }
+
+    async def set_delivery_statuses(self, updates: Iterable[Tuple[Dict[str, Any], str, Optional[str]]]) -> int:
+        """Apply (log, delivery_status, detail) updates from ``find_by_message_ids`` in bulk."""
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": log["_id"], "entries.m": log["message_id"]},
+                {"$set": {
+                    "entries.$.d": delivery_status,
+                    "entries.$.dd": detail,
+                    "entries.$.du": now
+                }}
+            )
+            for log, delivery_status, detail in updates
+        ]
+        if not operations:
+            return 0
+        result = await self._get_collection().bulk_write(operations, ordered=False)
+        return result.modified_count
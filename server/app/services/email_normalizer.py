@@ -0,0 +1,125 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+
+# Practical address syntax: dot-atom local part of at most 64 characters, dotted hostname
+# with a 2+ letter TLD, at most 254 characters overall
+EMAIL_PATTERN = re.compile(
+    r"(?=.{1,254}$)(?=[^@]{1,64}@)"
+    r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,63}"
+)
+
+MAX_EXAMPLES = 10
+
+@dataclass
+class EmailCleanup:
+    """Per-row results of ``normalize_emails``, aligned positionally with the input."""
+    emails: pd.Series       # trimmed, domain lowercased; "" where blank
+    valid: pd.Series        # syntactically valid
+    duplicate: pd.Series    # valid, but an earlier row has the same address
+
+    @property
+    def sendable(self) -> pd.Series:
+        return self.valid & ~self.duplicate
+
+    def report(self) -> Dict[str, Any]:
+        """Counts (and a few examples) as stored on the file under ``email_quality``."""
+        blank = self.emails == ""
+        invalid = ~self.valid & ~blank
+        return {
+            "total_rows": int(len(self.emails)),
+            "valid_emails": int(self.sendable.sum()),
+            "invalid_emails": int(invalid.sum()),
+            "duplicate_emails": int(self.duplicate.sum()),
+            "blank_emails": int(blank.sum()),
+            "invalid_examples": self.emails[invalid].head(MAX_EXAMPLES).tolist(),
+            "duplicate_examples": self.emails[self.duplicate].drop_duplicates().head(MAX_EXAMPLES).tolist(),
+            "checked_at": datetime.utcnow()
+        }
+
+def _lower_domain(email: str) -> str:
+    at = email.rfind("@")
+    return email[:at] + email[at:].lower()
+
+def normalize_emails(values: pd.Series) -> EmailCleanup:
+    """Trim, lowercase the domain, validate and flag repeats of a column of addresses.
+
+    String work is done once per distinct value with vectorized operations and mapped
+    back through the factorized codes. Repeats are matched case-insensitively and the
+    first occurrence is kept.
+    """
+    codes, uniques = pd.factorize(values.reset_index(drop=True).fillna(""))
+    distinct = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    lowered = distinct.str.lower()
+
+    # Only addresses with capitals can need their domain rewritten
+    emails = distinct.to_numpy(copy=True)
+    mixed_case = np.flatnonzero(emails != lowered.to_numpy())
+    if len(mixed_case):
+        emails[mixed_case] = [_lower_domain(email) for email in emails[mixed_case]]
+    # Validity doesn't depend on case
+    valid = lowered.str.fullmatch(EMAIL_PATTERN).to_numpy()
+    # Distinct spellings of one address (" Bob@" / "bob@") share a key
+    keys = pd.factorize(lowered)[0]
+
+    row_valid = pd.Series(valid[codes])
+    duplicate = pd.Series(keys[codes]).duplicated() & row_valid
+    return EmailCleanup(emails=pd.Series(emails[codes]), valid=row_valid, duplicate=duplicate)
+
+class EmailQualityCounter:
+    """``EmailCleanup.report`` built up batch by batch, for addresses streamed from a file.
+
+    Each batch is normalized with ``normalize_emails``; repeats across batches are found
+    through a sorted array of 64-bit hashes of the addresses seen so far, so memory grows
+    by 8 bytes per distinct address rather than with the file.
+    """
+
+    def __init__(self):
+        self.total_rows = 0
+        self.valid_emails = 0
+        self.invalid_emails = 0
+        self.duplicate_emails = 0
+        self.blank_emails = 0
+        self.invalid_examples: List[str] = []
+        self.duplicate_examples: List[str] = []
+        self._seen = np.empty(0, dtype=np.uint64)
+
+    def add(self, values: pd.Series) -> None:
+        cleanup = normalize_emails(values)
+        emails = cleanup.emails
+        valid = cleanup.valid.to_numpy()
+        blank = (emails == "").to_numpy()
+        hashes = pd.util.hash_array(emails.str.lower().to_numpy(dtype=object))
+        duplicate = cleanup.duplicate.to_numpy() | (valid & np.isin(hashes, self._seen))
+        invalid = ~valid & ~blank
+
+        self.total_rows += len(emails)
+        self.valid_emails += int((valid & ~duplicate).sum())
+        self.invalid_emails += int(invalid.sum())
+        self.duplicate_emails += int(duplicate.sum())
+        self.blank_emails += int(blank.sum())
+        self._seen = np.union1d(self._seen, hashes[valid & ~duplicate])
+
+        if len(self.invalid_examples) < MAX_EXAMPLES:
+            self.invalid_examples += emails[invalid].head(MAX_EXAMPLES - len(self.invalid_examples)).tolist()
+        for email in emails[duplicate].drop_duplicates():
+            if len(self.duplicate_examples) >= MAX_EXAMPLES:
+                break
+            if email not in self.duplicate_examples:
+                self.duplicate_examples.append(email)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "total_rows": self.total_rows,
+            "valid_emails": self.valid_emails,
+            "invalid_emails": self.invalid_emails,
+            "duplicate_emails": self.duplicate_emails,
+            "blank_emails": self.blank_emails,
+            "invalid_examples": self.invalid_examples,
+            "duplicate_examples": self.duplicate_examples,
+            "checked_at": datetime.utcnow()
+        }
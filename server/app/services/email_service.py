@@ -3,6 +3,7 @@ import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from ..core.config import settings
+from .tracking_service import read_open_token, tracking_recorder
 
 class EmailService:
     async def send_email(self, to_email: str, subject: str, body: str):
@@ -32,5 +33,9 @@ class EmailService:
         pass
 
     async def track_email_open(self, email_id: str):
-        # Implementation for email tracking
-        pass
+        """Record an open for a tracking token; returns False for invalid tokens."""
+        decoded = read_open_token(email_id)
+        if decoded is None:
+            return False
+        tracking_recorder.record_open(*decoded)
+        return True
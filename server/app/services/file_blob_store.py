@@ -0,0 +1,146 @@
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from fastapi import HTTPException, status, UploadFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Larger blobs (edit snapshots, merged audiences) go to GridFS instead of the document,
+# which Mongo caps at 16MB
+INLINE_BLOB_LIMIT = 8 << 20
+
+class FileBlobStore:
+    """Content-addressed storage for uploaded file bytes.
+
+    Each distinct content is stored once in ``file_blobs`` under its SHA-256 with a
+    ``ref_count`` of the file documents pointing at it (``content_hash``). Uploading a
+    file that is already stored only bumps the count, and because the parsed-file cache
+    is keyed by content hash the copy also shares the earlier parse. Blobs over
+    ``INLINE_BLOB_LIMIT`` keep their bytes in the ``blob_chunks`` GridFS bucket.
+    """
+
+    def _get_collection(self):
+        return MongoDB.get_collection("file_blobs")
+
+    def _get_bucket(self) -> AsyncIOMotorGridFSBucket:
+        return AsyncIOMotorGridFSBucket(MongoDB.database, bucket_name="blob_chunks")
+
+    @staticmethod
+    async def read_upload(file: UploadFile, max_size: int) -> Tuple[bytes, str]:
+        """(content, sha256 hex) of an upload, hashed chunk by chunk as it is read."""
+        digest = hashlib.sha256()
+        content = bytearray()
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            content += chunk
+            if len(content) > max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"File size exceeds maximum limit of {max_size // (1024*1024)}MB"
+                )
+            digest.update(chunk)
+        return bytes(content), digest.hexdigest()
+
+    async def acquire(self, data: bytes, content_hash: Optional[str] = None) -> Tuple[str, bool]:
+        """Reference ``data``, storing it if it's new; returns (content hash, was it already stored)."""
+        content_hash = content_hash or hashlib.sha256(data).hexdigest()
+        blobs = self._get_collection()
+        for _ in range(2):
+            result = await blobs.update_one({"_id": content_hash}, {"$inc": {"ref_count": 1}})
+            if result.matched_count:
+                return content_hash, True
+            blob = {"_id": content_hash, "size": len(data), "ref_count": 1, "created_at": datetime.utcnow()}
+            if len(data) > INLINE_BLOB_LIMIT:
+                blob["gridfs_id"] = await self._get_bucket().upload_from_stream(content_hash, data)
+            else:
+                blob["data"] = data
+            try:
+                await blobs.insert_one(blob)
+                return content_hash, False
+            except DuplicateKeyError:
+                # Stored by a concurrent upload of the same content; count this reference on it
+                if "gridfs_id" in blob:
+                    await self._get_bucket().delete(blob["gridfs_id"])
+                continue
+        raise RuntimeError(f"Could not store file blob {content_hash}")
+
+    async def release(self, content_hash: Optional[str]) -> None:
+        """Drop one reference, deleting the blob with its last one."""
+        if not content_hash:
+            return
+        blobs = self._get_collection()
+        await blobs.update_one({"_id": content_hash}, {"$inc": {"ref_count": -1}})
+        deleted = await blobs.find_one_and_delete(
+            {"_id": content_hash, "ref_count": {"$lte": 0}}, projection={"gridfs_id": 1}
+        )
+        if deleted:
+            if deleted.get("gridfs_id") is not None:
+                await self._get_bucket().delete(deleted["gridfs_id"])
+            logger.info(f"🗑️ Deleted unreferenced file blob {content_hash[:12]}")
+
+    async def get(self, content_hash: str) -> Optional[bytes]:
+        blob = await self._get_collection().find_one({"_id": content_hash}, {"data": 1, "gridfs_id": 1})
+        if not blob:
+            return None
+        if blob.get("gridfs_id") is not None:
+            stream = await self._get_bucket().open_download_stream(blob["gridfs_id"])
+            return await stream.read()
+        return blob["data"]
+
+    async def stream(self, content_hash: str) -> AsyncIterator[bytes]:
+        """Stored bytes chunk by chunk; GridFS blobs are never read into memory whole."""
+        blob = await self._get_collection().find_one({"_id": content_hash}, {"data": 1, "gridfs_id": 1})
+        if not blob:
+            return
+        if blob.get("gridfs_id") is None:
+            yield blob["data"]
+            return
+        stream = await self._get_bucket().open_download_stream(blob["gridfs_id"])
+        while True:
+            chunk = await stream.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+file_blob_store = FileBlobStore()
+
+async def get_file_bytes(file_doc: Dict[str, Any]) -> Optional[bytes]:
+    """Stored bytes of a file document, which may be projected without ``file_data``.
+
+    Files uploaded before content hashing keep their bytes inline in ``file_data``.
+    """
+    if file_doc.get("file_data"):
+        return file_doc["file_data"]
+    if "content_hash" not in file_doc:
+        file_doc = await MongoDB.get_collection("files").find_one(
+            {"_id": file_doc["_id"]}, {"file_data": 1, "content_hash": 1}
+        ) or {}
+        if file_doc.get("file_data"):
+            return file_doc["file_data"]
+    if file_doc.get("content_hash"):
+        return await file_blob_store.get(file_doc["content_hash"])
+    return None
+
+async def stream_file_bytes(file_doc: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """``get_file_bytes`` chunk by chunk, streaming blobs stored in GridFS."""
+    if file_doc.get("file_data"):
+        yield file_doc["file_data"]
+        return
+    if "content_hash" not in file_doc:
+        file_doc = await MongoDB.get_collection("files").find_one(
+            {"_id": file_doc["_id"]}, {"file_data": 1, "content_hash": 1}
+        ) or {}
+        if file_doc.get("file_data"):
+            yield file_doc["file_data"]
+            return
+    if file_doc.get("content_hash"):
+        async for chunk in file_blob_store.stream(file_doc["content_hash"]):
+            yield chunk
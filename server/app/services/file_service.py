@@ -1,13 +1,22 @@
 import os
 import uuid
+import asyncio
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 from bson import ObjectId
+from pymongo import ReturnDocument
 import io
 import logging
 from fastapi import HTTPException, status, UploadFile
 from ..db.mongodb import MongoDB
 from ..models.file import FileCreate, FileUpdate, FileInDB, FileResponse
+from .parse_service import parse_service
+from .csv_ingester import CSVIngester, progress_document
+from .parsed_file_cache import parsed_file_cache
+from .contact_patch_service import contact_patch_service, has_edits
+from .file_blob_store import file_blob_store, get_file_bytes, stream_file_bytes
+from .email_normalizer import EmailQualityCounter, normalize_emails
+from .list_contact_service import list_contact_service
 
 # Excel processing imports
 try:
@@ -54,41 +63,47 @@ class FileService:
                     detail=f"File type not allowed. Allowed types: {', '.join(self.allowed_extensions)}"
                 )
 
-            # Read file content
-            file_content = await file.read()
-            
-            # Validate file size after reading
-            if len(file_content) > self.max_file_size:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"File size exceeds maximum limit of {self.max_file_size // (1024*1024)}MB"
-                )
+            # Read file content, hashing it as it streams in (size is checked per chunk)
+            file_content, content_hash = await file_blob_store.read_upload(file, self.max_file_size)
             
             # Determine file type
             file_type = self._get_file_type(file.filename)
 
-            # Create file document with user isolation
-            file_data = FileCreate(
-                filename=file.filename,
-                file_type=file_type,
-                file_size=len(file_content),
-                description=description,
-                user_id=user_id,  # 🔒 CRITICAL: User isolation
-                file_data=file_content  # Store as raw bytes
-            )
+            # Identical content is stored once; a re-upload only adds a reference
+            content_hash, duplicate = await file_blob_store.acquire(file_content, content_hash)
 
-            file_dict = file_data.dict()
-            file_dict["upload_date"] = datetime.utcnow()
-            file_dict["is_active"] = True
-            file_dict["processed"] = False
+            # The reference belongs to the file document; give it back if that is never written
+            try:
+                # Create file document with user isolation
+                file_data = FileCreate(
+                    filename=file.filename,
+                    file_type=file_type,
+                    file_size=len(file_content),
+                    description=description,
+                    user_id=user_id,  # 🔒 CRITICAL: User isolation
+                    content_hash=content_hash
+                )
 
-            # Insert file into database
-            result = await files_collection.insert_one(file_dict)
+                file_dict = file_data.dict()
+                file_dict["upload_date"] = datetime.utcnow()
+                file_dict["is_active"] = True
+                file_dict["processed"] = False
+                if duplicate:
+                    file_dict.update(await self._processed_artifacts(user_id, content_hash, file_type))
+
+                # Insert file into database
+                result = await files_collection.insert_one(file_dict)
+            except Exception:
+                await file_blob_store.release(content_hash)
+                raise
             
             # Get the created file
             created_file = await files_collection.find_one({"_id": result.inserted_id})
+            if created_file.get("processed") and file_type in ("excel", "csv"):
+                # Processed by reuse, so its contacts go to segments now
+                await self._materialize_contacts(created_file)
             
-            logger.info(f"✅ File uploaded successfully for user {user_id}: {file.filename} (ID: {result.inserted_id})")
+            logger.info(f"✅ File uploaded successfully for user {user_id}: {file.filename} (ID: {result.inserted_id}{', duplicate content' if duplicate else ''})")
             
             return FileResponse(
                 id=str(created_file["_id"]),
@@ -112,6 +127,30 @@ class FileService:
                 detail=f"File upload failed: {str(e)}"
             )
 
+    async def _processed_artifacts(self, user_id: str, content_hash: str, file_type: str) -> Dict[str, Any]:
+        """Processing results of the user's earlier unedited file with the same content, if any.
+
+        Blobs are shared across accounts, processing state is not: only the uploader's own
+        files are considered, so an upload never reveals what other accounts hold.
+        """
+        sibling = await self._get_files_collection().find_one(
+            {
+                "user_id": user_id,  # 🔒 User isolation
+                "content_hash": content_hash,
+                "file_type": file_type,
+                "processed": True,
+                "snapshot_hash": {"$exists": False},
+                "$expr": {"$lte": [{"$ifNull": ["$patch_seq", 0]}, {"$ifNull": ["$compacted_seq", 0]}]}
+            },
+            {"contacts_count": 1, "processing": 1}
+        )
+        if not sibling:
+            return {}
+        artifacts = {"processed": True, "contacts_count": sibling.get("contacts_count")}
+        if sibling.get("processing"):
+            artifacts["processing"] = sibling["processing"]
+        return artifacts
+
     async def verify_file_ownership(self, file_id: str, user_id: str) -> bool:
         """Verify that a file belongs to the specified user."""
         try:
@@ -298,20 +337,24 @@ class FileService:
                     detail="Invalid file ID"
                 )
 
-            result = await files_collection.update_one(
+            deleted = await files_collection.find_one_and_update(
                 {
                     "_id": ObjectId(file_id),
                     "user_id": user_id,
                     "is_active": True
                 },
-                {"$set": {"is_active": False}}
+                {"$set": {"is_active": False}},
+                projection={"content_hash": 1, "snapshot_hash": 1}
             )
 
-            if result.matched_count == 0:
+            if deleted is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="File not found"
                 )
+            await file_blob_store.release(deleted.get("content_hash"))
+            await file_blob_store.release(deleted.get("snapshot_hash"))
+            await list_contact_service.remove_list(file_id)
 
             return {"message": "File deleted successfully"}
         except HTTPException:
@@ -334,16 +377,16 @@ class FileService:
 
             # Get file data from database
             file_doc = await files_collection.find_one({"_id": ObjectId(file_id)})
-            file_data = file_doc["file_data"]
 
             # Process based on file type
             contacts_count = 0
             if file.file_type == "excel":
-                contacts_count = await self._process_excel_file(file_data)
+                contacts_count = await self._process_excel_file(await get_file_bytes(file_doc), file_id)
             elif file.file_type == "pdf":
-                contacts_count = await self._process_pdf_file(file_data)
+                contacts_count = await self._process_pdf_file(await get_file_bytes(file_doc))
             elif file.file_type == "csv":
-                contacts_count = await self._process_csv_file(file_data)
+                # Streamed from storage rather than loaded whole
+                contacts_count = await self._process_csv_file(file_doc, file_id)
             else:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -351,12 +394,21 @@ class FileService:
                 )
 
             # Update file as processed
-            await files_collection.update_one(
+            processed = await files_collection.find_one_and_update(
                 {"_id": ObjectId(file_id)},
-                {"$set": {"processed": True, "contacts_count": contacts_count}}
+                {"$set": {"processed": True, "contacts_count": contacts_count}},
+                projection={"email_quality": 1},
+                return_document=ReturnDocument.AFTER
             )
 
-            return {"message": "File processed successfully", "contacts_count": contacts_count}
+            if file.file_type in ("excel", "csv"):
+                await self._materialize_contacts(file_doc)
+
+            return {
+                "message": "File processed successfully",
+                "contacts_count": contacts_count,
+                "email_quality": (processed or {}).get("email_quality")
+            }
 
         except HTTPException:
             raise
@@ -367,15 +419,27 @@ class FileService:
                 detail=f"File processing failed: {str(e)}"
             )
 
-    async def preview_file(self, file_id: str, user_id: str) -> dict:
-        """Preview the data from a file."""
+    async def preview_file(self, file_id: str, user_id: str, offset: Optional[int] = None,
+                           limit: Optional[int] = None, columns: Optional[List[str]] = None,
+                           sort: Optional[str] = None) -> dict:
+        """Preview the data from a file.
+
+        Without paging parameters every row is returned, as before; with any of them a
+        single page is served (see ``_preview_page``).
+        """
+        if offset is not None or limit is not None or columns or sort:
+            return await self._preview_page(file_id, user_id, offset or 0, limit or 100, columns, sort)
         try:
             files_collection = self._get_files_collection()
             file = await self.get_file_by_id(file_id, user_id)
             
             # Get file data from database
             file_doc = await files_collection.find_one({"_id": ObjectId(file_id)})
-            file_data = file_doc["file_data"]
+            
+            # Row edits only exist in the patch log and its compacted snapshot
+            if has_edits(file_doc):
+                return await self._preview_page(file_id, user_id, 0, None, None, None)
+            file_data = await get_file_bytes(file_doc)
 
             # Process file if not already processed
             if not file.processed:
@@ -404,6 +468,8 @@ class FileService:
                                 "updated_at": datetime.utcnow()
                             }}
                         )
+                        if file.file_type in ("excel", "csv"):
+                            await self._materialize_contacts(file_doc)
                     
                     return {
                         "contacts": contacts,
@@ -485,24 +551,47 @@ class FileService:
                 )
             
             # Update the file document in database
+            patch_state = await files_collection.find_one(
+                {"_id": ObjectId(file_id)}, {"patch_seq": 1, "content_hash": 1, "snapshot_hash": 1}
+            )
+            content_hash, _ = await file_blob_store.acquire(updated_file_data)
             update_fields = {
-                "file_data": updated_file_data,
+                "content_hash": content_hash,
+                "file_size": len(updated_file_data),
                 "contacts_count": len(update_data["contacts"]),
                 "processed": True,
-                "updated_at": datetime.utcnow()
+                "updated_at": datetime.utcnow(),
+                # The new contents replace any pending row patches and their row ids
+                "compacted_seq": (patch_state or {}).get("patch_seq", 0)
             }
             
-            result = await files_collection.update_one(
-                {"_id": ObjectId(file_id)},
-                {"$set": update_fields}
-            )
+            try:
+                result = await files_collection.update_one(
+                    {"_id": ObjectId(file_id)},
+                    {
+                        "$set": update_fields,
+                        "$inc": {"base_version": 1},
+                        "$unset": {"next_row_id": "", "processing": "", "file_data": "", "snapshot_hash": ""}
+                    }
+                )
+            except Exception:
+                await file_blob_store.release(content_hash)
+                raise
             
             if result.matched_count == 0:
+                await file_blob_store.release(content_hash)
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="File not found"
                 )
             
+            await file_blob_store.release((patch_state or {}).get("content_hash"))
+            await file_blob_store.release((patch_state or {}).get("snapshot_hash"))
+            await contact_patch_service.discard(file_id, update_fields["compacted_seq"])
+            await self._materialize_contacts(
+                {"_id": ObjectId(file_id), "user_id": user_id},
+                pd.DataFrame(update_data["contacts"])
+            )
             logger.info(f"✅ File {file_id} updated successfully")
             
             # Return the updated preview data
@@ -642,28 +731,15 @@ class FileService:
                 # If it's neither string nor bytes, raise error
                 raise ValueError(f"Invalid file data type: {type(file_data)}")
             
-            excel_buffer = io.BytesIO(file_data)
-            
             try:
-                # Try reading with openpyxl engine first
-                logger.info("Attempting to read Excel file with openpyxl engine")
-                df = pd.read_excel(excel_buffer, engine='openpyxl')
-                logger.info("Successfully read Excel file with openpyxl engine")
-            except Exception as e1:
-                logger.warning(f"Failed to read Excel with openpyxl: {e1}")
-                try:
-                    # Reset buffer position
-                    excel_buffer.seek(0)
-                    # Try reading with xlrd engine for older .xls files
-                    logger.info("Attempting to read Excel file with xlrd engine")
-                    df = pd.read_excel(excel_buffer, engine='xlrd')
-                    logger.info("Successfully read Excel file with xlrd engine")
-                except Exception as e2:
-                    logger.error(f"Failed to read Excel with both engines: openpyxl error: {e1}, xlrd error: {e2}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Error processing Excel file. Please ensure it's a valid Excel file."
-                    )
+                # Parsed in the worker pool (openpyxl, falling back to xlrd for .xls)
+                df = await parse_service.read_table(file_data, 'excel')
+            except ValueError as e:
+                logger.error(f"Failed to read Excel with both engines: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Error processing Excel file. Please ensure it's a valid Excel file."
+                )
             
             # Validate the data
             if df.empty:
@@ -684,22 +760,7 @@ class FileService:
                     )
                 
                 # Clean up the data
-                cleaned_contacts = []
-                for contact in contacts:
-                    # Remove NaN values and convert to appropriate types
-                    cleaned_contact = {}
-                    for key, value in contact.items():
-                        if pd.isna(value) or pd.isnull(value):
-                            cleaned_contact[key] = ""
-                        elif isinstance(value, (int, float)):
-                            # Handle integer values without decimal places
-                            if isinstance(value, float) and value.is_integer():
-                                cleaned_contact[key] = str(int(value))
-                            else:
-                                cleaned_contact[key] = str(value)
-                        else:
-                            cleaned_contact[key] = str(value).strip()
-                    cleaned_contacts.append(cleaned_contact)
+                cleaned_contacts = self._clean_contacts(contacts)
                 
                 logger.info(f"Successfully processed Excel file with {len(cleaned_contacts)} contacts")
                 return cleaned_contacts
@@ -720,6 +781,103 @@ class FileService:
                 detail=f"Error processing Excel file: {str(e)}"
             )
 
+    @staticmethod
+    def _clean_contacts(contacts: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Render parsed rows as strings: blanks for NaN, no trailing .0 on whole numbers."""
+        cleaned_contacts = []
+        for contact in contacts:
+            # Remove NaN values and convert to appropriate types
+            cleaned_contact = {}
+            for key, value in contact.items():
+                if pd.isna(value) or pd.isnull(value):
+                    cleaned_contact[key] = ""
+                elif isinstance(value, (int, float)):
+                    # Handle integer values without decimal places
+                    if isinstance(value, float) and value.is_integer():
+                        cleaned_contact[key] = str(int(value))
+                    else:
+                        cleaned_contact[key] = str(value)
+                else:
+                    cleaned_contact[key] = str(value).strip()
+            cleaned_contacts.append(cleaned_contact)
+        return cleaned_contacts
+
+    async def _preview_page(self, file_id: str, user_id: str, offset: int, limit: Optional[int],
+                            columns: Optional[List[str]], sort: Optional[str]) -> dict:
+        """One page of a file's rows from the parsed-file cache.
+
+        The file is parsed once per version; each page is a positional slice (through a
+        cached sort order when ``sort`` is given, "-column" for descending), so only the
+        rows on the page are converted for the response. Pending row patches are applied
+        and each row's id is returned in ``row_ids`` for later edits.
+        """
+        files_collection = self._get_files_collection()
+        file_doc = await files_collection.find_one(
+            {"_id": ObjectId(file_id), "user_id": user_id, "is_active": True},
+            {"file_data": 0}
+        )
+        if not file_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="File not found"
+            )
+        if file_doc.get("file_type") not in ("excel", "csv"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Paginated preview is only available for Excel and CSV files"
+            )
+
+        try:
+            cache_key, seq, df = await contact_patch_service.replay(file_doc)
+        except ValueError as e:
+            logger.error(f"Error parsing file {file_id} for preview: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Error processing file. Please check the file format."
+            )
+
+        available_columns = [str(column) for column in df.columns]
+        selected = columns or available_columns
+        unknown = [column for column in selected + ([sort.lstrip("-")] if sort else []) if column not in available_columns]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown columns: {', '.join(unknown)}"
+            )
+        positions = {column: index for index, column in enumerate(available_columns)}
+
+        if sort:
+            order = parsed_file_cache.sort_order(
+                cache_key, df.columns[positions[sort.lstrip("-")]], sort.startswith("-"),
+                (file_id, seq) if seq is not None else None
+            )
+            rows = order[offset:offset + limit if limit is not None else None]
+        else:
+            rows = slice(offset, offset + limit if limit is not None else None)
+        page = df.iloc[rows, [positions[column] for column in selected]]
+        page.columns = selected
+
+        if not file_doc.get("processed"):
+            await files_collection.update_one(
+                {"_id": file_doc["_id"]},
+                {"$set": {"processed": True, "contacts_count": len(df)}}
+            )
+            await self._materialize_contacts(file_doc, df)
+
+        return {
+            "contacts": self._clean_contacts(page.to_dict('records')),
+            "row_ids": [int(row_id) for row_id in page.index],
+            "base_version": file_doc.get("base_version", 0),
+            "file_id": file_id,
+            "total_records": len(df),
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "columns": selected,
+            "available_columns": available_columns,
+            "can_edit": True
+        }
+
     async def _preview_pdf_file(self, file_data: bytes) -> list:
         """Preview PDF file data."""
         try:
@@ -733,16 +891,44 @@ class FileService:
     async def _preview_csv_file(self, file_data: bytes) -> list:
         """Preview CSV file data."""
         try:
-            import pandas as pd
-            df = pd.read_csv(io.BytesIO(file_data))
+            df = await parse_service.read_table(file_data, 'csv')
             # Convert DataFrame to list of dictionaries
             contacts = df.to_dict('records')
             return contacts
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error previewing CSV file: {str(e)}")
             return []
 
-    async def _process_excel_file(self, file_data: bytes) -> int:
+    async def _materialize_contacts(self, file_doc: Dict[str, Any], df: Optional[pd.DataFrame] = None) -> None:
+        """Copy a processed file's rows into list_contacts for segment queries."""
+        # Segments are derived data; a failure here must not fail processing or the update
+        try:
+            if df is None:
+                _, _, df = await contact_patch_service.replay(file_doc)
+            await list_contact_service.materialize(file_doc, df)
+        except Exception as e:
+            logger.error(f"Error materializing contacts of file {file_doc['_id']}: {str(e)}")
+
+    async def _check_emails(self, file_id: Optional[str], values: pd.Series) -> Dict[str, Any]:
+        """Normalize, validate and dedup a file's addresses; the report is stored on the file."""
+        report = (await asyncio.to_thread(normalize_emails, values)).report()
+        return await self._save_email_quality(file_id, report)
+
+    async def _save_email_quality(self, file_id: Optional[str], report: Dict[str, Any]) -> Dict[str, Any]:
+        if file_id:
+            await self._get_files_collection().update_one(
+                {"_id": ObjectId(file_id)},
+                {"$set": {"email_quality": report}}
+            )
+        logger.info(
+            f"📧 File {file_id}: {report['valid_emails']} valid emails, "
+            f"{report['invalid_emails']} invalid, {report['duplicate_emails']} duplicates"
+        )
+        return report
+
+    async def _process_excel_file(self, file_data: bytes, file_id: Optional[str] = None) -> int:
         """Process Excel file to extract contacts."""
         try:
             import pandas as pd
@@ -752,25 +938,14 @@ class FileService:
             if not 'pd' in globals():
                 raise ImportError("pandas is not available")
                 
-            # Create BytesIO object
-            excel_buffer = io.BytesIO(file_data)
-            
             try:
-                # Try reading with openpyxl engine first
-                df = pd.read_excel(excel_buffer, engine='openpyxl')
-            except Exception as e1:
-                logger.warning(f"Failed to read Excel with openpyxl: {e1}")
-                try:
-                    # Reset buffer position
-                    excel_buffer.seek(0)
-                    # Try reading with xlrd engine for older .xls files
-                    df = pd.read_excel(excel_buffer, engine='xlrd')
-                except Exception as e2:
-                    logger.error(f"Failed to read Excel with both engines: openpyxl error: {e1}, xlrd error: {e2}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Error processing Excel file. Please ensure it's a valid Excel file."
-                    )
+                df = await parse_service.read_table(file_data, 'excel')
+            except ValueError as e:
+                logger.error(f"Failed to read Excel with both engines: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Error processing Excel file. Please ensure it's a valid Excel file."
+                )
             
             # Validate required columns
             required_columns = ['email']  # Add more required columns if needed
@@ -782,8 +957,9 @@ class FileService:
                     detail=f"Missing required columns: {', '.join(missing_columns)}"
                 )
             
-            # Count valid email addresses
-            valid_emails = df['email'].dropna().str.contains('@').sum()
+            # Valid, distinct addresses are reported in email_quality; the count is rows,
+            # as for CSV files and row edits
+            valid_emails = (await self._check_emails(file_id, df['email']))["valid_emails"]
             
             if valid_emails == 0:
                 raise HTTPException(
@@ -791,7 +967,7 @@ class FileService:
                     detail="No valid email addresses found in file"
                 )
             
-            return valid_emails
+            return len(df)
             
         except ImportError as e:
             logger.error(f"Excel processing dependencies not available: {e}")
@@ -813,12 +989,73 @@ class FileService:
         # and extract contact information
         return 0
 
-    async def _process_csv_file(self, file_data: bytes) -> int:
-        """Process CSV file to extract contacts."""
-        # Placeholder implementation
-        # In a real implementation, you would parse the CSV file
-        # and extract contact information
-        return 0
+    async def _process_csv_file(self, file_doc: Dict[str, Any], file_id: Optional[str] = None) -> int:
+        """Validate and count a CSV file in one streaming pass, reporting progress on the file.
+
+        The ingester runs on a worker thread and pulls the stored bytes chunk by chunk from
+        the event loop; addresses are checked batch by batch as they stream past.
+        """
+        files_collection = self._get_files_collection()
+        loop = asyncio.get_running_loop()
+        chunks = stream_file_bytes(file_doc).__aiter__()
+        quality = EmailQualityCounter()
+        latest_progress: Dict[str, Any] = {}
+        progress_writer: List[Optional[asyncio.Task]] = [None]
+
+        def read_chunks() -> Iterator[bytes]:
+            # Runs on the ingest thread, which has nothing to do until the next chunk arrives
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(chunks.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    return
+
+        async def write_progress() -> None:
+            # One writer at a time, always with the newest totals, so updates stay in order
+            while latest_progress:
+                totals = latest_progress.pop("totals")
+                try:
+                    await files_collection.update_one(
+                        {"_id": ObjectId(file_id)},
+                        {"$set": {"processing": progress_document(totals)}}
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not record CSV progress for file {file_id}: {e}")
+
+        def start_progress_writer() -> None:
+            if progress_writer[0] is None or progress_writer[0].done():
+                progress_writer[0] = loop.create_task(write_progress())
+
+        def report(totals: Dict[str, Any]) -> None:
+            # Runs on the ingest thread; never waits for the write
+            if file_id:
+                latest_progress["totals"] = totals
+                loop.call_soon_threadsafe(start_progress_writer)
+
+        def check_emails(emails: List[str]) -> None:
+            quality.add(pd.Series(emails, dtype=object))
+
+        file_size = file_doc.get("file_size")
+        totals = await asyncio.to_thread(CSVIngester().ingest, read_chunks(), report, check_emails, file_size)
+        if progress_writer[0] is not None:
+            await progress_writer[0]
+
+        if totals["multiple_sections"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="CSV file appears to contain multiple data sections. Only CSV files with one continuous data table are supported."
+            )
+        if not totals["non_empty_rows"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No data rows found in CSV file"
+            )
+
+        if 'email' in {column.lower() for column in totals["columns"]}:
+            await self._save_email_quality(file_id, quality.report())
+
+        logger.info(f"Processed CSV file {file_id}: {totals['non_empty_rows']} contacts, encoding {totals['encoding']}, delimiter {totals['delimiter']!r}")
+        return totals["non_empty_rows"]
 
     def _get_file_type(self, filename: str) -> str:
         """Determine file type based on extension."""
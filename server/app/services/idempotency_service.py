@@ -0,0 +1,90 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo.errors import DuplicateKeyError
+from ..core.config import settings
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of IdempotencyService.claim
+LEDGER_CLAIMED = "claimed"
+LEDGER_SENT = "sent"
+LEDGER_IN_FLIGHT = "in_flight"
+
+class IdempotencyService:
+    """Send ledger keyed on (campaign, recipient) so retried sends never reach SES twice.
+
+    A claim is a single insert on the ledger's ``_id`` index, made right before the
+    message is handed to SES, and is marked ``sent`` once SES returns a MessageId. A
+    claim that is still unsent after ``SEND_LEDGER_LEASE_SECONDS`` belongs to a worker
+    that died before sending and can be claimed again; failed sends release their claim
+    so a later retry can try again. Entries expire after ``SEND_LEDGER_TTL_DAYS``.
+    """
+
+    def _get_ledger_collection(self):
+        """Get send ledger collection."""
+        return MongoDB.get_collection("send_ledger")
+
+    @staticmethod
+    def message_key(campaign_id: str, recipient: str) -> str:
+        """Deterministic key for one campaign message."""
+        normalized = recipient.strip().lower()
+        return hashlib.sha256(f"{campaign_id}:{normalized}".encode("utf-8")).hexdigest()
+
+    async def claim(self, key: str, campaign_id: str, user_id: Optional[str] = None) -> str:
+        """Claim a message key: LEDGER_CLAIMED, or why not (LEDGER_SENT / LEDGER_IN_FLIGHT)."""
+        ledger = self._get_ledger_collection()
+        now = datetime.utcnow()
+        try:
+            await ledger.insert_one({
+                "_id": key,
+                "campaign_id": campaign_id,
+                "user_id": user_id,
+                "sent": False,
+                "claimed_at": now
+            })
+            return LEDGER_CLAIMED
+        except DuplicateKeyError:
+            pass
+
+        # Take over a claim whose worker never got the message to SES
+        taken = await ledger.find_one_and_update(
+            {
+                "_id": key,
+                "sent": False,
+                "claimed_at": {"$lt": now - timedelta(seconds=settings.SEND_LEDGER_LEASE_SECONDS)}
+            },
+            {"$set": {"claimed_at": now}}
+        )
+        if taken is not None:
+            return LEDGER_CLAIMED
+        existing = await ledger.find_one({"_id": key}, {"sent": 1})
+        # Legacy entries predate the sent flag and were only written for delivered messages
+        return LEDGER_SENT if existing is None or existing.get("sent", True) else LEDGER_IN_FLIGHT
+
+    async def mark_sent(self, key: str, message_id: Optional[str] = None, attempts: int = 3) -> bool:
+        """Record that SES accepted the message, making the claim permanent.
+
+        Retried a few times: an entry left unmarked can be claimed again once its lease
+        runs out, and the message would then be sent twice.
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                await self._get_ledger_collection().update_one(
+                    {"_id": key},
+                    {"$set": {"sent": True, "message_id": message_id, "sent_at": datetime.utcnow()}}
+                )
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️ Attempt {attempt}/{attempts} to mark send ledger key {key} as sent failed: {e}")
+        logger.error(f"❌ Send ledger key {key} (message {message_id}) is not marked sent and may be resent after its lease")
+        return False
+
+    async def release(self, key: str) -> None:
+        """Release a claim after a failed send so the message can be retried."""
+        try:
+            await self._get_ledger_collection().delete_one({"_id": key, "sent": {"$ne": True}})
+        except Exception as e:
+            logger.error(f"Error releasing send ledger key {key}: {e}")
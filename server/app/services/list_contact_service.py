@@ -0,0 +1,185 @@
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from ..db.mongodb import MongoDB
+from .email_normalizer import normalize_emails
+
+logger = logging.getLogger(__name__)
+
+# Attribute and email comparisons ignore case; every list_contacts index uses this collation
+CONTACT_COLLATION = {"locale": "en", "strength": 2}
+
+BATCH_SIZE = 1000
+
+def attribute_name(column: Any) -> str:
+    """Key of a contact column under ``attributes``: trimmed, lowercased, no dots or leading '$'."""
+    return str(column).strip().lower().replace(".", "_").lstrip("$") or "_"
+
+def attribute_value(value: Any) -> Optional[str]:
+    """A cell as stored and compared: trimmed text, whole numbers without '.0', None when blank."""
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value).strip()
+    return text or None
+
+class ListContactService:
+    """Contacts of processed files, one ``list_contacts`` document per row with a valid address.
+
+    Each document carries the user, the file it came from (``list_id``) and its row id,
+    the normalized address (``email`` / ``email_key``) and the remaining columns under
+    ``attributes``. Segments are Mongo queries over these indexed fields, so picking
+    "company = X across all my lists" never reparses a file. A file is materialized in
+    full when processed or rewritten: a new ``generation`` is written, the file's
+    ``contacts_generation`` is switched to it, then the previous one is removed. Queries
+    only match the current generation of each file, so a rebuild never shows rows twice
+    or misses them. Row patches refresh just the rows they touch.
+    """
+
+    def _get_collection(self):
+        return MongoDB.get_collection("list_contacts")
+
+    def _documents(self, file_doc: Dict[str, Any], df: pd.DataFrame, generation: Any) -> Iterable[Dict[str, Any]]:
+        """Documents for the rows of ``df`` (indexed by row id) with a valid address."""
+        email_columns = [column for column in df.columns if attribute_name(column) == "email"]
+        if not email_columns or df.empty:
+            return
+        cleanup = normalize_emails(df[email_columns[0]])
+        emails = cleanup.emails.to_numpy()
+        columns = [
+            (attribute_name(column), df[column].to_numpy())
+            for column in df.columns if attribute_name(column) != "email"
+        ]
+        row_ids = df.index.to_numpy()
+        list_id = str(file_doc["_id"])
+        now = datetime.utcnow()
+        for position in np.flatnonzero(cleanup.valid.to_numpy()):
+            attributes = {}
+            for name, values in columns:
+                value = attribute_value(values[position])
+                if value is not None:
+                    attributes[name] = value
+            yield {
+                "user_id": file_doc["user_id"],
+                "list_id": list_id,
+                "row_id": int(row_ids[position]),
+                "email": emails[position],
+                "email_key": emails[position].lower(),
+                "attributes": attributes,
+                "generation": generation,
+                "updated_at": now
+            }
+
+    async def _insert(self, documents: Iterable[Dict[str, Any]]) -> int:
+        collection = self._get_collection()
+        inserted = 0
+        batch: List[Dict[str, Any]] = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= BATCH_SIZE:
+                await collection.insert_many(batch, ordered=False)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            await collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+        return inserted
+
+    async def materialize(self, file_doc: Dict[str, Any], df: pd.DataFrame) -> int:
+        """Replace a file's contacts with the rows of ``df`` (indexed by row id)."""
+        list_id = str(file_doc["_id"])
+        generation = ObjectId()
+        count = await self._insert(self._documents(file_doc, df, generation))
+        await MongoDB.get_collection("files").update_one(
+            {"_id": file_doc["_id"]},
+            {"$set": {"contacts_generation": generation, "list_contacts": count, "contacts_materialized_at": datetime.utcnow()}}
+        )
+        await self._get_collection().delete_many({"list_id": list_id, "generation": {"$ne": generation}})
+        logger.info(f"📇 Materialized {count} contacts from file {list_id}")
+        return count
+
+    async def refresh_rows(self, file_doc: Dict[str, Any], df: pd.DataFrame, row_ids: List[int]) -> None:
+        """Re-derive the contacts of the given rows after they were edited, inserted or deleted."""
+        list_id = str(file_doc["_id"])
+        await self._get_collection().delete_many({"list_id": list_id, "row_id": {"$in": row_ids}})
+        rows = df.loc[df.index.intersection(row_ids)]
+        await self._insert(self._documents(file_doc, rows, file_doc.get("contacts_generation")))
+
+    async def remove_list(self, list_id: str) -> None:
+        await self._get_collection().delete_many({"list_id": list_id})
+
+    @staticmethod
+    def segment_filter(user_id: str, segment: Dict[str, Any]) -> Dict[str, Any]:
+        """Mongo filter selecting a user's contacts that match every filter of ``segment``."""
+        query: Dict[str, Any] = {"user_id": user_id}
+        if segment.get("list_ids"):
+            query["list_id"] = {"$in": [str(list_id) for list_id in segment["list_ids"]]}
+        clauses = []
+        for segment_filter in segment.get("filters") or []:
+            name = attribute_name(segment_filter["field"])
+            path = "email_key" if name == "email" else f"attributes.{name}"
+            op = segment_filter.get("op", "eq")
+            value = segment_filter.get("value")
+            if name == "email" and isinstance(value, (str, list)):
+                value = [str(item).lower() for item in value] if isinstance(value, list) else value.lower()
+            if op == "exists":
+                clauses.append({path: {"$exists": True if value is None else bool(value)}})
+            elif op in ("in", "nin"):
+                values = value if isinstance(value, list) else [value]
+                clauses.append({path: {f"${op}": [attribute_value(item) for item in values]}})
+            elif op == "contains":
+                clauses.append({path: {"$regex": re.escape(attribute_value(value) or ""), "$options": "i"}})
+            elif op == "ne":
+                clauses.append({path: {"$ne": attribute_value(value)}})
+            else:
+                clauses.append({path: attribute_value(value)})
+        if clauses:
+            query["$and"] = clauses
+        return query
+
+    async def _current_filter(self, user_id: str, segment: Dict[str, Any]) -> Dict[str, Any]:
+        """``segment_filter`` limited to the current generation of the user's active files."""
+        files_query: Dict[str, Any] = {"user_id": user_id, "is_active": True, "contacts_generation": {"$exists": True}}
+        if segment.get("list_ids"):
+            files_query["_id"] = {"$in": [ObjectId(list_id) for list_id in segment["list_ids"] if ObjectId.is_valid(str(list_id))]}
+        generations = [
+            file_doc["contacts_generation"]
+            async for file_doc in MongoDB.get_collection("files").find(files_query, {"contacts_generation": 1})
+        ]
+        query = self.segment_filter(user_id, segment)
+        query["generation"] = {"$in": generations}
+        return query
+
+    async def query(self, user_id: str, segment: Dict[str, Any], offset: int = 0,
+                    limit: int = 100) -> Tuple[int, List[Dict[str, Any]]]:
+        """(matching count, one page of contacts) for a segment."""
+        collection = self._get_collection()
+        query = await self._current_filter(user_id, segment)
+        total = await collection.count_documents(query, collation=CONTACT_COLLATION)
+        cursor = collection.find(
+            query,
+            {"_id": 0, "list_id": 1, "row_id": 1, "email": 1, "attributes": 1},
+            collation=CONTACT_COLLATION
+        ).sort([("list_id", 1), ("row_id", 1)]).skip(offset).limit(limit)
+        return total, await cursor.to_list(length=limit)
+
+    async def audience_frame(self, user_id: str, segment: Dict[str, Any]) -> pd.DataFrame:
+        """A segment's contacts as a campaign DataFrame: one column per attribute plus 'email'.
+
+        Rows come in (list, row) order, so the same contacts give the same row positions
+        when a campaign is resumed or retried.
+        """
+        cursor = self._get_collection().find(
+            await self._current_filter(user_id, segment),
+            {"_id": 0, "email": 1, "attributes": 1},
+            collation=CONTACT_COLLATION
+        ).sort([("list_id", 1), ("row_id", 1)]).batch_size(BATCH_SIZE)
+        records = [{**contact.get("attributes", {}), "email": contact["email"]} async for contact in cursor]
+        return pd.DataFrame.from_records(records) if records else pd.DataFrame(columns=["email"])
+
+list_contact_service = ListContactService()
@@ -0,0 +1,145 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+import pandas as pd
+import pyarrow as pa
+from fastapi import HTTPException, status
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def read_table(data: bytes, file_type: str) -> pd.DataFrame:
+    """Parse an Excel or CSV upload into a DataFrame; runs inside a pool worker."""
+    if file_type == 'csv':
+        return pd.read_csv(io.BytesIO(data))
+    try:
+        return pd.read_excel(io.BytesIO(data), engine='openpyxl')
+    except Exception as e1:
+        # Older .xls workbooks need xlrd
+        try:
+            return pd.read_excel(io.BytesIO(data), engine='xlrd')
+        except Exception as e2:
+            raise ValueError(f"openpyxl error: {e1}, xlrd error: {e2}")
+
+def write_table(df: pd.DataFrame, file_type: str) -> bytes:
+    """Serialize a DataFrame back to Excel or CSV bytes; runs inside a pool worker."""
+    buffer = io.BytesIO()
+    if file_type == 'csv':
+        df.to_csv(buffer, index=False)
+    else:
+        df.to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+PARQUET_MAGIC = b"PAR1"
+
+def serialize_frame(df: pd.DataFrame) -> bytes:
+    """Parquet bytes of a DataFrame (dtypes and index kept) for snapshots we store ourselves.
+
+    Parquet needs one type per column, so object columns mixing types (a number edited
+    into a text column, say) are stored as text.
+    """
+    buffer = io.BytesIO()
+    try:
+        df.to_parquet(buffer, engine='pyarrow')
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for column in df.columns:
+            if df[column].dtype == object and pd.api.types.infer_dtype(df[column], skipna=True).startswith('mixed'):
+                df[column] = df[column].map(lambda value: value if pd.isna(value) else str(value))
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, engine='pyarrow')
+    return buffer.getvalue()
+
+def deserialize_frame(data: bytes) -> pd.DataFrame:
+    if data[:len(PARQUET_MAGIC)] == PARQUET_MAGIC:
+        return pd.read_parquet(io.BytesIO(data), engine='pyarrow')
+    # Snapshots written before parquet were pickled; only ever our own blob store's bytes
+    return pd.read_pickle(io.BytesIO(data), compression=None)
+
+class ParseService:
+    """Runs spreadsheet parsing (and serializing) in a process pool so it never blocks the event loop.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more wait for a
+    worker; beyond that callers get a 503. A job running longer than ``timeout`` seconds
+    is abandoned with a 408 and the pool is recycled to kill it; other jobs that were
+    running in the recycled pool are retried once.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.max_workers = max_workers or settings.PARSE_WORKERS
+        self.max_queue = max_queue if max_queue is not None else settings.PARSE_QUEUE_SIZE
+        self.timeout = timeout or settings.PARSE_TIMEOUT_SECONDS
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers don't inherit the server's event loop, sockets and threads
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor) -> None:
+        if self._pool is not pool:
+            return
+        self._pool = None
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def read_table(self, data: bytes, file_type: str) -> pd.DataFrame:
+        """Parse ``data`` as 'excel' or 'csv'; parse errors are raised as ValueError."""
+        return await self._run(read_table, data, file_type, description=f"parsing a {len(data)} byte {file_type} file")
+
+    async def write_table(self, df: pd.DataFrame, file_type: str) -> bytes:
+        """Serialize ``df`` as 'excel' or 'csv' bytes."""
+        return await self._run(write_table, df, file_type, description=f"writing a {len(df)} row {file_type} file")
+
+    async def _run(self, function, *args, description: str):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many files are being processed right now. Please try again shortly."
+            )
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        try:
+            for attempt in range(2):
+                pool = self._get_pool()
+                job = asyncio.get_running_loop().run_in_executor(pool, function, *args)
+                try:
+                    return await asyncio.wait_for(job, self.timeout)
+                except asyncio.TimeoutError:
+                    logger.error(f"⏱️ {description.capitalize()} timed out after {self.timeout}s")
+                    self._recycle_pool(pool)
+                    raise HTTPException(
+                        status_code=status.HTTP_408_REQUEST_TIMEOUT,
+                        detail="File took too long to process. Please split it into smaller files."
+                    )
+                except BrokenProcessPool:
+                    # Another job's timeout (or a crashed worker) took the pool down
+                    self._recycle_pool(pool)
+                    if attempt:
+                        raise
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# One pool per process, shared by uploads, previews, imports and campaign sends
+parse_service = ParseService()
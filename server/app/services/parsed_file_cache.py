@@ -0,0 +1,89 @@
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ParsedFileCache:
+    """LRU of parsed contact files keyed by content hash (or file_id and version).
+
+    Campaign sends, resumes, retries and preview pages all read the same DataFrame, so a
+    file is parsed once per edit. Sort orders requested by previews are cached next to
+    the frame, which makes every page of a sorted preview a positional slice. The file
+    with its pending row patches replayed is kept next to the parse, tagged with the last
+    patch seq applied. Cached frames are shared and must not be modified.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or settings.PARSED_FILE_CACHE_SIZE
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def key(file_doc: Dict[str, Any]) -> tuple:
+        # Edited files are read from their compacted snapshot rather than their bytes
+        if file_doc.get("snapshot_hash"):
+            return ("snapshot", file_doc["snapshot_hash"])
+        # Files with the same content share one parse; rewriting a file changes its hash
+        if file_doc.get("content_hash"):
+            return ("sha256", file_doc["content_hash"], file_doc.get("file_type"))
+        # Older inline files: any edit bumps updated_at, which retires the cached parse
+        return (
+            str(file_doc["_id"]),
+            file_doc.get("updated_at") or file_doc.get("created_at"),
+            file_doc.get("file_size")
+        )
+
+    def get(self, key: tuple) -> Optional[pd.DataFrame]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry["df"]
+
+    def put(self, key: tuple, df: pd.DataFrame) -> None:
+        self._entries[key] = {"df": df, "orders": {}, "patched": {}}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_patched(self, key: tuple, file_id: str) -> Optional[Tuple[int, pd.DataFrame]]:
+        """(seq, frame) of a file patched over this parse, if any patches were replayed."""
+        entry = self._entries.get(key)
+        return entry["patched"].get(file_id) if entry is not None else None
+
+    def put_patched(self, key: tuple, file_id: str, seq: int, df: pd.DataFrame) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry["patched"][file_id] = (seq, df)
+        # Orders of this file's older patched frames no longer line up with the rows
+        entry["orders"] = {
+            order_key: order for order_key, order in entry["orders"].items()
+            if order_key[0] is None or order_key[0][0] != file_id
+        }
+
+    def sort_order(self, key: tuple, column: Any, descending: bool = False,
+                   patched: Optional[Tuple[str, int]] = None) -> np.ndarray:
+        """Row positions of the cached frame sorted by ``column`` (blanks last).
+
+        With ``patched`` as (file_id, seq) the order is of that file's patched frame.
+        """
+        entry = self._entries[key]
+        order = entry["orders"].get((patched, column, descending))
+        if order is None:
+            df = entry["df"] if patched is None else entry["patched"][patched[0]][1]
+            values = df[column].reset_index(drop=True)
+            try:
+                ordered = values.sort_values(ascending=not descending, kind="stable", na_position="last")
+            except TypeError:
+                # Mixed numbers and text compare as text
+                ordered = values.astype(str).str.lower().sort_values(ascending=not descending, kind="stable")
+            order = ordered.index.to_numpy()
+            entry["orders"][(patched, column, descending)] = order
+        return order
+
+# One cache per process
+parsed_file_cache = ParsedFileCache()
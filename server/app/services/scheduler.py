@@ -1,23 +1,205 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from .email_service import EmailService
-
-class EmailScheduler:
-    def __init__(self):
-        self.scheduler = AsyncIOScheduler()
-        self.email_service = EmailService()
-        self.scheduler.start()
-
-    async def schedule_daily_email(self, customer_id: str, time: str, template_id: str):
-        """Schedule a daily email for a specific customer"""
-        hour, minute = time.split(':')
-        self.scheduler.add_job(
-            self.email_service.send_email,
-            CronTrigger(hour=hour, minute=minute),
-            args=[customer_id, template_id],
-            id=f"email_{customer_id}_{template_id}"
+import asyncio
+import heapq
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+RECURRENCE_INTERVALS = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1)
+}
+
+def normalize_run_at(run_at: datetime) -> datetime:
+    """Naive UTC at Mongo's millisecond precision, so claims can match ``run_at`` exactly."""
+    if run_at.tzinfo is not None:
+        run_at = run_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return run_at.replace(microsecond=run_at.microsecond // 1000 * 1000)
+
+def next_run_after(run_at: datetime, recurrence: Optional[str], now: datetime) -> Optional[datetime]:
+    """Next occurrence of a recurring schedule strictly after ``now`` (None for one-off schedules)."""
+    interval = RECURRENCE_INTERVALS.get(recurrence or "")
+    if interval is None:
+        return None
+    # Skip occurrences missed while the service was down instead of firing them all
+    missed = max(0, int((now - run_at) / interval))
+    return run_at + interval * (missed + 1)
+
+class CampaignScheduler:
+    """Fires scheduled and recurring campaigns stored in ``scheduled_campaigns``.
+
+    Mongo is the source of truth; in memory there is only a min-heap of the schedules due
+    within ``lookahead`` and a single timer sleeping until the earliest one. Each firing is
+    claimed with a conditional update, so several processes can run a scheduler and every
+    occurrence is dispatched once. The claim is renewed while the send runs, however long
+    that takes, and a claim whose process died is released after ``lease``. Schedules are
+    only claimed when a dispatch slot is free; otherwise they stay due for the next free
+    slot here or for another process.
+    """
+
+    def __init__(self, lookahead: timedelta = timedelta(minutes=10), lease: timedelta = timedelta(minutes=30),
+                 max_concurrent: int = 4):
+        self.lookahead = lookahead
+        self.lease = lease
+        self._heap: List[Tuple[datetime, str]] = []
+        self._queued: Dict[str, datetime] = {}
+        self._horizon: Optional[datetime] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._fire: Optional[Callable[[dict], Awaitable[Optional[str]]]] = None
+        self._running = 0
+        self.max_concurrent = max_concurrent
+
+    def _get_collection(self):
+        """Get scheduled campaigns collection."""
+        return MongoDB.get_collection("scheduled_campaigns")
+
+    def start(self, fire: Callable[[dict], Awaitable[Optional[str]]]) -> None:
+        """Start dispatching; ``fire`` sends one schedule and returns the created campaign id."""
+        self._fire = fire
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def notify(self, schedule_id: str, run_at: datetime) -> None:
+        """Tell the dispatcher about a new or moved schedule without waiting for the next refill."""
+        if self._wakeup is None or self._horizon is None or run_at >= self._horizon:
+            return
+        self._push(schedule_id, run_at)
+        self._wakeup.set()
+
+    def _push(self, schedule_id: str, run_at: datetime) -> None:
+        # Superseded heap entries are skipped when popped
+        self._queued[schedule_id] = run_at
+        heapq.heappush(self._heap, (run_at, schedule_id))
+
+    async def _refill(self, now: datetime) -> None:
+        """Load the schedules due before the next horizon."""
+        collection = self._get_collection()
+        # Release claims left behind by a process that died mid-dispatch
+        await collection.update_many(
+            {"status": "dispatching", "claimed_at": {"$lt": now - self.lease}},
+            {"$set": {"status": "scheduled"}, "$unset": {"claimed_at": "", "claim_id": ""}}
         )
+        self._horizon = now + self.lookahead
+        self._heap = []
+        self._queued = {}
+        async for schedule in collection.find(
+            {"status": "scheduled", "run_at": {"$lt": self._horizon}},
+            {"run_at": 1}
+        ).sort("run_at", 1):
+            self._push(str(schedule["_id"]), schedule["run_at"])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                now = datetime.utcnow()
+                if self._horizon is None or now >= self._horizon - self.lookahead / 2:
+                    await self._refill(now)
+
+                # Due schedules beyond the free slots stay queued (and unclaimed)
+                while self._heap and self._heap[0][0] <= now and self._running < self.max_concurrent:
+                    run_at, schedule_id = heapq.heappop(self._heap)
+                    if self._queued.get(schedule_id) != run_at:
+                        continue
+                    del self._queued[schedule_id]
+                    self._running += 1
+                    asyncio.create_task(self._dispatch(schedule_id, run_at))
+
+                # Sleep until the earliest due schedule, the refill point, a notify() or a
+                # finished dispatch
+                refill_at = self._horizon - self.lookahead / 2
+                can_dispatch = self._heap and self._running < self.max_concurrent
+                wake_at = min(self._heap[0][0], refill_at) if can_dispatch else refill_at
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        timeout=max(0.0, (wake_at - datetime.utcnow()).total_seconds())
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in campaign scheduler loop: {e}")
+                await asyncio.sleep(5)
+
+    async def _renew_claim(self, schedule_id: ObjectId, claim_id: str) -> None:
+        """Keep a claim fresh while its campaign is being sent."""
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            try:
+                result = await self._get_collection().update_one(
+                    {"_id": schedule_id, "status": "dispatching", "claim_id": claim_id},
+                    {"$set": {"claimed_at": datetime.utcnow()}}
+                )
+                if not result.matched_count:
+                    logger.warning(f"⚠️ Lost the dispatch claim on scheduled campaign {schedule_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Error renewing dispatch claim on scheduled campaign {schedule_id}: {e}")
+
+    async def _dispatch(self, schedule_id: str, run_at: datetime) -> None:
+        try:
+            collection = self._get_collection()
+            now = datetime.utcnow()
+            claim_id = uuid.uuid4().hex
+            schedule = await collection.find_one_and_update(
+                {"_id": ObjectId(schedule_id), "status": "scheduled", "run_at": run_at},
+                {"$set": {"status": "dispatching", "claimed_at": now, "claim_id": claim_id}},
+                return_document=ReturnDocument.AFTER
+            )
+            if schedule is None:
+                # Another process fired it, or it was cancelled or moved
+                return
+
+            logger.info(f"⏰ Firing scheduled campaign {schedule_id} due at {run_at}")
+            campaign_id = None
+            error = None
+            renewal = asyncio.create_task(self._renew_claim(schedule["_id"], claim_id))
+            try:
+                campaign_id = await self._fire(schedule)
+            except Exception as e:
+                error = str(getattr(e, "detail", e))
+                logger.error(f"Scheduled campaign {schedule_id} failed: {error}")
+            finally:
+                renewal.cancel()
+
+            next_run = next_run_after(run_at, schedule.get("recurrence"), datetime.utcnow())
+            update = {
+                "$set": {
+                    "status": "scheduled" if next_run else ("failed" if error else "completed"),
+                    "last_run_at": run_at,
+                    "last_error": error,
+                    "updated_at": datetime.utcnow()
+                },
+                "$unset": {"claimed_at": "", "claim_id": ""},
+                "$inc": {"run_count": 1}
+            }
+            if next_run:
+                update["$set"]["run_at"] = next_run
+            if campaign_id:
+                update["$set"]["last_campaign_id"] = campaign_id
+            await collection.update_one({"_id": schedule["_id"], "status": "dispatching", "claim_id": claim_id}, update)
+            if next_run:
+                self.notify(schedule_id, next_run)
+        except Exception as e:
+            logger.error(f"Error dispatching scheduled campaign {schedule_id}: {e}")
+        finally:
+            self._running -= 1
+            if self._wakeup is not None:
+                self._wakeup.set()
 
-    def remove_schedule(self, customer_id: str, template_id: str):
-        """Remove a scheduled email"""
-        self.scheduler.remove_job(f"email_{customer_id}_{template_id}")
+# One dispatcher per process, started by the application
+campaign_scheduler = CampaignScheduler()
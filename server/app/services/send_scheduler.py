@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional, Any
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class _TenantQueue:
+    """Waiting send slots and counters for one tenant."""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.waiters = deque()  # (finish_tag, future, enqueued_at)
+        self.last_finish = 0.0
+        self.backlog = 0
+        self.dispatched = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+class SendScheduler:
+    """Central SES send-slot scheduler with per-tenant queues and weighted fair queuing.
+
+    Every send asks for a slot with ``acquire``. Slots are released at the account's SES
+    max send rate, always to the tenant whose head request has the smallest virtual finish
+    tag (self-clocked fair queuing). A tenant's share while backlogged is proportional to its
+    plan weight, and a tenant arriving with an empty queue starts at the current virtual
+    time, so a small campaign is served right away instead of behind a large backlog.
+    """
+
+    def __init__(self, max_send_rate: float = None):
+        self.max_send_rate = max_send_rate or settings.SES_MAX_SEND_RATE
+        self._tenants: Dict[str, _TenantQueue] = {}
+        self._virtual_time = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def set_max_send_rate(self, max_send_rate: float) -> None:
+        """Update the global release rate (e.g. from the SES quota)."""
+        if max_send_rate and max_send_rate > 0:
+            self.max_send_rate = max_send_rate
+
+    def _tenant(self, tenant_id: str, weight: float) -> _TenantQueue:
+        tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            tenant = _TenantQueue(weight)
+            self._tenants[tenant_id] = tenant
+        else:
+            tenant.weight = weight
+        return tenant
+
+    def _ensure_dispatcher(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    def register(self, tenant_id: str, count: int, weight: float = 1.0) -> None:
+        """Announce that a tenant is about to request ``count`` slots (for queue depth stats)."""
+        self._tenant(tenant_id, weight).backlog += count
+
+    def unregister(self, tenant_id: str, count: int) -> None:
+        """Drop slots announced with ``register`` that will never be requested."""
+        tenant = self._tenants.get(tenant_id)
+        if tenant is not None:
+            tenant.backlog = max(0, tenant.backlog - count)
+
+    async def acquire(self, tenant_id: str, weight: float = 1.0) -> None:
+        """Wait for this tenant's turn to send one email."""
+        tenant = self._tenant(tenant_id, weight)
+        start_tag = max(self._virtual_time, tenant.last_finish)
+        finish_tag = start_tag + 1.0 / max(weight, 0.01)
+        tenant.last_finish = finish_tag
+
+        future = asyncio.get_running_loop().create_future()
+        enqueued_at = time.monotonic()
+        tenant.waiters.append((finish_tag, future, enqueued_at))
+        self._ensure_dispatcher()
+        self._wakeup.set()
+
+        await future
+
+        waited = time.monotonic() - enqueued_at
+        tenant.dispatched += 1
+        tenant.backlog = max(0, tenant.backlog - 1)
+        tenant.total_wait += waited
+        tenant.max_wait = max(tenant.max_wait, waited)
+
+    def _next_waiter(self):
+        best = None
+        for tenant in self._tenants.values():
+            # Discard waiters whose sender gave up
+            while tenant.waiters and tenant.waiters[0][1].done():
+                tenant.waiters.popleft()
+            if tenant.waiters and (best is None or tenant.waiters[0][0] < best.waiters[0][0]):
+                best = tenant
+        return best
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            tenant = self._next_waiter()
+            if tenant is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            finish_tag, future, _ = tenant.waiters.popleft()
+            self._virtual_time = finish_tag
+            future.set_result(None)
+            await asyncio.sleep(1.0 / self.max_send_rate)
+
+    def get_stats(self, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """Queue depth and wait-time stats, for one tenant or all of them."""
+        def tenant_stats(tenant: _TenantQueue) -> Dict[str, Any]:
+            return {
+                "weight": tenant.weight,
+                "queue_depth": tenant.backlog,
+                "waiting": len(tenant.waiters),
+                "dispatched": tenant.dispatched,
+                "avg_wait_ms": round(tenant.total_wait / tenant.dispatched * 1000, 2) if tenant.dispatched else 0,
+                "max_wait_ms": round(tenant.max_wait * 1000, 2)
+            }
+
+        if tenant_id is not None:
+            tenant = self._tenants.get(tenant_id)
+            stats = tenant_stats(tenant) if tenant else tenant_stats(_TenantQueue(1.0))
+            stats["max_send_rate"] = self.max_send_rate
+            return stats
+
+        return {
+            "max_send_rate": self.max_send_rate,
+            "tenants": {tid: tenant_stats(tenant) for tid, tenant in self._tenants.items()}
+        }
+
+# One scheduler per process, shared by every campaign
+send_scheduler = SendScheduler()
@@ -0,0 +1,95 @@
+import asyncio
+import heapq
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Awaitable, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_OFFSET_PATTERN = re.compile(r"^(?:UTC|GMT)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$", re.IGNORECASE)
+
+def resolve_timezone(value: Optional[str], default: tzinfo = timezone.utc) -> tzinfo:
+    """Timezone for a contact's column value: an IANA name ("Europe/Berlin") or a UTC offset ("+05:30", "GMT-8")."""
+    value = (value or "").strip()
+    if not value:
+        return default
+    match = _OFFSET_PATTERN.match(value)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        return timezone(-offset if sign == "-" else offset)
+    try:
+        return ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        return default
+
+def next_window_start(tz: tzinfo, window_hour: int, now: datetime) -> datetime:
+    """Naive UTC time at which ``window_hour`` next begins in ``tz``.
+
+    A recipient whose local clock is already inside the window hour is released immediately.
+    """
+    local_now = now.replace(tzinfo=timezone.utc).astimezone(tz)
+    start = datetime(local_now.year, local_now.month, local_now.day, window_hour, tzinfo=tz)
+    if start <= local_now < start + timedelta(hours=1):
+        return now
+    if start <= local_now:
+        next_day = local_now.date() + timedelta(days=1)
+        start = datetime(next_day.year, next_day.month, next_day.day, window_hour, tzinfo=tz)
+    return start.astimezone(timezone.utc).replace(tzinfo=None)
+
+def window_release_times(timezones: pd.Series, window_hour: int, default_timezone: str = "UTC",
+                         now: Optional[datetime] = None) -> pd.Series:
+    """Release time of every row; only the distinct timezone values are resolved."""
+    now = now or datetime.utcnow()
+    default = resolve_timezone(default_timezone)
+    keys = timezones.fillna("").astype(str).str.strip()
+    release_at = {
+        value: next_window_start(resolve_timezone(value, default), window_hour, now)
+        for value in keys.unique()
+    }
+    return keys.map(release_at)
+
+class WindowedDispatcher:
+    """Releases time buckets of emails in order from a min-heap keyed by release time.
+
+    Recipients sharing a release time form one bucket, so a campaign spread across every
+    timezone needs a few dozen heap entries and a single sleeping coroutine.
+    """
+
+    def __init__(self, emails: List[dict], release_times: pd.Series):
+        buckets: Dict[datetime, List[dict]] = defaultdict(list)
+        for email in emails:
+            buckets[release_times.iat[email['row_index']]].append(email)
+        # Plain datetimes, so release times can be stored in Mongo as they are
+        self._heap = [
+            (pd.Timestamp(release_at).to_pydatetime(), index, batch)
+            for index, (release_at, batch) in enumerate(buckets.items())
+        ]
+        heapq.heapify(self._heap)
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self._heap)
+
+    def next_release(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    async def run(self, send: Callable[[List[dict]], Awaitable[None]],
+                  heartbeat: Optional[Callable[[], Awaitable[None]]] = None,
+                  heartbeat_interval: float = 60) -> None:
+        """Send each bucket when its window opens, calling ``heartbeat`` while waiting."""
+        while self._heap:
+            release_at, _, batch = self._heap[0]
+            wait = (release_at - datetime.utcnow()).total_seconds()
+            if wait > 0:
+                await asyncio.sleep(min(wait, heartbeat_interval))
+                if heartbeat is not None:
+                    await heartbeat()
+                continue
+            heapq.heappop(self._heap)
+            logger.info(f"🕘 Releasing {len(batch)} recipients for window at {release_at} UTC")
+            await send(batch)
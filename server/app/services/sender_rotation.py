@@ -0,0 +1,58 @@
+import asyncio
+import time
+import logging
+from typing import List, Dict, Optional
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class _IdentityBudget:
+    """Token bucket for one sender identity."""
+
+    def __init__(self, email: str, rate: float, burst: float):
+        self.email = email
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.sent = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+class SenderRotation:
+    """Spreads a campaign across several verified sender identities.
+
+    Each identity gets its own rate budget; ``acquire`` returns the identity with the most
+    budget left and only waits when every identity is exhausted.
+    """
+
+    def __init__(self, sender_emails: List[str], rate_per_identity: Optional[float] = None,
+                 burst: Optional[float] = None):
+        if not sender_emails:
+            raise ValueError("Sender rotation needs at least one sender")
+        rate = rate_per_identity or settings.SENDER_IDENTITY_SEND_RATE
+        burst = burst or max(1.0, rate)
+        self.identities = [_IdentityBudget(email, rate, burst) for email in sender_emails]
+
+    @property
+    def sender_emails(self) -> List[str]:
+        return [identity.email for identity in self.identities]
+
+    async def acquire(self) -> str:
+        """Take one send from the identity with the most budget left."""
+        while True:
+            now = time.monotonic()
+            for identity in self.identities:
+                identity.refill(now)
+            best = max(self.identities, key=lambda identity: identity.tokens)
+            if best.tokens >= 1:
+                best.tokens -= 1
+                best.sent += 1
+                return best.email
+            await asyncio.sleep((1 - best.tokens) / best.rate)
+
+    def get_stats(self) -> List[Dict]:
+        """Emails sent per identity."""
+        return [{"sender_email": identity.email, "sent": identity.sent} for identity in self.identities]
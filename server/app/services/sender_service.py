@@ -1,6 +1,7 @@
 import boto3
 import logging
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from botocore.exceptions import ClientError
 from bson import ObjectId
@@ -11,6 +12,14 @@ from ..services.subscription_service import SubscriptionService
 
 logger = logging.getLogger(__name__)
 
+# Verified senders per user, cached so rotating campaigns don't query on every send
+VERIFIED_SENDERS_TTL = 300  # seconds
+_verified_senders_cache: Dict[str, Tuple[float, List[Dict]]] = {}
+
+def invalidate_verified_senders(user_id: str) -> None:
+    """Drop a user's cached verified senders after their senders change."""
+    _verified_senders_cache.pop(user_id, None)
+
 class SenderService:
     def __init__(self):
         """Initialize the sender service with AWS SES client."""
@@ -151,6 +160,7 @@ class SenderService:
                         {"_id": result.inserted_id},
                         {"$set": {"verification_status": "verified"}}
                     )
+                    invalidate_verified_senders(user_id)
                     return {
                         "success": True,
                         "message": "Email already verified in AWS SES",
@@ -222,6 +232,7 @@ class SenderService:
                                 }
                             )
                             current_status = "verified"
+                            invalidate_verified_senders(user_id)
                             logger.info(f"Auto-updated sender {sender['email']} to verified status")
                         
                         # Update status if AWS SES shows it failed
@@ -236,6 +247,7 @@ class SenderService:
                                 }
                             )
                             current_status = "failed"
+                            invalidate_verified_senders(user_id)
                             logger.info(f"Auto-updated sender {sender['email']} to failed status")
                         else:
                             logger.info(f"No status change needed for {sender['email']}: AWS={aws_status}, Current={current_status}")
@@ -294,6 +306,7 @@ class SenderService:
 
             # Delete from database
             result = await self.collection.delete_one({"_id": ObjectId(sender_id)})
+            invalidate_verified_senders(user_id)
             
             if result.deleted_count > 0:
                 logger.info(f"Successfully deleted sender {sender_email} from database")
@@ -347,6 +360,7 @@ class SenderService:
                 {"_id": ObjectId(sender_id)},
                 {"$set": {"is_default": True}}
             )
+            invalidate_verified_senders(user_id)
 
             return {
                 "success": True,
@@ -384,6 +398,35 @@ class SenderService:
             logger.error(f"Error getting default sender: {e}")
             return None
 
+    async def get_verified_senders(self, user_id: str) -> List[Dict]:
+        """Get a user's verified senders (default first), cached for a few minutes."""
+        cached = _verified_senders_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        try:
+            cursor = self.collection.find({
+                "user_id": user_id,
+                "verification_status": "verified"
+            }).sort([("is_default", -1), ("created_at", 1)])
+            
+            senders = [
+                {
+                    "id": str(sender["_id"]),
+                    "email": sender["email"],
+                    "display_name": sender.get("display_name"),
+                    "is_default": sender.get("is_default", False),
+                    "verification_status": sender["verification_status"]
+                }
+                async for sender in cursor
+            ]
+            _verified_senders_cache[user_id] = (time.monotonic() + VERIFIED_SENDERS_TTL, senders)
+            return senders
+
+        except Exception as e:
+            logger.error(f"Error getting verified senders: {e}")
+            return []
+
     async def _verify_sender_email(self, email: str) -> Dict:
         """Initiate AWS SES verification for a sender email."""
         try:
@@ -533,6 +576,7 @@ class SenderService:
                                 }
                             }
                         )
+                        invalidate_verified_senders(user_id)
                         
                         return {
                             "success": True,
@@ -607,6 +651,7 @@ class SenderService:
                                 }
                             }
                         )
+                        invalidate_verified_senders(user_id)
                     
                     return {
                         "success": True,
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+from bson import ObjectId
+from pymongo import UpdateOne
+from ..db.mongodb import MongoDB
+from .suppression_service import SuppressionService
+from .email_log_store import EmailLogStore
+
+logger = logging.getLogger(__name__)
+
+# Higher-ranked outcomes are never overwritten by lower ones (e.g. a late Delivery after a Bounce)
+DELIVERY_STATUS_RANK = {"delivered": 1, "bounced": 2, "complained": 3}
+CAMPAIGN_COUNTERS = {"delivered": "delivered", "bounced": "bounced", "complained": "complaints"}
+
+# Recent feedback batches kept on a campaign so a retried batch never counts twice
+APPLIED_BATCHES_KEPT = 50
+
+def parse_ses_notification(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn one SNS envelope or raw SES notification into per-recipient events."""
+    if payload.get("Type") == "Notification":
+        message = payload.get("Message")
+        payload = json.loads(message) if isinstance(message, str) else (message or {})
+
+    event_type = payload.get("eventType") or payload.get("notificationType")
+    mail = payload.get("mail", {})
+    message_id = mail.get("messageId")
+    if not message_id:
+        return []
+
+    events = []
+    if event_type == "Bounce":
+        bounce = payload.get("bounce", {})
+        hard = bounce.get("bounceType") == "Permanent"
+        for recipient in bounce.get("bouncedRecipients", []):
+            events.append({
+                "message_id": message_id,
+                "status": "bounced",
+                "email": recipient.get("emailAddress"),
+                "hard_bounce": hard,
+                "detail": recipient.get("diagnosticCode") or bounce.get("bounceSubType"),
+                "timestamp": bounce.get("timestamp")
+            })
+    elif event_type == "Complaint":
+        complaint = payload.get("complaint", {})
+        for recipient in complaint.get("complainedRecipients", []):
+            events.append({
+                "message_id": message_id,
+                "status": "complained",
+                "email": recipient.get("emailAddress"),
+                "detail": complaint.get("complaintFeedbackType"),
+                "timestamp": complaint.get("timestamp")
+            })
+    elif event_type == "Delivery":
+        delivery = payload.get("delivery", {})
+        for email in delivery.get("recipients", mail.get("destination", [])):
+            events.append({
+                "message_id": message_id,
+                "status": "delivered",
+                "email": email,
+                "timestamp": delivery.get("timestamp")
+            })
+    return events
+
+class SESEventIngestor:
+    """Buffers SES feedback events and applies them to Mongo in bulk.
+
+    The webhook only parses and appends to the buffer; a background task flushes every
+    ``flush_interval`` seconds, or as soon as ``flush_size`` events are waiting, with one
+    lookup and a handful of bulk writes per batch.
+
+    A batch is planned once (status transitions, counter deltas, suppressions) and the
+    plan is re-applied until it succeeds: status writes and suppressions are upserts,
+    and campaign counters are guarded by the batch id, so a retry changes nothing twice.
+    A batch still failing after ``max_attempts`` flushes is moved to
+    ``ses_event_dead_letters`` so it can't hold up the events behind it.
+    """
+
+    def __init__(self, flush_size: int = 1000, flush_interval: float = 1.0, max_buffer: int = 100000,
+                 max_attempts: int = 3):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_attempts = max_attempts
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_needed: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        # Plan and failed attempts of the batch at the head of the buffer
+        self._head_plan: Optional[Dict[str, Any]] = None
+        self._head_attempts = 0
+        self.received = 0
+        self.applied = 0
+        self.dropped = 0
+        self.dead_lettered = 0
+
+    def _ensure_flusher(self) -> None:
+        if self._flush_needed is None:
+            self._flush_needed = asyncio.Event()
+            self._lock = asyncio.Lock()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    def submit(self, events: List[Dict[str, Any]]) -> int:
+        """Queue parsed events for the next bulk flush."""
+        self._ensure_flusher()
+        room = self.max_buffer - len(self._buffer)
+        if room < len(events):
+            # Shed load rather than grow without bound; SNS retries non-2xx deliveries
+            self.dropped += len(events) - max(room, 0)
+            events = events[:max(room, 0)]
+        self._buffer.extend(events)
+        self.received += len(events)
+        if len(self._buffer) >= self.flush_size:
+            self._flush_needed.set()
+        return len(events)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._buffer) >= self.max_buffer
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing SES events: {e}")
+
+    async def flush(self) -> int:
+        """Apply all buffered events; raises if the head batch failed and is kept for a retry."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            applied = 0
+            while self._buffer:
+                batch = self._buffer[:self.flush_size]
+                try:
+                    if self._head_plan is None:
+                        self._head_plan = await self._plan(batch)
+                    count = await self._apply(self._head_plan)
+                except Exception as e:
+                    self._head_attempts += 1
+                    if self._head_attempts < self.max_attempts:
+                        # Kept at the head of the buffer and retried on the next flush
+                        raise
+                    await self._dead_letter(batch, e)
+                    count = 0
+                # Dropped only once applied (or dead-lettered)
+                del self._buffer[:len(batch)]
+                self._head_plan = None
+                self._head_attempts = 0
+                applied += count
+                self.applied += count
+            return applied
+
+    async def _dead_letter(self, events: List[Dict[str, Any]], error: Exception) -> None:
+        await MongoDB.get_collection("ses_event_dead_letters").insert_one({
+            "events": events,
+            "error": str(error),
+            "attempts": self._head_attempts,
+            "failed_at": datetime.utcnow()
+        })
+        self.dead_lettered += len(events)
+        logger.error(f"❌ Moved {len(events)} SES events to ses_event_dead_letters after {self._head_attempts} failed attempts: {error}")
+
+    async def _plan(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Work out what a batch changes, from the delivery statuses before it."""
+        message_ids = list({event["message_id"] for event in events})
+
+        # One indexed lookup for the whole batch: owner, campaign and current outcome
+        logs = await EmailLogStore().find_by_message_ids(message_ids)
+
+        log_updates = []
+        campaign_counters = defaultdict(lambda: defaultdict(int))
+        suppressions = []
+
+        for event in events:
+            new_status = event["status"]
+            log = logs.get(event["message_id"])
+            if log is not None:
+                current = log.get("delivery_status")
+                if DELIVERY_STATUS_RANK.get(current, 0) < DELIVERY_STATUS_RANK[new_status]:
+                    log["delivery_status"] = new_status
+                    log_updates.append((log, new_status, event.get("detail")))
+                    if log.get("campaign_id"):
+                        campaign_counters[log["campaign_id"]][CAMPAIGN_COUNTERS[new_status]] += 1
+                        if current in CAMPAIGN_COUNTERS:
+                            campaign_counters[log["campaign_id"]][CAMPAIGN_COUNTERS[current]] -= 1
+
+            if not event.get("email"):
+                continue
+            if log is None:
+                # Not one of our sends; nothing to attribute the feedback to
+                continue
+            if new_status == "bounced" and event.get("hard_bounce"):
+                # A permanently invalid address is invalid for every tenant, but only a
+                # signed SNS message is trusted to say so
+                suppressions.append({
+                    "user_id": None if event.get("authenticated") else log["user_id"],
+                    "email": event["email"],
+                    "reason": "hard_bounce",
+                    "campaign_id": log.get("campaign_id")
+                })
+            elif new_status == "complained":
+                suppressions.append({
+                    "user_id": log["user_id"],
+                    "email": event["email"],
+                    "reason": "complaint",
+                    "campaign_id": log.get("campaign_id")
+                })
+
+        # Several events for one message collapse into its final outcome
+        final_updates = {log["message_id"]: (log, status, detail) for log, status, detail in log_updates}
+        return {
+            "batch_id": uuid.uuid4().hex,
+            "log_updates": list(final_updates.values()),
+            "campaign_counters": {
+                campaign_id: {counter: delta for counter, delta in counters.items() if delta}
+                for campaign_id, counters in campaign_counters.items()
+            },
+            "suppressions": suppressions,
+            "count": len(log_updates)
+        }
+
+    async def _apply(self, plan: Dict[str, Any]) -> int:
+        """Write a batch plan; safe to repeat after a partial failure."""
+        now = datetime.utcnow()
+        if plan["log_updates"]:
+            await EmailLogStore().set_delivery_statuses(plan["log_updates"])
+
+        campaign_updates = [
+            UpdateOne(
+                {"_id": ObjectId(campaign_id), "feedback_batches": {"$ne": plan["batch_id"]}},
+                {
+                    "$inc": counters,
+                    "$set": {"updated_at": now},
+                    "$push": {"feedback_batches": {"$each": [plan["batch_id"]], "$slice": -APPLIED_BATCHES_KEPT}}
+                }
+            )
+            for campaign_id, counters in plan["campaign_counters"].items()
+            if counters and ObjectId.is_valid(campaign_id)
+        ]
+        if campaign_updates:
+            await MongoDB.get_collection("campaigns").bulk_write(campaign_updates, ordered=False)
+
+        if plan["suppressions"]:
+            await SuppressionService().add_suppressions(plan["suppressions"])
+
+        return plan["count"]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "buffered": len(self._buffer),
+            "received": self.received,
+            "applied": self.applied,
+            "dropped": self.dropped,
+            "dead_lettered": self.dead_lettered
+        }
+
+# One ingestor per process, fed by the SES webhook
+ses_event_ingestor = SESEventIngestor()
@@ -9,6 +9,13 @@ from datetime import datetime
 from botocore.exceptions import ClientError, BotoCoreError
 from ..core.config import settings
 from ..db.mongodb import MongoDB
+from .checkpoint_service import CampaignCheckpoint, CheckpointService
+from .idempotency_service import IdempotencyService, LEDGER_CLAIMED, LEDGER_SENT
+from .send_scheduler import send_scheduler
+from .domain_pacer import DomainPacer
+from .sender_rotation import SenderRotation
+from .email_log_store import EmailLogStore
+from .campaign_pacer import CampaignPacer
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +31,7 @@ class SESManager:
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
             )
+            self.email_log_store = EmailLogStore()
             logger.info("SES Manager initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize SES Manager: {e}")
@@ -31,7 +39,7 @@ class SESManager:
 
     async def send_email(self, to_email: str, subject: str, body: str, 
                         sender_email: str, html_body: Optional[str] = None, 
-                        user_id: str = None) -> Dict:
+                        user_id: str = None, campaign_id: Optional[str] = None) -> Dict:
         """Send a single email using dynamic sender with improved headers."""
         try:
             # Prepare email content with better headers
@@ -73,6 +81,7 @@ class SESManager:
                     to_email=to_email,
                     sender_email=sender_email,
                     subject=subject,
+                    campaign_id=campaign_id,
                     message_id=response['MessageId'],
                     status='sent'
                 )
@@ -98,6 +107,7 @@ class SESManager:
                     to_email=to_email,
                     sender_email=sender_email,
                     subject=subject,
+                    campaign_id=campaign_id,
                     message_id=None,
                     status='failed',
                     error_code=error_code,
@@ -123,6 +133,7 @@ class SESManager:
                     to_email=to_email,
                     sender_email=sender_email,
                     subject=subject,
+                    campaign_id=campaign_id,
                     message_id=None,
                     status='failed',
                     error_code='UNKNOWN_ERROR',
@@ -139,12 +150,38 @@ class SESManager:
                 'timestamp': datetime.utcnow()
             }
 
-    async def send_bulk_emails(self, emails: List[Dict], sender_email: str, user_id: str = None) -> Dict:
-        """Send bulk emails with rate limiting and user tracking."""
+    async def send_bulk_emails(self, emails: List[Dict], sender_email: str, user_id: str = None,
+                               checkpoint: Optional[CampaignCheckpoint] = None,
+                               campaign_id: Optional[str] = None, send_weight: float = 1.0,
+                               sender_rotation: Optional[SenderRotation] = None,
+                               campaign_pacer: Optional[CampaignPacer] = None) -> Dict:
+        """Send bulk emails with rate limiting and user tracking.
+
+        When a checkpoint is given, rows it already marks as done are skipped and each
+        outcome is recorded against the email's ``row_index`` so an interrupted run can resume.
+        When a campaign_id is given, every message is claimed in the send ledger right
+        before it is handed to SES and marked sent once SES accepts it; messages already
+        sent are never handed to SES again, and ones another worker is still sending are
+        left pending for a later resume.
+        Send slots come from the shared fair scheduler, weighted by ``send_weight``, after
+        per-recipient-domain pacing and the ledger claim, so duplicates never take a slot;
+        the lane stats are returned in ``domain_stats``.
+        With a sender rotation, each email goes out from the rotation's next identity
+        instead of ``sender_email``. A campaign pacer spreads the sends over its target
+        duration or rate before they reach the scheduler.
+        """
+        skipped = 0
+        if checkpoint is not None:
+            pending = [email for email in emails if not checkpoint.is_done(email['row_index'])]
+            skipped = len(emails) - len(pending)
+            emails = pending
+
         results = {
             'total': len(emails),
             'successful': 0,
             'failed': 0,
+            'skipped': skipped,
+            'duplicates': 0,
             'errors': [],
             'sender_email': sender_email,
             'user_id': user_id,
@@ -154,42 +191,116 @@ class SESManager:
 
         logger.info(f"Starting bulk email campaign for user {user_id} from {sender_email}: {len(emails)} recipients")
 
+        # Keep the scheduler's release rate in line with the account's SES quota
+        quota = await self.get_send_quota()
+        if quota['success']:
+            send_scheduler.set_max_send_rate(quota['quota']['max_send_rate'])
+        
+        tenant_id = str(user_id) if user_id else "anonymous"
+        if campaign_pacer is not None:
+            campaign_pacer.start()
+
         # Process emails with rate limiting
         import asyncio
-        semaphore = asyncio.Semaphore(10)  # Limit concurrent requests
+        concurrency = 10  # Limit concurrent requests
+        checkpoint_service = CheckpointService() if checkpoint is not None else None
+        ledger = IdempotencyService() if campaign_id else None
+        # Shard recipients by domain so big mailbox providers are paced separately
+        pacer = DomainPacer(emails)
+        # Slots announced to the scheduler but not yet taken; returned when the run ends
+        unclaimed_slots = len(emails)
         
-        async def send_with_rate_limit(email_data):
-            async with semaphore:
+        async def send_with_rate_limit(lane, email_data):
+            nonlocal unclaimed_slots
+            if campaign_pacer is not None:
+                await campaign_pacer.wait()
+            
+            message_key = None
+            if ledger is not None:
+                message_key = ledger.message_key(campaign_id, email_data['email'])
+                claim = await ledger.claim(message_key, campaign_id, user_id)
+                if claim != LEDGER_CLAIMED:
+                    # Sent on an earlier attempt, or still being sent by another worker
+                    results['duplicates'] += 1
+                    if campaign_pacer is not None:
+                        campaign_pacer.sent()
+                    if checkpoint is not None and claim == LEDGER_SENT:
+                        checkpoint.mark(email_data['row_index'], True)
+                        await checkpoint_service.maybe_save(checkpoint)
+                    return None
+            
+            try:
+                # Rate limiting: wait for this tenant's fair share of the SES send rate
+                await send_scheduler.acquire(tenant_id, send_weight)
+                unclaimed_slots -= 1
+                
+                message_sender = await sender_rotation.acquire() if sender_rotation is not None else sender_email
                 result = await self.send_email(
                     to_email=email_data['email'],
                     subject=email_data['subject'],
                     body=email_data['body'],
-                    sender_email=sender_email,
+                    sender_email=message_sender,
                     html_body=email_data.get('html_body'),
-                    user_id=user_id
+                    user_id=user_id,
+                    campaign_id=campaign_id
                 )
-                
-                if result['success']:
-                    results['successful'] += 1
-                else:
-                    results['failed'] += 1
-                    results['errors'].append(result)
-                
-                # Rate limiting: wait 0.1 seconds between emails
-                await asyncio.sleep(0.1)
-                return result
+            except Exception:
+                # SES never accepted it; don't leave the message claimed until the lease runs out
+                if message_key is not None:
+                    await ledger.release(message_key)
+                raise
+            
+            pacer.record(lane, result['success'])
+            if campaign_pacer is not None:
+                campaign_pacer.sent()
+            if result['success']:
+                results['successful'] += 1
+                if message_key is not None:
+                    await ledger.mark_sent(message_key, result.get('message_id'))
+            else:
+                results['failed'] += 1
+                results['errors'].append(result)
+                if message_key is not None:
+                    await ledger.release(message_key)
+            
+            if checkpoint is not None:
+                checkpoint.mark(email_data['row_index'], result['success'])
+                await checkpoint_service.maybe_save(checkpoint)
+            
+            return result
+        
+        async def worker():
+            while True:
+                item = await pacer.next()
+                if item is None:
+                    return
+                lane, email_data = item
+                try:
+                    await send_with_rate_limit(lane, email_data)
+                except Exception as e:
+                    logger.error(f"Error sending to {email_data.get('email')}: {e}")
 
-        # Create tasks for all emails
-        tasks = [send_with_rate_limit(email) for email in emails]
+        # Execute with a fixed pool of workers pulling from the domain lanes
+        send_scheduler.register(tenant_id, len(emails), send_weight)
+        try:
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+        finally:
+            # Duplicates and sends cut short by an error never take their slots
+            send_scheduler.unregister(tenant_id, unclaimed_slots)
+            if campaign_pacer is not None:
+                campaign_pacer.finish()
+        results['domain_stats'] = pacer.get_stats()
+        if sender_rotation is not None:
+            results['sender_stats'] = sender_rotation.get_stats()
         
-        # Execute all tasks
-        await asyncio.gather(*tasks, return_exceptions=True)
+        if checkpoint is not None:
+            await checkpoint_service.save(checkpoint)
         
         results['end_time'] = datetime.utcnow()
         duration = (results['end_time'] - results['start_time']).total_seconds()
         
         logger.info(f"Bulk email campaign completed for user {user_id} in {duration:.2f} seconds")
-        logger.info(f"Results: {results['successful']} successful, {results['failed']} failed")
+        logger.info(f"Results: {results['successful']} successful, {results['failed']} failed, {results['duplicates']} duplicates skipped")
         
         return results
 
@@ -332,35 +443,29 @@ class SESManager:
     async def _log_email(self, user_id: str, to_email: str, sender_email: str, 
                         subject: str, message_id: Optional[str] = None, 
                         status: str = 'sent', error_code: Optional[str] = None, 
-                        error_message: Optional[str] = None) -> None:
-        """Log email for subscription tracking."""
+                        error_message: Optional[str] = None, campaign_id: Optional[str] = None) -> None:
+        """Log email for subscription tracking and campaign analytics."""
         try:
             # Ensure user_id is provided
             if not user_id:
                 logger.warning("No user_id provided for email logging, skipping")
                 return
-                
-            email_logs_collection = MongoDB.get_collection("email_logs")
-            if email_logs_collection is not None:
-                log_entry = {
-                    "user_id": str(user_id),  # Ensure string conversion
-                    "to_email": to_email,
-                    "sender_email": sender_email,
-                    "subject": subject or "No Subject",  # Handle None subject
-                    "message_id": message_id,
-                    "status": status,
-                    "sent_at": datetime.utcnow(),
-                    "error_code": error_code,
-                    "error_message": error_message
-                }
-                
-                result = await email_logs_collection.insert_one(log_entry)
-                if result and result.inserted_id:
-                    logger.debug(f"Email logged for user {user_id}: {status} to {to_email}")
-                else:
-                    logger.warning(f"Failed to insert email log for user {user_id}")
+            
+            logged = await self.email_log_store.log(
+                user_id=user_id,
+                to_email=to_email,
+                sender_email=sender_email,
+                subject=subject,
+                message_id=message_id,
+                status=status,
+                error_code=error_code,
+                error_message=error_message,
+                campaign_id=campaign_id
+            )
+            if logged:
+                logger.debug(f"Email logged for user {user_id}: {status} to {to_email}")
             else:
-                logger.warning("Email logs collection not available, skipping email logging")
+                logger.warning(f"Failed to insert email log for user {user_id}")
         except Exception as e:
             logger.error(f"Error logging email for user {user_id}: {e}")
-            # Don't raise exception here as email logging failure shouldn't break email sending 
\ No newline at end of file
+            # Don't raise exception here as email logging failure shouldn't break email sending
\ No newline at end of file
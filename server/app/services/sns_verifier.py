@@ -0,0 +1,92 @@
+import base64
+import logging
+import re
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+import httpx
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+logger = logging.getLogger(__name__)
+
+# SNS endpoints: https://sns.<region>.amazonaws.com (or amazonaws.com.cn)
+SNS_HOST_PATTERN = re.compile(r"^sns\.[a-z0-9-]+\.amazonaws\.com(\.cn)?$")
+
+# Fields covered by the signature, in signing order
+SIGNED_FIELDS = {
+    "Notification": ("Message", "MessageId", "Subject", "Timestamp", "TopicArn", "Type"),
+    "SubscriptionConfirmation": ("Message", "MessageId", "SubscribeURL", "Timestamp", "Token", "TopicArn", "Type"),
+    "UnsubscribeConfirmation": ("Message", "MessageId", "SubscribeURL", "Timestamp", "Token", "TopicArn", "Type"),
+}
+
+MAX_CACHED_CERTIFICATES = 16
+
+def is_sns_url(url: Optional[str]) -> bool:
+    """True for https URLs on an SNS regional endpoint."""
+    if not isinstance(url, str):
+        return False
+    parsed = urlparse(url)
+    return parsed.scheme == "https" and bool(SNS_HOST_PATTERN.match(parsed.hostname or "")) and parsed.port in (None, 443)
+
+def string_to_sign(message: Dict[str, Any]) -> Optional[bytes]:
+    """The canonical "Key\\nValue\\n" text SNS signs for this message type."""
+    fields = SIGNED_FIELDS.get(message.get("Type"))
+    if fields is None:
+        return None
+    parts = []
+    for field in fields:
+        value = message.get(field)
+        if value is None:
+            # Subject is the only optional signed field
+            if field == "Subject":
+                continue
+            return None
+        parts.append(f"{field}\n{value}\n")
+    return "".join(parts).encode("utf-8")
+
+class SNSMessageVerifier:
+    """Checks the signature SNS puts on every message it delivers.
+
+    The signing certificate is only fetched from an SNS endpoint over https and is
+    cached per URL, so steady traffic costs one RSA verification per message.
+    """
+
+    def __init__(self):
+        self._certificates: Dict[str, Any] = {}
+
+    async def _public_key(self, cert_url: str):
+        public_key = self._certificates.get(cert_url)
+        if public_key is None:
+            async with httpx.AsyncClient(timeout=10, follow_redirects=False) as client:
+                response = await client.get(cert_url)
+                response.raise_for_status()
+            public_key = x509.load_pem_x509_certificate(response.content).public_key()
+            if len(self._certificates) >= MAX_CACHED_CERTIFICATES:
+                self._certificates.clear()
+            self._certificates[cert_url] = public_key
+        return public_key
+
+    async def verify(self, message: Dict[str, Any]) -> bool:
+        """True when ``message`` carries a valid SNS signature."""
+        cert_url = message.get("SigningCertURL") or message.get("SigningCertUrl")
+        if not is_sns_url(cert_url) or not urlparse(cert_url).path.endswith(".pem"):
+            return False
+        signed = string_to_sign(message)
+        if signed is None or not message.get("Signature"):
+            return False
+        algorithm = {"1": hashes.SHA1(), "2": hashes.SHA256()}.get(str(message.get("SignatureVersion")))
+        if algorithm is None:
+            return False
+        try:
+            public_key = await self._public_key(cert_url)
+            public_key.verify(base64.b64decode(message["Signature"]), signed, padding.PKCS1v15(), algorithm)
+            return True
+        except InvalidSignature:
+            return False
+        except Exception as e:
+            logger.error(f"Error verifying SNS signature: {e}")
+            return False
+
+sns_message_verifier = SNSMessageVerifier()
@@ -1,6 +1,7 @@
 from typing import Dict, Any, Optional
 from ..db.mongodb import MongoDB
 from ..models.user import UserResponse
+from .email_log_store import EmailLogStore
 import logging
 from datetime import datetime, timedelta
 
@@ -16,7 +17,8 @@ class SubscriptionService:
                 "api_access": False,
                 "priority_support": False,
                 "white_label": False,
-                "custom_integrations": False
+                "custom_integrations": False,
+                "send_weight": 1
             },
             "starter": {
                 "emails_per_month": 1000,
@@ -25,7 +27,8 @@ class SubscriptionService:
                 "api_access": False,
                 "priority_support": False,
                 "white_label": False,
-                "custom_integrations": False
+                "custom_integrations": False,
+                "send_weight": 2
             },
             "professional": {
                 "emails_per_month": 10000,
@@ -34,7 +37,8 @@ class SubscriptionService:
                 "api_access": True,
                 "priority_support": True,
                 "white_label": False,
-                "custom_integrations": False
+                "custom_integrations": False,
+                "send_weight": 4
             },
             "enterprise": {
                 "emails_per_month": 50000,
@@ -43,7 +47,8 @@ class SubscriptionService:
                 "api_access": True,
                 "priority_support": True,
                 "white_label": True,
-                "custom_integrations": True
+                "custom_integrations": True,
+                "send_weight": 8
             }
         }
 
@@ -233,6 +238,12 @@ class SubscriptionService:
         plan = user.usersubscription or "free"
         return self.plan_limits.get(plan, self.plan_limits["free"])
 
+    async def get_send_weight(self, user_id: str) -> float:
+        """Get the fair-scheduling weight of the user's current plan."""
+        billing_period = await self.get_user_billing_period(user_id)
+        plan_limits = self.plan_limits.get(billing_period["plan_id"], self.plan_limits["free"])
+        return plan_limits["send_weight"]
+
     async def check_email_limit(self, user: UserResponse) -> Dict[str, Any]:
         """Check if user can send more emails in their current billing period."""
         try:
@@ -247,34 +258,22 @@ class SubscriptionService:
             period_start = billing_period["period_start"]
             period_end = billing_period["period_end"]
             
-            email_logs_collection = MongoDB.get_collection("email_logs")
-            if email_logs_collection is not None:
-                # Count emails sent in current billing period
-                sent_count = await email_logs_collection.count_documents({
-                    "user_id": user.id,
-                    "sent_at": {
-                        "$gte": period_start,
-                        "$lt": period_end
-                    },
-                    "status": "sent"
-                })
-                
-                remaining = max(0, emails_per_month - sent_count)
-                can_send = remaining > 0
-                
-                logger.info(f"User {user.id} email limit check: {sent_count}/{emails_per_month} used in billing period {period_start} to {period_end}")
-                
-                return {
-                    "can_send": can_send,
-                    "remaining": remaining,
-                    "limit": emails_per_month,
-                    "used": sent_count,
-                    "billing_period_start": period_start,
-                    "billing_period_end": period_end
-                }
-            else:
-                # If collection not available, assume can send
-                return {"can_send": True, "remaining": emails_per_month, "limit": emails_per_month, "used": 0}
+            # Count emails sent in current billing period
+            sent_count = await EmailLogStore().count_sent(user.id, period_start, period_end)
+            
+            remaining = max(0, emails_per_month - sent_count)
+            can_send = remaining > 0
+            
+            logger.info(f"User {user.id} email limit check: {sent_count}/{emails_per_month} used in billing period {period_start} to {period_end}")
+            
+            return {
+                "can_send": can_send,
+                "remaining": remaining,
+                "limit": emails_per_month,
+                "used": sent_count,
+                "billing_period_start": period_start,
+                "billing_period_end": period_end
+            }
                 
         except Exception as e:
             logger.error(f"Error checking email limit: {e}")
@@ -745,20 +744,8 @@ class SubscriptionService:
             period_start = billing_period["period_start"]
             period_end = billing_period["period_end"]
             
-            # Get usage collections
-            email_logs_collection = MongoDB.get_collection("email_logs")
-            if email_logs_collection is not None:
-                # Count emails sent in current period
-                emails_sent = await email_logs_collection.count_documents({
-                    "user_id": user_id,
-                    "sent_at": {
-                        "$gte": period_start,
-                        "$lt": period_end
-                    },
-                    "status": "sent"
-                })
-            else:
-                emails_sent = 0
+            # Count emails sent in current period
+            emails_sent = await EmailLogStore().count_sent(user_id, period_start, period_end)
             
             # Get templates collection
             templates_collection = MongoDB.get_collection("templates")
@@ -0,0 +1,202 @@
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from ..core.config import settings
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "__global__"
+
+def normalize_email(email: str) -> str:
+    """Normalize an address for suppression lookups."""
+    return str(email).strip().lower()
+
+class BloomFilter:
+    """Fixed-size Bloom filter over normalized addresses.
+
+    Bit positions come from two independent ``pd.util.hash_array`` hashes (double
+    hashing), so a whole column of addresses is added or probed in a few array
+    operations instead of a Python call per address.
+    """
+
+    # 16-character SipHash keys of the two base hashes
+    HASH_KEYS = ("suppressions-h1.", "suppressions-h2.")
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, values: Iterable[str]) -> np.ndarray:
+        """(len(values), hash_count) array of bit positions."""
+        values = np.asarray(list(values), dtype=object)
+        h1 = pd.util.hash_array(values, hash_key=self.HASH_KEYS[0])
+        h2 = pd.util.hash_array(values, hash_key=self.HASH_KEYS[1]) | np.uint64(1)
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        # uint64 arithmetic wraps, which is fine for hashing
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.size)
+
+    def add_many(self, values: Iterable[str]) -> None:
+        positions = self._positions(values).ravel()
+        masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), masks)
+
+    def contains_many(self, values: Iterable[str]) -> np.ndarray:
+        """Boolean array: True where a value may be in the filter."""
+        positions = self._positions(values)
+        set_bits = self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)
+        return (set_bits & 1).astype(bool).all(axis=1)
+
+    def add(self, value: str) -> None:
+        self.add_many([value])
+
+    def __contains__(self, value: str) -> bool:
+        return bool(self.contains_many([value])[0])
+
+class SuppressionSet:
+    """In-memory suppression lookup for one scope (a user, or the global list).
+
+    Small lists are an exact hash set. Lists above ``SUPPRESSION_BLOOM_THRESHOLD`` are a
+    Bloom filter whose positives are confirmed against Mongo.
+    """
+
+    def __init__(self, scope: str, emails: Iterable[str], count: int):
+        self.scope = scope
+        self.loaded_at = time.monotonic()
+        self.exact: Optional[Set[str]] = None
+        self.bloom: Optional[BloomFilter] = None
+        if count > settings.SUPPRESSION_BLOOM_THRESHOLD:
+            self.bloom = BloomFilter(count * 2)
+            self.bloom.add_many(emails)
+        else:
+            self.exact = set(emails)
+
+    def add(self, email: str) -> None:
+        if self.exact is not None:
+            self.exact.add(email)
+        else:
+            self.bloom.add(email)
+
+    def discard(self, email: str) -> None:
+        # Bloom filters can't delete; the exact fallback drops removed addresses
+        if self.exact is not None:
+            self.exact.discard(email)
+
+class SuppressionService:
+    # Loaded suppression sets per scope, shared by every request in the process
+    _cache: Dict[str, SuppressionSet] = {}
+
+    def _get_suppressions_collection(self):
+        """Get suppressions collection."""
+        return MongoDB.get_collection("suppressions")
+
+    @staticmethod
+    def _scope_filter(scope: str) -> Dict:
+        return {"user_id": None if scope == GLOBAL_SCOPE else scope}
+
+    async def _get_set(self, scope: str) -> SuppressionSet:
+        cached = self._cache.get(scope)
+        if cached and time.monotonic() - cached.loaded_at < settings.SUPPRESSION_CACHE_TTL:
+            return cached
+
+        collection = self._get_suppressions_collection()
+        query = self._scope_filter(scope)
+        count = await collection.count_documents(query)
+        emails = [doc["email"] async for doc in collection.find(query, {"email": 1, "_id": 0})]
+        suppression_set = SuppressionSet(scope, emails, count)
+        self._cache[scope] = suppression_set
+        logger.info(f"Loaded {count} suppressions for scope {scope} ({'bloom' if suppression_set.bloom else 'exact'})")
+        return suppression_set
+
+    async def suppressed_mask(self, emails: pd.Series, user_id: str) -> pd.Series:
+        """Vectorized check of a column of addresses against the user's and global suppressions."""
+        normalized = emails.astype(str).str.strip().str.lower()
+        mask = pd.Series(False, index=emails.index)
+
+        for scope in (user_id, GLOBAL_SCOPE):
+            suppression_set = await self._get_set(scope)
+            if suppression_set.exact is not None:
+                if suppression_set.exact:
+                    mask |= normalized.isin(suppression_set.exact)
+                continue
+
+            # Bloom positives only narrow the candidates; confirm them exactly
+            unique_emails = normalized.unique()
+            candidates = unique_emails[suppression_set.bloom.contains_many(unique_emails)]
+            if len(candidates) == 0:
+                continue
+            query = self._scope_filter(scope)
+            query["email"] = {"$in": candidates.tolist()}
+            confirmed = {
+                doc["email"]
+                async for doc in self._get_suppressions_collection().find(query, {"email": 1, "_id": 0})
+            }
+            mask |= normalized.isin(confirmed)
+
+        return mask
+
+    async def add_suppressions(self, entries: List[Dict]) -> int:
+        """Upsert suppression entries and update loaded in-memory sets incrementally.
+
+        Each entry needs ``email`` and ``reason``; ``user_id`` None means global.
+        """
+        if not entries:
+            return 0
+        operations = []
+        for entry in entries:
+            email = normalize_email(entry["email"])
+            user_id = entry.get("user_id")
+            operations.append(UpdateOne(
+                {"user_id": user_id, "email": email},
+                {
+                    "$setOnInsert": {
+                        "user_id": user_id,
+                        "email": email,
+                        "created_at": datetime.utcnow()
+                    },
+                    "$set": {
+                        "reason": entry.get("reason", "manual"),
+                        "source_campaign_id": entry.get("campaign_id")
+                    }
+                },
+                upsert=True
+            ))
+            cached = self._cache.get(user_id or GLOBAL_SCOPE)
+            if cached is not None:
+                cached.add(email)
+
+        try:
+            result = await self._get_suppressions_collection().bulk_write(operations, ordered=False)
+            return result.upserted_count
+        except BulkWriteError as e:
+            # Concurrent upserts of the same address race on the unique index; the entry exists either way
+            logger.warning(f"Some suppression upserts conflicted: {len(e.details.get('writeErrors', []))}")
+            return e.details.get("nUpserted", 0)
+
+    async def add_suppression(self, user_id: Optional[str], email: str, reason: str = "manual") -> None:
+        """Suppress one address for a user (or globally when user_id is None)."""
+        await self.add_suppressions([{"user_id": user_id, "email": email, "reason": reason}])
+
+    async def remove_suppression(self, user_id: str, email: str) -> bool:
+        """Remove a user's suppression entry."""
+        email = normalize_email(email)
+        result = await self._get_suppressions_collection().delete_one({"user_id": user_id, "email": email})
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            cached.discard(email)
+        return result.deleted_count > 0
+
+    async def get_suppressions(self, user_id: str, skip: int = 0, limit: int = 100) -> List[Dict]:
+        """List a user's suppression entries, newest first."""
+        cursor = self._get_suppressions_collection().find(
+            {"user_id": user_id}
+        ).sort("created_at", -1).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
@@ -0,0 +1,297 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import html
+import logging
+import re
+import struct
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from ..core.config import settings
+from ..db.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+# Smallest transparent 1x1 GIF, served from memory on every open
+TRACKING_PIXEL = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+_SIGNATURE_BYTES = 8
+_OPEN_PAYLOAD_BYTES = 16
+_CLICK_PAYLOAD_BYTES = 18
+
+# Links a single campaign can track; anything beyond is sent unrewritten
+MAX_TRACKED_LINKS = 1000
+
+_URL_PATTERN = re.compile(r"https?://[^\s<>\"']+")
+_URL_TRAILING = ".,;:!?)]}"
+
+def tracking_configured() -> bool:
+    """True when TRACKING_BASE_URL points somewhere recipients can reach."""
+    parsed = urlparse(settings.TRACKING_BASE_URL)
+    host = (parsed.hostname or "").lower()
+    return parsed.scheme in ("http", "https") and bool(host) and host not in ("localhost", "127.0.0.1", "::1", "0.0.0.0")
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), payload, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+def _encode(payload: bytes) -> str:
+    return base64.urlsafe_b64encode(payload + _sign(payload)).rstrip(b"=").decode("ascii")
+
+def _decode(token: str, payload_size: int) -> Optional[bytes]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        return None
+    if len(raw) != payload_size + _SIGNATURE_BYTES:
+        return None
+    payload, signature = raw[:payload_size], raw[payload_size:]
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    return payload
+
+def make_open_token(campaign_id: str, row_index: int) -> str:
+    """Opaque, signed token identifying one recipient of one campaign."""
+    return _encode(ObjectId(campaign_id).binary + struct.pack(">I", row_index))
+
+def read_open_token(token: str) -> Optional[Tuple[str, int]]:
+    """Return (campaign_id, row_index) for a valid token, None for anything forged or malformed."""
+    payload = _decode(token, _OPEN_PAYLOAD_BYTES)
+    if payload is None:
+        return None
+    return str(ObjectId(payload[:12])), struct.unpack(">I", payload[12:16])[0]
+
+def make_click_token(campaign_id: str, row_index: int, link_index: int) -> str:
+    """Signed token for one recipient's copy of one campaign link."""
+    return _encode(ObjectId(campaign_id).binary + struct.pack(">IH", row_index, link_index))
+
+def read_click_token(token: str) -> Optional[Tuple[str, int, int]]:
+    """Return (campaign_id, row_index, link_index) for a valid click token."""
+    payload = _decode(token, _CLICK_PAYLOAD_BYTES)
+    if payload is None:
+        return None
+    row_index, link_index = struct.unpack(">IH", payload[12:18])
+    return str(ObjectId(payload[:12])), row_index, link_index
+
+class CampaignLinkMap:
+    """Distinct URLs of one campaign, indexed in first-seen order.
+
+    Built while the campaign is rendered and stored on the campaign as ``links``, so a
+    click token only needs the link's index.
+    """
+
+    def __init__(self, urls: Optional[List[str]] = None):
+        self.urls: List[str] = list(urls or [])
+        self._index = {url: index for index, url in enumerate(self.urls)}
+
+    def index_for(self, url: str) -> Optional[int]:
+        index = self._index.get(url)
+        if index is None and len(self.urls) < MAX_TRACKED_LINKS:
+            index = len(self.urls)
+            self.urls.append(url)
+            self._index[url] = index
+        return index
+
+def _linkify(body: str, campaign_id: str, row_index: int, link_map: Optional[CampaignLinkMap]) -> str:
+    """Escape a plain-text body for HTML, turning URLs into (tracked) anchors."""
+    parts = []
+    position = 0
+    for match in _URL_PATTERN.finditer(body):
+        url = match.group(0).rstrip(_URL_TRAILING)
+        end = match.start() + len(url)
+        parts.append(html.escape(body[position:match.start()]))
+        href = url
+        if link_map is not None:
+            link_index = link_map.index_for(url)
+            if link_index is not None:
+                href = f"{settings.TRACKING_BASE_URL}/api/t/c/{make_click_token(campaign_id, row_index, link_index)}"
+        parts.append(f'<a href="{html.escape(href)}">{html.escape(url)}</a>')
+        position = end
+    parts.append(html.escape(body[position:]))
+    return "".join(parts)
+
+def render_html_body(body: str, campaign_id: str, row_index: int, track_opens: bool = True,
+                     link_map: Optional[CampaignLinkMap] = None) -> str:
+    """HTML alternative of a plain-text campaign body.
+
+    Links are rewritten to click redirects when a ``link_map`` is given, and the open
+    pixel is appended when ``track_opens`` is set.
+    """
+    content = _linkify(body, campaign_id, row_index, link_map).replace("\n", "<br>\n")
+    pixel = ""
+    if track_opens:
+        pixel_url = f"{settings.TRACKING_BASE_URL}/api/t/o/{make_open_token(campaign_id, row_index)}.gif"
+        pixel = f'<img src="{pixel_url}" width="1" height="1" alt="" style="border:0;width:1px;height:1px">'
+    return f"<html><body>{content}{pixel}</body></html>"
+
+class LinkMapCache:
+    """In-process LRU of campaign link maps for the click redirect."""
+
+    def __init__(self, max_campaigns: int = 1000):
+        self.max_campaigns = max_campaigns
+        self._entries: "OrderedDict[str, List[str]]" = OrderedDict()
+
+    async def get_url(self, campaign_id: str, link_index: int) -> Optional[str]:
+        urls = self._entries.get(campaign_id)
+        if urls is None:
+            campaign = await MongoDB.get_collection("campaigns").find_one(
+                {"_id": ObjectId(campaign_id)},
+                {"links": 1}
+            )
+            if campaign is None:
+                return None
+            urls = campaign.get("links") or []
+            self._entries[campaign_id] = urls
+            if len(self._entries) > self.max_campaigns:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(campaign_id)
+        if link_index >= len(urls):
+            # A resumed campaign may have added links since this entry was cached
+            self._entries.pop(campaign_id, None)
+            return None
+        return urls[link_index]
+
+    def invalidate(self, campaign_id: str) -> None:
+        self._entries.pop(campaign_id, None)
+
+class TrackingRecorder:
+    """Aggregates open and click events in memory and writes them to Mongo periodically.
+
+    A pixel hit or redirect only bumps in-process counters. Each flush writes one bulk
+    upsert of first-seen recipients per event type (``tracking_opens``/``tracking_clicks``)
+    and one bulk update of campaign counters, however many requests arrived in between.
+    Whatever a failed flush did not write is put back and retried by the next one.
+    """
+
+    def __init__(self, flush_interval: float = 2.0):
+        self.flush_interval = flush_interval
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._last_seen: Dict[str, Dict[str, datetime]] = defaultdict(dict)
+        self._opened_rows: Dict[Tuple[str, int], datetime] = {}
+        self._clicked_rows: Dict[Tuple[str, int], datetime] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _ensure_flusher(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    def record_open(self, campaign_id: str, row_index: int) -> None:
+        self._ensure_flusher()
+        now = datetime.utcnow()
+        self._counters[campaign_id]["opens"] += 1
+        self._last_seen[campaign_id]["last_opened_at"] = now
+        self._opened_rows.setdefault((campaign_id, row_index), now)
+
+    def record_click(self, campaign_id: str, row_index: int, link_index: int) -> None:
+        self._ensure_flusher()
+        now = datetime.utcnow()
+        self._counters[campaign_id]["clicks"] += 1
+        self._counters[campaign_id][f"link_clicks.{link_index}"] += 1
+        self._last_seen[campaign_id]["last_clicked_at"] = now
+        self._clicked_rows.setdefault((campaign_id, row_index), now)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing tracking events: {e}")
+
+    @staticmethod
+    async def _record_first_seen(collection_name: str, rows: Dict[Tuple[str, int], datetime],
+                                 field: str) -> Dict[str, int]:
+        """Upsert per-recipient markers; returns first-time recipients per campaign."""
+        first_seen = defaultdict(int)
+        if not rows:
+            return first_seen
+        keys = list(rows)
+        try:
+            result = await MongoDB.get_collection(collection_name).bulk_write([
+                UpdateOne(
+                    {"_id": f"{campaign_id}:{row_index}"},
+                    {"$setOnInsert": {
+                        "campaign_id": campaign_id,
+                        "row_index": row_index,
+                        field: seen_at
+                    }},
+                    upsert=True
+                )
+                for (campaign_id, row_index), seen_at in rows.items()
+            ], ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            # Another process inserted the same marker first: that recipient isn't new here
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+        for position in upserted:
+            first_seen[keys[position][0]] += 1
+        return first_seen
+
+    def _put_back(self, counters, last_seen, opened_rows, clicked_rows) -> None:
+        """Merge unwritten events back into the buffers, keeping the newer timestamps."""
+        for campaign_id, values in counters.items():
+            for counter, count in values.items():
+                self._counters[campaign_id][counter] += count
+        for campaign_id, fields in last_seen.items():
+            self._last_seen[campaign_id] = {**fields, **self._last_seen[campaign_id]}
+        self._opened_rows = {**self._opened_rows, **opened_rows}
+        self._clicked_rows = {**self._clicked_rows, **clicked_rows}
+
+    async def flush(self) -> None:
+        """Write the aggregated events collected since the last flush."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            counters, self._counters = self._counters, defaultdict(lambda: defaultdict(int))
+            last_seen, self._last_seen = self._last_seen, defaultdict(dict)
+            opened_rows, self._opened_rows = self._opened_rows, {}
+            clicked_rows, self._clicked_rows = self._clicked_rows, {}
+            if not counters:
+                return
+
+            try:
+                # Markers are only inserted once, so their unique counts move into the
+                # counters as soon as they are written
+                unique_opens = await self._record_first_seen("tracking_opens", opened_rows, "opened_at")
+                opened_rows = {}
+                for campaign_id, count in unique_opens.items():
+                    counters[campaign_id]["unique_opens"] += count
+                unique_clicks = await self._record_first_seen("tracking_clicks", clicked_rows, "clicked_at")
+                clicked_rows = {}
+                for campaign_id, count in unique_clicks.items():
+                    counters[campaign_id]["unique_clicks"] += count
+
+                campaign_ids = list(counters)
+                now = datetime.utcnow()
+                try:
+                    await MongoDB.get_collection("campaigns").bulk_write([
+                        UpdateOne(
+                            {"_id": ObjectId(campaign_id)},
+                            {"$inc": dict(counters[campaign_id]), "$set": last_seen.get(campaign_id) or {"updated_at": now}}
+                        )
+                        for campaign_id in campaign_ids
+                    ], ordered=False)
+                except BulkWriteError as e:
+                    # Only the campaigns whose update failed are retried
+                    failed = {campaign_ids[error["index"]] for error in e.details.get("writeErrors", [])}
+                    counters = {campaign_id: counters[campaign_id] for campaign_id in failed}
+                    last_seen = {campaign_id: last_seen[campaign_id] for campaign_id in failed if campaign_id in last_seen}
+                    raise
+            except Exception:
+                self._put_back(counters, last_seen, opened_rows, clicked_rows)
+                raise
+
+# One recorder and link cache per process, used by the tracking routes
+tracking_recorder = TrackingRecorder()
+link_map_cache = LinkMapCache()
@@ -1,9 +1,11 @@
-from fastapi import FastAPI, HTTPException, status, Request
+from fastapi import FastAPI, HTTPException, status, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel
 from typing import Optional
 import pymongo
+import anyio
+import asyncio
 from bson import ObjectId
 import bcrypt
 import jwt
@@ -17,6 +19,10 @@ import csv
 # Import routes
 from app.routes import senders
 from app.api.v1 import subscriptions, auth
+from app.db.mongodb import MongoDB
+from app.services.csv_ingester import CSVIngester, progress_document
+from app.services.file_blob_store import get_file_bytes
+from app.services.file_service import FileService
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -63,6 +69,20 @@ database = mongo_client[DATABASE_NAME]
 def get_database():
     return database
 
+# The shared services use the async motor connection, opened on first use
+_shared_connect_lock = asyncio.Lock()
+
+async def _call_shared(func, *args):
+    if MongoDB.database is None:
+        async with _shared_connect_lock:
+            if MongoDB.database is None:
+                await MongoDB.connect_to_mongo()
+    return await func(*args)
+
+def run_shared(func, *args):
+    """Call an async shared-service function from a sync route (run in a worker thread)."""
+    return anyio.from_thread.run(_call_shared, func, *args)
+
 def create_access_token(data: dict):
     """Create JWT token."""
     to_encode = data.copy()
@@ -383,23 +403,10 @@ def delete_file(request: Request, file_id: str):
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Ensure the file belongs to the user
-        file = db.files.find_one({
-            "_id": ObjectId(file_id),
-            "user_id": str(user["_id"]),
-            "is_active": True
-        })
-        
-        if not file:
-            raise HTTPException(status_code=404, detail="File not found")
-        
-        # Soft delete the file
-        db.files.update_one(
-            {"_id": ObjectId(file_id)},
-            {"$set": {"is_active": False}}
-        )
-        
-        return {"message": "File deleted successfully"}
+        # Soft delete, releasing the file's blobs and its materialized contacts
+        return run_shared(FileService().delete_file, file_id, str(user["_id"]))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Delete file error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -425,7 +432,7 @@ def process_file(request: Request, file_id: str):
             raise HTTPException(status_code=404, detail="File not found")
         
         # Get file data
-        file_data = file.get("file_data")
+        file_data = run_shared(get_file_bytes, file)
         if not file_data:
             raise HTTPException(status_code=404, detail="File data not found")
         
@@ -490,55 +497,24 @@ def process_file(request: Request, file_id: str):
                     contacts_count = 0
                 
             elif file_type == "csv" or filename.lower().endswith('.csv'):
-                # Parse CSV file with table validation
-                try:
-                    csv_content = file_data.decode('utf-8')
-                except UnicodeDecodeError:
-                    csv_content = file_data.decode('utf-8-sig')
-                
+                # Stream the CSV in one pass, recording progress on the file document
                 try:
-                    # Check for multiple data sections in CSV
-                    lines = csv_content.strip().split('\n')
-                    if not lines:
-                        logger.error(f"CSV file {file_id} is empty")
+                    def report_progress(totals):
+                        db.files.update_one(
+                            {"_id": ObjectId(file_id)},
+                            {"$set": {"processing": progress_document(totals)}}
+                        )
+                    
+                    totals = CSVIngester().ingest(file_data, report_progress)
+                    if totals["multiple_sections"]:
+                        logger.error(f"CSV file {file_id} appears to contain multiple data sections. Only CSV files with one continuous data table are supported.")
+                        contacts_count = 0
+                    elif not totals["non_empty_rows"]:
+                        logger.error(f"No data rows found in CSV file {file_id}")
                         contacts_count = 0
                     else:
-                        # Look for multiple header rows or data sections
-                        header_rows = []
-                        multiple_sections = False
-                        
-                        for i, line in enumerate(lines):
-                            if line.strip() and not line.startswith('#'):  # Skip comments
-                                # Check if this could be a header row (has common header patterns)
-                                if any(keyword in line.lower() for keyword in ['name', 'email', 'contact', 'phone', 'address']):
-                                    if i > 0 and header_rows:  # Found potential second header
-                                        # Check if there's significant gap suggesting multiple tables
-                                        if i - header_rows[-1] > 5:  # More than 5 rows gap
-                                            multiple_sections = True
-                                            break
-                                    header_rows.append(i)
-                        
-                        if multiple_sections:
-                            logger.error(f"CSV file {file_id} appears to contain multiple data sections. Only CSV files with one continuous data table are supported.")
-                            contacts_count = 0
-                        else:
-                            # Process as single table
-                            csv_reader = csv.DictReader(io.StringIO(csv_content))
-                            contacts = list(csv_reader)
-                            
-                            # Validate that we have meaningful data
-                            if not contacts:
-                                logger.error(f"No data rows found in CSV file {file_id}")
-                                contacts_count = 0
-                            else:
-                                # Check if all rows are empty
-                                non_empty_rows = [row for row in contacts if any(str(value).strip() for value in row.values())]
-                                if not non_empty_rows:
-                                    logger.error(f"CSV file {file_id} contains only empty rows")
-                                    contacts_count = 0
-                                else:
-                                    contacts_count = len(non_empty_rows)
-                                    logger.info(f"Successfully processed CSV file with {contacts_count} contacts")
+                        contacts_count = totals["non_empty_rows"]
+                        logger.info(f"Successfully processed CSV file with {contacts_count} contacts")
                         
                 except Exception as csv_error:
                     logger.error(f"Error processing CSV file {file_id}: {str(csv_error)}")
@@ -573,8 +549,15 @@ def process_file(request: Request, file_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/files/{file_id}/preview")
-def preview_file(request: Request, file_id: str):
-    """Preview a user's file."""
+def preview_file(
+    request: Request,
+    file_id: str,
+    offset: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    columns: Optional[str] = None,
+    sort: Optional[str] = None
+):
+    """Preview a user's file; offset/limit (and optionally columns, sort) return a single page."""
     try:
         db = get_database()
         email = get_user_from_token(request)
@@ -592,15 +575,29 @@ def preview_file(request: Request, file_id: str):
         if not file:
             raise HTTPException(status_code=404, detail="File not found")
         
+        filename = file.get("filename", "")
+        
+        # Pages come from the shared parsed-file cache, like the modular API's previews
+        if offset is not None or limit is not None or columns or sort:
+            page = run_shared(
+                FileService().preview_file,
+                file_id,
+                str(user["_id"]),
+                offset or 0,
+                limit or 100,
+                [column.strip() for column in columns.split(",") if column.strip()] if columns else None,
+                sort
+            )
+            return {**page, "file_name": filename, "total_contacts": page["total_records"]}
+        
         # Get file data
-        file_data = file.get("file_data")
+        file_data = run_shared(get_file_bytes, file)
         if not file_data:
             raise HTTPException(status_code=404, detail="File data not found")
         
         # Parse file based on type
         contacts = []
         file_type = file.get("file_type", "unknown")
-        filename = file.get("filename", "")
         
         logger.info(f"Preview file - filename: {filename}, file_type: {file_type}")
         
@@ -725,6 +722,8 @@ def preview_file(request: Request, file_id: str):
             "contacts": contacts,
             "total_contacts": len(contacts)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Preview file error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
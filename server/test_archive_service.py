@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the email log archiver's run lease and summary rollup.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import archive_service
+from app.services.archive_service import ARCHIVER_LEASE_ID, EmailLogArchiver, summarize_buckets
+
+class FakeLeases:
+    """find_one_and_update with upsert, as Mongo applies it to one lease document."""
+
+    def __init__(self):
+        self.documents = {}
+
+    async def find_one_and_update(self, query, update, upsert=False):
+        document = self.documents.get(query["_id"])
+        if document is not None and document["claimed_at"] < query["claimed_at"]["$lt"]:
+            document.update(update["$set"])
+            return document
+        if document is not None:
+            # The filter missed, so the upsert inserts a second document with the same _id
+            raise DuplicateKeyError("duplicate key")
+        self.documents[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+        return None
+
+def test_only_one_worker_claims_each_interval(monkeypatch):
+    leases = FakeLeases()
+    monkeypatch.setattr(archive_service.MongoDB, "get_collection", lambda name: leases)
+    lease = timedelta(hours=21.6)
+    start = datetime(2024, 3, 1, 3, 0)
+
+    async def run():
+        first = [await EmailLogArchiver().claim_run(lease, start + timedelta(seconds=i)) for i in range(3)]
+        # The next interval's first wakeup takes the expired lease over
+        next_day = start + timedelta(hours=24)
+        second = [await EmailLogArchiver().claim_run(lease, next_day), await EmailLogArchiver().claim_run(lease, next_day)]
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == [True, False, False]
+    assert second == [True, False]
+    assert leases.documents[ARCHIVER_LEASE_ID]["claimed_at"] == start + timedelta(hours=24)
+
+def test_summarize_buckets_by_user_campaign_and_day():
+    day = datetime(2024, 1, 5)
+    buckets = [
+        {"user_id": "u1", "campaign_id": "c1", "entries": [
+            {"t": day.replace(hour=9), "s": "sent", "d": "delivered"},
+            {"t": day.replace(hour=23), "s": "failed", "c": "Throttling"},
+            {"t": day + timedelta(days=1, hours=1), "s": "failed"}
+        ]},
+        {"user_id": "u1", "campaign_id": "c1", "entries": [{"t": day.replace(hour=12), "s": "sent"}]}
+    ]
+    summaries = summarize_buckets(buckets)
+    first = summaries[("u1", "c1", day)]
+    assert dict(first["totals"]) == {"sent": 2, "failed": 1}
+    assert dict(first["error_codes"]) == {"Throttling": 1}
+    assert dict(first["delivery"]) == {"delivered": 1}
+    assert dict(summaries[("u1", "c1", day + timedelta(days=1))]["error_codes"]) == {"Unknown": 1}
+
+class FakeSummaries:
+    def __init__(self, error_codes):
+        self.error_codes = error_codes
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+        if self.error_codes:
+            raise BulkWriteError({"writeErrors": [{"code": code} for code in self.error_codes]})
+
+def test_replayed_summary_batch_ignores_only_duplicate_keys(monkeypatch):
+    buckets = [{"user_id": "u1", "campaign_id": "c1", "entries": [{"t": datetime(2024, 1, 5, 9), "s": "sent"}]}]
+    summaries = FakeSummaries([11000])
+    monkeypatch.setattr(archive_service.MongoDB, "get_collection", lambda name: summaries)
+    archiver = EmailLogArchiver()
+    asyncio.run(archiver._write_summaries("b1", buckets))
+    assert summaries.operations[0]._filter["batches"] == {"$ne": "b1"}
+
+    summaries.error_codes = [11000, 2]
+    with pytest.raises(BulkWriteError):
+        asyncio.run(archiver._write_summaries("b1", buckets))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for merging contact lists into one deduplicated audience.
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.audience_service import AudienceMerger
+
+def merge(*frames, rules=None, default_rule="first") -> pd.DataFrame:
+    merger = AudienceMerger(rules, default_rule)
+    for frame in frames:
+        merger.add(frame)
+    return merger.result()
+
+def test_merges_by_normalized_email_in_first_seen_order():
+    first = pd.DataFrame({"Email": ["b@example.com", "A@Example.com"], "Name": ["Bob", "Ann"]})
+    second = pd.DataFrame({"email": [" a@example.COM", "c@example.com"], "name": ["Annie", "Cy"]})
+    merged = merge(first, second)
+    assert merged["email"].tolist() == ["b@example.com", "A@example.com", "c@example.com"]
+    assert merged["name"].tolist() == ["Bob", "Ann", "Cy"]
+
+def test_conflict_rules_per_column():
+    first = pd.DataFrame({"email": ["a@example.com"], "name": ["Ann"], "tag": ["vip"], "city": ["Oslo"]})
+    second = pd.DataFrame({"email": ["a@example.com"], "name": ["Annie"], "tag": ["new"], "city": ["Rome"]})
+    third = pd.DataFrame({"email": ["a@example.com"], "name": [None], "tag": ["vip"], "city": [""]})
+    merged = merge(first, second, third, rules={"Tag": "concat", "city": "last"})
+    assert merged.loc[0, "name"] == "Ann"
+    assert merged.loc[0, "tag"] == "vip; new"
+    # Blank cells don't override earlier values
+    assert merged.loc[0, "city"] == "Rome"
+
+def test_default_rule_applies_to_unlisted_columns():
+    first = pd.DataFrame({"email": ["a@example.com"], "name": ["Ann"]})
+    second = pd.DataFrame({"email": ["a@example.com"], "name": ["Annie"]})
+    assert merge(first, second, default_rule="last").loc[0, "name"] == "Annie"
+
+def test_counts_invalid_rows_and_lists_without_email():
+    merger = AudienceMerger()
+    merger.add(pd.DataFrame({"email": ["a@example.com", "bad", None, "A@example.com"]}))
+    merger.add(pd.DataFrame({"phone": ["123"]}))
+    merged = merger.result()
+    assert len(merged) == 1
+    assert merger.input_rows == 5
+    assert merger.invalid_rows == 3
+
+def test_keeps_columns_missing_from_some_lists():
+    first = pd.DataFrame({"email": ["a@example.com"], "zip": ["007"]})
+    second = pd.DataFrame({"email": ["b@example.com"], "city": ["Oslo"]})
+    merged = merge(first, second)
+    assert merged.loc[0, "zip"] == "007" and pd.isna(merged.loc[0, "city"])
+    assert merged.loc[1, "city"] == "Oslo" and pd.isna(merged.loc[1, "zip"])
+
+def test_empty_merge():
+    merged = AudienceMerger().result()
+    assert merged.empty and list(merged.columns) == ["email"]
+
+def test_concat_collects_distinct_values_within_and_across_lists():
+    first = pd.DataFrame({"email": ["a@example.com", "A@example.com", "b@example.com"], "tag": ["vip", "new", None]})
+    second = pd.DataFrame({"email": ["a@example.com", "b@example.com"], "tag": ["vip; x", "old"]})
+    merged = merge(first, second, rules={"tag": "concat"})
+    assert merged["tag"].tolist() == ["vip; new; vip; x", "old"]
+
+def test_columns_keep_their_dtypes():
+    first = pd.DataFrame({"email": ["a@example.com", "b@example.com"], "score": [1, 2]})
+    second = pd.DataFrame({"email": ["c@example.com"], "score": [3]})
+    merged = merge(first, second)
+    assert merged["score"].tolist() == [1, 2, 3]
+    assert pd.api.types.is_integer_dtype(merged["score"])
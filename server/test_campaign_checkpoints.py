@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for campaign checkpoints and how resumes and retries map them back onto rows.
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pandas as pd
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.api.v1.campaigns import _build_campaign_emails, _failed_rows_mask
+from app.services import checkpoint_service
+from app.services.checkpoint_service import CampaignCheckpoint, CheckpointService, audience_fingerprint
+
+def audience(*addresses):
+    return pd.DataFrame({"email": list(addresses), "name": [f"N{i}" for i in range(len(addresses))]})
+
+def test_offset_advances_over_contiguous_attempts():
+    checkpoint = CampaignCheckpoint("c1", 10)
+    checkpoint.mark(1, True)
+    assert checkpoint.row_offset == 0 and checkpoint.is_done(1) and not checkpoint.is_done(2)
+    checkpoint.mark(0, False)
+    assert checkpoint.row_offset == 2
+    # A later success on a failed row clears its failure
+    checkpoint.mark(0, True)
+    assert (checkpoint.sent_count, checkpoint.failed_count) == (2, 0)
+
+def test_matches_only_the_rows_it_was_recorded_against():
+    df = audience("a@example.com", "b@example.com", "c@example.com")
+    checkpoint = CampaignCheckpoint("c1", len(df), fingerprint=audience_fingerprint(df))
+    edited = df.assign(name=["x", "y", "z"])
+    assert checkpoint.matches(edited)
+    # Same size, but a recipient moved to another row
+    assert not checkpoint.matches(audience("b@example.com", "a@example.com", "c@example.com"))
+    assert not checkpoint.matches(df.iloc[:2])
+    # Legacy checkpoints without a fingerprint are only checked by size
+    assert CampaignCheckpoint("c1", 3).matches(audience("x@example.com", "y@example.com", "z@example.com"))
+
+class FakeCheckpoints:
+    def __init__(self):
+        self.documents = {}
+
+    async def update_one(self, query, update, upsert=False):
+        self.documents[query["campaign_id"]] = dict(update["$set"])
+
+    async def find_one(self, query, projection=None):
+        return self.documents.get(query["campaign_id"])
+
+def test_saved_checkpoint_loads_with_the_same_progress(monkeypatch):
+    collection = FakeCheckpoints()
+    monkeypatch.setattr(checkpoint_service.MongoDB, "get_collection", lambda name: collection)
+    df = audience(*[f"user{i}@example.com" for i in range(12)])
+    service = CheckpointService()
+
+    async def run():
+        checkpoint = await service.create("c1", df)
+        for row in (0, 1, 2):
+            checkpoint.mark(row, True)
+        checkpoint.mark(9, False)
+        await service.save(checkpoint)
+        return await service.load("c1")
+
+    loaded = asyncio.run(run())
+    assert loaded.row_offset == 3
+    assert list(loaded.failed_rows()) == [9]
+    assert loaded.matches(df)
+
+def test_failed_rows_mask_ignores_bitmap_padding():
+    checkpoint = CampaignCheckpoint("c1", 11)
+    for row in (2, 10):
+        checkpoint.mark(row, False)
+    checkpoint.mark(5, True)
+    mask = _failed_rows_mask(checkpoint, 11)
+    assert len(mask) == 11
+    assert list(mask[mask].index) == [2, 10]
+
+def test_retry_renders_only_failed_rows_with_their_original_row_index():
+    df = audience("a@example.com", "bad-address", "c@example.com", "d@example.com", "a@example.com")
+    checkpoint = CampaignCheckpoint("parent", len(df), fingerprint=audience_fingerprint(df))
+    for row, success in ((0, True), (2, False), (3, False), (4, True)):
+        checkpoint.mark(row, success)
+    template = SimpleNamespace(subject="Hi", body="Hello {NAME}")
+    template_service = SimpleNamespace(validate_template_variables=lambda body, columns: {"is_valid": True})
+
+    emails = _build_campaign_emails(
+        df, template, None, None, template_service, skip_mask=~_failed_rows_mask(checkpoint, len(df))
+    )
+    assert [(email["row_index"], email["email"], email["body"]) for email in emails] == [
+        (2, "c@example.com", "Hello N2"),
+        (3, "d@example.com", "Hello N3")
+    ]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the streamed campaign results export.
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import os
+import sys
+from datetime import datetime
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.api.v1 import campaigns
+from app.api.v1.campaigns import _archived_months, _stream_campaign_csv
+from app.core.config import settings
+from app.core.downloads import content_disposition
+
+def entries(count):
+    for i in range(count):
+        yield {
+            "to_email": f"user{i}@example.com",
+            "status": "failed" if i % 10 == 0 else "sent",
+            "error_code": "Throttling" if i % 10 == 0 else None,
+            "message_id": f"m-{i}",
+            "sender_email": "s@example.com",
+            "sent_at": datetime(2024, 1, 5, 9, 0, i % 60)
+        }
+
+def stream(monkeypatch, count, compress):
+    requested = []
+
+    async def iter_campaign_entries(self, campaign_id, archive_months=()):
+        requested.append((campaign_id, list(archive_months)))
+        for entry in entries(count):
+            yield entry
+
+    monkeypatch.setattr(campaigns.EmailLogStore, "iter_campaign_entries", iter_campaign_entries)
+
+    async def collect():
+        return [chunk async for chunk in _stream_campaign_csv("c1", ["2024_01"], compress, rows_per_chunk=100)]
+    return asyncio.run(collect()), requested
+
+def test_gzipped_export_decompresses_to_every_row(monkeypatch):
+    chunks, requested = stream(monkeypatch, 450, compress=True)
+    assert requested == [("c1", ["2024_01"])]
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(b"".join(chunks)).decode("utf-8"))))
+    assert len(rows) == 450
+    assert rows[0]["status"] == "failed" and rows[0]["error_code"] == "Throttling"
+    assert rows[-1]["to_email"] == "user449@example.com"
+
+def test_plain_export_of_an_empty_campaign_has_a_header(monkeypatch):
+    chunks, _ = stream(monkeypatch, 0, compress=False)
+    assert b"".join(chunks).decode("utf-8").strip() == ",".join(campaigns.EXPORT_COLUMNS)
+
+def test_archived_months_span_the_campaign(monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_LOG_ARCHIVE_MODE", "collection")
+    campaign = {"created_at": datetime(2023, 11, 20), "start_time": datetime(2023, 11, 30), "end_time": datetime(2024, 2, 1)}
+    assert _archived_months(campaign) == ["2023_11", "2023_12", "2024_01", "2024_02"]
+    monkeypatch.setattr(settings, "EMAIL_LOG_ARCHIVE_MODE", "file")
+    assert _archived_months(campaign) == []
+
+def test_content_disposition_encodes_non_latin_names():
+    header = content_disposition("Résultats 2024.csv.gz")
+    header.encode("latin-1")
+    assert header == "attachment; filename=\"R_sultats 2024.csv.gz\"; filename*=UTF-8''R%C3%A9sultats%202024.csv.gz"
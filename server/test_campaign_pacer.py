@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for campaign pacing: spread-over-duration, rate caps and SES quota limits.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.campaign_pacer import CampaignPacer
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    async def save(self):
+        pass
+    monkeypatch.setattr(CampaignPacer, "_save", save)
+    CampaignPacer._active.clear()
+    yield
+    CampaignPacer._active.clear()
+
+def quota(max_send_rate=14.0, max_24_hour_send=50000.0, sent_last_24_hours=0.0):
+    async def provider():
+        return {"success": True, "quota": {
+            "max_send_rate": max_send_rate,
+            "max_24_hour_send": max_24_hour_send,
+            "sent_last_24_hours": sent_last_24_hours
+        }}
+    return provider
+
+def test_unpaced_campaign_is_not_limited():
+    async def run():
+        pacer = CampaignPacer("c1", 100, datetime.utcnow())
+        started = time.monotonic()
+        for _ in range(100):
+            await pacer.wait()
+        return pacer.rate, time.monotonic() - started
+    rate, elapsed = asyncio.run(run())
+    assert rate is None
+    assert elapsed < 0.5
+
+def test_rate_cap_spaces_sends():
+    async def run():
+        pacer = CampaignPacer("c1", 100, datetime.utcnow(), max_rate_per_minute=6000)
+        started = time.monotonic()
+        for _ in range(11):
+            await pacer.wait()
+        return pacer.rate, time.monotonic() - started
+    rate, elapsed = asyncio.run(run())
+    assert rate == pytest.approx(100)
+    # Ten gaps of 10ms after the first, immediate send
+    assert 0.08 <= elapsed < 0.5
+
+def test_spread_rate_is_remaining_over_time_left():
+    async def run():
+        pacer = CampaignPacer("c1", 600, datetime.utcnow(), spread_over_minutes=10)
+        await pacer.wait()
+        return pacer.rate
+    assert asyncio.run(run()) == pytest.approx(1.0, rel=0.01)
+
+def test_ses_max_send_rate_is_shared_between_paced_campaigns():
+    async def run():
+        first = CampaignPacer("c1", 100, datetime.utcnow(), max_rate_per_minute=6000, quota_provider=quota(14))
+        second = CampaignPacer("c2", 100, datetime.utcnow(), max_rate_per_minute=6000, quota_provider=quota(14))
+        first.start()
+        second.start()
+        await first.wait()
+        return first.rate
+    assert asyncio.run(run()) == pytest.approx(7)
+
+def test_short_headroom_spreads_the_rest_over_the_day():
+    async def run():
+        pacer = CampaignPacer("c1", 1000, datetime.utcnow(), max_rate_per_minute=6000,
+                              quota_provider=quota(14, 1000, 500))
+        pacer.start()
+        await pacer.wait()
+        return pacer.rate
+    assert asyncio.run(run()) == pytest.approx(500 / 86400)
+
+def test_no_headroom_holds_until_quota_returns():
+    async def run():
+        calls = {"quota": 0, "heartbeat": 0}
+
+        async def provider():
+            calls["quota"] += 1
+            sent = 1000 if calls["quota"] <= 2 else 0
+            return await quota(14, 1000, sent)()
+
+        async def heartbeat():
+            calls["heartbeat"] += 1
+
+        pacer = CampaignPacer("c1", 10, datetime.utcnow(), max_rate_per_minute=6000,
+                              quota_provider=provider, heartbeat=heartbeat, refresh_interval=0.05)
+        pacer.start()
+        started = time.monotonic()
+        await pacer.wait()
+        return pacer.rate, calls, time.monotonic() - started
+    rate, calls, elapsed = asyncio.run(run())
+    # Back to the SES max send rate once the 24-hour window has room again
+    assert rate == pytest.approx(14)
+    assert calls["quota"] == 3
+    assert calls["heartbeat"] == 2
+    assert elapsed >= 0.09
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for replaying row-level contact patches.
+"""
+
+import io
+import os
+import sys
+
+import pandas as pd
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.contact_patch_service import apply_patches, has_edits
+from app.services.parse_service import deserialize_frame, serialize_frame
+
+def contacts() -> pd.DataFrame:
+    return pd.DataFrame({
+        "email": ["a@example.com", "b@example.com", "c@example.com"],
+        "zip": ["007", "010", "123"],
+        "score": [1, 2, 3]
+    })
+
+def test_updates_inserts_and_deletes_keep_row_ids():
+    df = apply_patches(contacts(), [
+        {"op": "update", "row_id": 1, "values": {"zip": "020"}},
+        {"op": "delete", "row_id": 0},
+        {"op": "insert", "row_id": 3, "values": {"email": "d@example.com"}},
+    ])
+    assert df.index.tolist() == [1, 2, 3]
+    assert df.loc[1, "zip"] == "020"
+    assert df.loc[3, "email"] == "d@example.com"
+    assert pd.isna(df.loc[3, "zip"])
+
+def test_later_patches_win_and_deleted_rows_stay_deleted():
+    df = apply_patches(contacts(), [
+        {"op": "update", "row_id": 2, "values": {"score": 5}},
+        {"op": "update", "row_id": 2, "values": {"score": 6}},
+        {"op": "delete", "row_id": 1},
+        {"op": "update", "row_id": 1, "values": {"score": 9}},
+    ])
+    assert df.index.tolist() == [0, 2]
+    assert df.loc[2, "score"] == 6
+
+def test_edits_to_inserted_rows_fold_into_the_insert():
+    df = apply_patches(contacts(), [
+        {"op": "insert", "row_id": 3, "values": {"email": "d@example.com"}},
+        {"op": "update", "row_id": 3, "values": {"zip": "999"}},
+        {"op": "insert", "row_id": 4, "values": {"email": "e@example.com"}},
+        {"op": "delete", "row_id": 4},
+    ])
+    assert df.index.tolist() == [0, 1, 2, 3]
+    assert df.loc[3, ["email", "zip"]].tolist() == ["d@example.com", "999"]
+
+def test_new_columns_are_added():
+    df = apply_patches(contacts(), [{"op": "update", "row_id": 0, "values": {"city": "Oslo"}}])
+    assert df.loc[0, "city"] == "Oslo"
+    assert df["city"].isna().sum() == 2
+
+def test_replay_does_not_modify_the_input():
+    original = contacts()
+    apply_patches(original, [{"op": "update", "row_id": 0, "values": {"score": 10}}])
+    assert original.loc[0, "score"] == 1
+
+def test_compacted_snapshots_are_lossless():
+    df = apply_patches(contacts(), [{"op": "delete", "row_id": 1}])
+    restored = deserialize_frame(serialize_frame(df))
+    pd.testing.assert_frame_equal(restored, df)
+    assert restored.loc[0, "zip"] == "007"
+
+def test_has_edits():
+    assert not has_edits({})
+    assert not has_edits({"patch_seq": 4, "compacted_seq": 4})
+    assert has_edits({"patch_seq": 5, "compacted_seq": 4})
+    assert has_edits({"patch_seq": 4, "compacted_seq": 4, "snapshot_hash": "abc"})
+
+def test_snapshots_with_mixed_columns_are_stored_as_text():
+    df = apply_patches(contacts(), [{"op": "update", "row_id": 0, "values": {"zip": 7}}])
+    restored = deserialize_frame(serialize_frame(df))
+    assert restored["zip"].tolist() == ["7", "010", "123"]
+    assert restored["score"].tolist() == [1, 2, 3]
+
+def test_pickled_snapshots_still_load():
+    buffer = io.BytesIO()
+    contacts().to_pickle(buffer, compression=None)
+    pd.testing.assert_frame_equal(deserialize_frame(buffer.getvalue()), contacts())
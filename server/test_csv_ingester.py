@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming CSV ingestion.
+"""
+
+import codecs
+import os
+import sys
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.csv_ingester import CSVIngester, classify_row, detect_encoding, progress_document
+
+def make_csv(rows: int, encoding: str = "utf-8") -> bytes:
+    lines = ["name,email,note"]
+    for i in range(rows):
+        # Multi-byte names and a quoted newline every few rows exercise chunk boundaries
+        note = f'"line one\nline two {i}"' if i % 7 == 0 else f"note {i}"
+        lines.append(f"Zoë {i},user{i}@example.com,{note}")
+    return ("\r\n".join(lines) + "\r\n").encode(encoding)
+
+def test_detect_encoding():
+    assert detect_encoding(codecs.BOM_UTF8 + b"email\n") == "utf-8-sig"
+    assert detect_encoding("email,näme\n".encode("utf-8")) == "utf-8"
+    assert detect_encoding("email,näme\n".encode("cp1252")) == "cp1252"
+    # A character cut off at the end of the sample is still UTF-8
+    assert detect_encoding("email,ë".encode("utf-8")[:-1]) == "utf-8"
+
+def test_classify_row():
+    header = {"name", "email"}
+    assert classify_row([], header) == "skip"
+    assert classify_row(["# comment"], header) == "skip"
+    assert classify_row(["", " "], header) == "blank"
+    assert classify_row(["Name", "Email"], header) == "header"
+    assert classify_row(["Bob", "bob@example.com"], header) == "data"
+
+def test_ingest_counts_rows_in_small_chunks():
+    data = make_csv(250)
+    totals = CSVIngester(chunk_size=64).ingest(data)
+    assert totals["columns"] == ["name", "email", "note"]
+    assert totals["non_empty_rows"] == 250
+    assert totals["valid_emails"] == 250
+    assert totals["malformed_rows"] == 0
+    assert totals["multiple_sections"] is False
+    assert totals["bytes_processed"] == len(data)
+
+def test_ingest_detects_format_and_batches_emails():
+    lines = ["name;email"] + [f"Zoë {i};user{i}@example.com" for i in range(20)]
+    data = "\n".join(lines).encode("utf-8-sig")
+    batches = []
+    totals = CSVIngester(chunk_size=50, email_batch_size=8).ingest(data, on_emails=batches.append)
+    assert totals["encoding"] == "utf-8-sig"
+    assert totals["delimiter"] == ";"
+    assert [len(batch) for batch in batches] == [8, 8, 4]
+    assert sum(batches, []) == [f"user{i}@example.com" for i in range(20)]
+
+def test_ingest_streamed_chunks_matches_bytes():
+    data = make_csv(250)
+    ingester = CSVIngester(chunk_size=64)
+    # Uneven source chunks, as read back from storage
+    chunks = (data[offset:offset + 1000] for offset in range(0, len(data), 1000))
+    streamed = ingester.ingest(chunks, total_bytes=len(data))
+    assert streamed == ingester.ingest(data)
+
+def test_ingest_skips_blanks_and_flags_malformed_rows():
+    data = b"name,email\n\nAna,ana@example.com\n,\nBob\n# comment\nCy,cy@example.com,extra\n"
+    totals = CSVIngester().ingest(data)
+    assert totals["non_empty_rows"] == 3
+    assert totals["valid_emails"] == 2
+    assert totals["malformed_rows"] == 2
+
+def test_ingest_stops_at_a_second_table():
+    data = make_csv(10) + b"\r\nname,email,note\r\nx,y@example.com,z\r\n"
+    totals = CSVIngester().ingest(data)
+    assert totals["multiple_sections"] is True
+    assert totals["non_empty_rows"] == 10
+
+def test_ingest_reports_progress():
+    reports = []
+    CSVIngester(chunk_size=32, progress_interval=0).ingest(make_csv(50), on_progress=reports.append)
+    assert len(reports) > 1
+    assert progress_document(reports[-1])["status"] == "completed"
+    assert progress_document(reports[0])["percent"] < 100
+
+def test_ingest_with_bom_and_cp1252():
+    for encoding in ("utf-8-sig", "cp1252"):
+        batches = []
+        totals = CSVIngester(chunk_size=32).ingest(make_csv(40, encoding=encoding), on_emails=batches.append)
+        assert totals["encoding"] == encoding
+        assert totals["columns"] == ["name", "email", "note"], encoding
+        assert totals["non_empty_rows"] == 40
+        assert batches[0][:2] == ["user0@example.com", "user1@example.com"]
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for per-domain send pacing.
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.domain_pacer import DomainPacer, parse_domain_rates
+
+def emails(*addresses):
+    return [{"email": address} for address in addresses]
+
+def test_parse_domain_rates():
+    assert parse_domain_rates("Gmail.com:2, yahoo.com:0.5,bad,outlook.com:x") == {"gmail.com": 2.0, "yahoo.com": 0.5}
+    assert parse_domain_rates("") == {}
+
+def test_recipients_are_sharded_by_domain():
+    pacer = DomainPacer(
+        emails("a@gmail.com", "b@Gmail.com ", "c@corp.example", "d@gmail.com"),
+        domain_rates={"gmail.com": 5}, default_rate=20
+    )
+    assert {domain: (lane.total, lane.rate) for domain, lane in pacer.lanes.items()} == {
+        "gmail.com": (3, 5), "corp.example": (1, 20)
+    }
+
+def test_throttled_domain_does_not_hold_up_the_others():
+    # gmail.com may send every 0.1s; the other domain is unpaced
+    pacer = DomainPacer(
+        emails("g1@gmail.com", "g2@gmail.com", "o1@corp.example", "o2@corp.example", "o3@corp.example"),
+        domain_rates={"gmail.com": 10}, default_rate=0
+    )
+
+    async def drain():
+        order = []
+        while True:
+            picked = await pacer.next()
+            if picked is None:
+                return order
+            lane, email = picked
+            pacer.record(lane, success=not email["email"].startswith("o3"))
+            order.append(email["email"])
+
+    order = asyncio.run(drain())
+    assert order == ["g1@gmail.com", "o1@corp.example", "o2@corp.example", "o3@corp.example", "g2@gmail.com"]
+    stats = {lane["domain"]: lane for lane in pacer.get_stats()}
+    assert (stats["corp.example"]["sent"], stats["corp.example"]["failed"]) == (2, 1)
+    assert stats["gmail.com"]["sent"] == 2
+    assert stats["gmail.com"]["paced_wait_seconds"] > 0 and stats["corp.example"]["paced_wait_seconds"] == 0
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for bucketed email logs and per-campaign analytics.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import email_log_store
+from app.services.email_log_store import EmailLogStore, bucket_floor, make_bucket_entry
+
+def test_bucket_floor_and_compact_entries():
+    moment = datetime(2024, 1, 5, 13, 47, 12, 500)
+    assert bucket_floor(moment, 15) == datetime(2024, 1, 5, 13, 45)
+    assert bucket_floor(moment, 60) == datetime(2024, 1, 5, 13, 0)
+    assert make_bucket_entry("a@example.com", "failed", moment, error_code="Throttling") == {
+        "r": "a@example.com", "s": "failed", "t": moment, "c": "Throttling"
+    }
+
+class FakeBuckets:
+    def __init__(self, facets=None):
+        self.facets = facets
+        self.updates = []
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+        return type("UpdateResult", (), {"modified_count": 0, "upserted_id": "b1"})()
+
+    def aggregate(self, pipeline):
+        facets = self.facets
+
+        class Cursor:
+            async def to_list(self, length=None):
+                return [facets]
+        return Cursor()
+
+class FakeSummaries:
+    def __init__(self, summaries):
+        self.summaries = summaries
+
+    def find(self, query):
+        async def rows():
+            for summary in self.summaries:
+                if summary["campaign_id"] == query["campaign_id"]:
+                    yield summary
+        return rows()
+
+def log_store(monkeypatch, buckets, summaries=()):
+    collections = {"email_log_buckets": buckets, "email_log_summaries": FakeSummaries(list(summaries))}
+    monkeypatch.setattr(email_log_store.MongoDB, "get_collection", lambda name: collections[name])
+    return EmailLogStore()
+
+def test_log_writes_campaign_id_on_the_bucket(monkeypatch):
+    buckets = FakeBuckets()
+    store = log_store(monkeypatch, buckets)
+    assert asyncio.run(store.log("u1", "a@example.com", "s@example.com", "Hi", "m-1", campaign_id="c1"))
+    query, update = buckets.updates[0]
+    assert (query["user_id"], query["campaign_id"]) == ("u1", "c1")
+    assert update["$inc"] == {"count": 1, "sent": 1, "failed": 0}
+    assert update["$push"]["entries"]["m"] == "m-1"
+
+def test_campaign_analytics_adds_archived_summaries(monkeypatch):
+    facets = {
+        "totals": [{"_id": None, "sent": 8, "failed": 2}],
+        "by_error_code": [{"_id": "Throttling", "count": 2}],
+        "by_delivery_status": [{"_id": "delivered", "count": 6}],
+        "per_minute": [{"_id": "2024-01-05T13:45:00Z", "sent": 8, "failed": 2}]
+    }
+    summaries = [
+        {"campaign_id": "c1", "totals": {"sent": 90, "failed": 10}, "error_codes": {"Throttling": 4, "Unknown": 6},
+         "delivery": {"bounced": 3}},
+        {"campaign_id": "other", "totals": {"sent": 1000}}
+    ]
+    store = log_store(monkeypatch, FakeBuckets(facets), summaries)
+    analytics = asyncio.run(store.campaign_analytics("c1"))
+    assert (analytics["sent"], analytics["failed"]) == (98, 12)
+    assert analytics["error_codes"] == {"Throttling": 6, "Unknown": 6}
+    assert analytics["delivery"] == {"delivered": 6, "bounced": 3}
+    assert analytics["sends_per_minute"] == [{"minute": "2024-01-05T13:45:00Z", "sent": 8, "failed": 2}]
+
+def test_campaign_analytics_of_a_campaign_without_logs(monkeypatch):
+    facets = {"totals": [], "by_error_code": [], "by_delivery_status": [], "per_minute": []}
+    store = log_store(monkeypatch, FakeBuckets(facets))
+    assert asyncio.run(store.campaign_analytics("c1")) == {
+        "sent": 0, "failed": 0, "error_codes": {}, "delivery": {}, "sends_per_minute": []
+    }
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for email normalization, validation and deduplication.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.email_normalizer import EmailQualityCounter, normalize_emails
+
+def test_trims_and_lowercases_only_the_domain():
+    cleanup = normalize_emails(pd.Series(["  John.Doe@Example.COM ", "x@y.io"]))
+    assert cleanup.emails.tolist() == ["John.Doe@example.com", "x@y.io"]
+    assert cleanup.valid.tolist() == [True, True]
+
+def test_rejects_invalid_addresses():
+    values = [
+        "no-at-sign", "a@b", "a@b.c", "two@@example.com", "a b@example.com",
+        ".dot@example.com", "x" * 65 + "@example.com", "a@-example.com"
+    ]
+    cleanup = normalize_emails(pd.Series(values))
+    assert not cleanup.valid.any()
+
+def test_accepts_valid_addresses():
+    values = ["first.last+tag@sub.example.co.uk", "o'neil@example.com", "x@xn--bcher-kva.example"]
+    assert normalize_emails(pd.Series(values)).valid.all()
+
+def test_flags_case_insensitive_repeats_after_the_first():
+    cleanup = normalize_emails(pd.Series(["Bob@example.com", "bob@EXAMPLE.com", " bob@example.com", "ann@example.com"]))
+    assert cleanup.duplicate.tolist() == [False, True, True, False]
+    assert cleanup.sendable.tolist() == [True, False, False, True]
+
+def test_blank_and_missing_values():
+    cleanup = normalize_emails(pd.Series(["", None, np.nan, "   ", "a@example.com"]))
+    assert cleanup.emails.tolist() == ["", "", "", "", "a@example.com"]
+    assert cleanup.valid.tolist() == [False, False, False, False, True]
+    # Blanks are never duplicates of each other
+    assert not cleanup.duplicate.any()
+
+def test_results_align_positionally_with_any_index():
+    values = pd.Series(["a@example.com", "bad", "A@example.com"], index=[10, 5, 7])
+    cleanup = normalize_emails(values)
+    assert cleanup.valid.index.tolist() == [0, 1, 2]
+    assert cleanup.sendable.tolist() == [True, False, False]
+
+def test_report():
+    report = normalize_emails(pd.Series(["a@example.com", "A@example.com", "bad", "", "b@example.com"])).report()
+    assert report["total_rows"] == 5
+    assert report["valid_emails"] == 2
+    assert report["duplicate_emails"] == 1
+    assert report["invalid_emails"] == 1
+    assert report["blank_emails"] == 1
+    assert report["invalid_examples"] == ["bad"]
+    assert report["duplicate_examples"] == ["A@example.com"]
+
+def test_counter_matches_report_across_batches():
+    values = ["a@example.com", "A@example.com", "bad", "", "b@example.com", " a@EXAMPLE.com", "b@example.com", "bad"]
+    counter = EmailQualityCounter()
+    for start in range(0, len(values), 3):
+        counter.add(pd.Series(values[start:start + 3]))
+    expected = normalize_emails(pd.Series(values)).report()
+    actual = counter.report()
+    for key in ("total_rows", "valid_emails", "invalid_emails", "duplicate_emails", "blank_emails",
+                "invalid_examples", "duplicate_examples"):
+        assert actual[key] == expected[key], key
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for file processing and blob reference counting in the file service.
+"""
+
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException, UploadFile
+from pymongo.errors import DuplicateKeyError
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import file_blob_store as file_blob_store_module
+from app.services import file_service as file_service_module
+from app.services.file_blob_store import FileBlobStore
+from app.services.file_service import FileService
+
+class FakeFiles:
+    """Records update_one calls on the files collection."""
+
+    def __init__(self):
+        self.updates = []
+
+    async def update_one(self, query, update):
+        self.updates.append(update["$set"])
+
+def test_csv_is_streamed_and_emails_checked_incrementally(monkeypatch):
+    lines = ["name,email"] + [f"User {i},user{i % 150}@example.com" for i in range(200)] + ["Bad,not-an-email"]
+    data = "\n".join(lines).encode("utf-8")
+    requested = []
+
+    async def stream_file_bytes(file_doc):
+        requested.append(file_doc["_id"])
+        for offset in range(0, len(data), 512):
+            yield data[offset:offset + 512]
+
+    files = FakeFiles()
+    monkeypatch.setattr(file_service_module, "stream_file_bytes", stream_file_bytes)
+    monkeypatch.setattr(file_service_module.MongoDB, "get_collection", lambda name: files)
+    file_id = str(ObjectId())
+    file_doc = {"_id": ObjectId(file_id), "file_size": len(data)}
+
+    count = asyncio.run(FileService()._process_csv_file(file_doc, file_id))
+    assert count == 201
+    assert requested == [file_doc["_id"]]
+    progress = [update["processing"] for update in files.updates if "processing" in update]
+    assert progress[-1]["status"] == "completed" and progress[-1]["percent"] == 100.0
+    quality = [update["email_quality"] for update in files.updates if "email_quality" in update][0]
+    assert (quality["valid_emails"], quality["duplicate_emails"], quality["invalid_emails"]) == (150, 50, 1)
+
+class FakeBlobs:
+    """The file_blobs operations the blob store uses, keyed on _id."""
+
+    def __init__(self):
+        self.documents = {}
+
+    async def update_one(self, query, update):
+        document = self.documents.get(query["_id"])
+        if document is not None:
+            document["ref_count"] += update["$inc"]["ref_count"]
+        return type("UpdateResult", (), {"matched_count": int(document is not None)})()
+
+    async def insert_one(self, document):
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError("duplicate key")
+        self.documents[document["_id"]] = dict(document)
+
+    async def find_one_and_delete(self, query, projection=None):
+        document = self.documents.get(query["_id"])
+        if document is not None and document["ref_count"] <= query["ref_count"]["$lte"]:
+            return self.documents.pop(query["_id"])
+        return None
+
+def blob_store(monkeypatch) -> FakeBlobs:
+    blobs = FakeBlobs()
+    monkeypatch.setattr(file_blob_store_module.MongoDB, "get_collection", lambda name: blobs)
+    return blobs
+
+def test_blob_is_stored_once_and_deleted_with_its_last_reference(monkeypatch):
+    blobs = blob_store(monkeypatch)
+    store = FileBlobStore()
+
+    async def run():
+        content_hash, duplicate = await store.acquire(b"name,email\n")
+        assert not duplicate
+        assert await store.acquire(b"name,email\n") == (content_hash, True)
+        assert blobs.documents[content_hash]["ref_count"] == 2
+        await store.release(content_hash)
+        assert blobs.documents[content_hash]["ref_count"] == 1
+        await store.release(content_hash)
+        assert content_hash not in blobs.documents
+        # Files without stored content release nothing
+        await store.release(None)
+    asyncio.run(run())
+
+def test_concurrent_first_upload_counts_on_the_stored_blob(monkeypatch):
+    blobs = blob_store(monkeypatch)
+    store = FileBlobStore()
+    original_insert = blobs.insert_one
+
+    async def insert_after_another_upload(document):
+        # Another upload of the same content lands between our lookup and insert
+        blobs.insert_one = original_insert
+        await original_insert({**document, "ref_count": 1})
+        await original_insert(document)
+
+    blobs.insert_one = insert_after_another_upload
+    content_hash, duplicate = asyncio.run(store.acquire(b"same bytes"))
+    assert duplicate
+    assert blobs.documents[content_hash]["ref_count"] == 2
+
+class FailingFiles:
+    async def insert_one(self, document):
+        raise RuntimeError("insert failed")
+
+def test_upload_releases_its_blob_when_the_file_is_not_written(monkeypatch):
+    blobs = blob_store(monkeypatch)
+    files = FailingFiles()
+    monkeypatch.setattr(file_service_module.MongoDB, "get_collection", lambda name: blobs if name == "file_blobs" else files)
+    upload = UploadFile(io.BytesIO(b"name,email\nAna,ana@example.com\n"), filename="contacts.csv")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(FileService().upload_file(upload, "u1"))
+    assert error.value.status_code == 500
+    assert blobs.documents == {}
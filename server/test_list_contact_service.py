@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for list contact segment filters and removing a deleted file's contacts.
+"""
+
+import os
+import re
+import sys
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.list_contact_service import ListContactService, attribute_value
+
+def test_attribute_value():
+    assert attribute_value(" Acme ") == "Acme"
+    assert attribute_value(42.0) == "42"
+    assert attribute_value(float("nan")) is None
+    assert attribute_value("  ") is None
+
+def test_segment_filter_builds_one_clause_per_filter():
+    query = ListContactService.segment_filter("u1", {
+        "list_ids": ["l1"],
+        "filters": [
+            {"field": "Email", "op": "in", "value": ["A@Example.com"]},
+            {"field": "Company.Name", "value": " Acme "},
+            {"field": "phone", "op": "exists"},
+            {"field": "city", "op": "ne", "value": 5.0}
+        ]
+    })
+    assert query["user_id"] == "u1" and query["list_id"] == {"$in": ["l1"]}
+    assert query["$and"] == [
+        {"email_key": {"$in": ["a@example.com"]}},
+        {"attributes.company_name": "Acme"},
+        {"attributes.phone": {"$exists": True}},
+        {"attributes.city": {"$ne": "5"}}
+    ]
+
+def test_contains_matches_the_value_literally():
+    query = ListContactService.segment_filter("u1", {"filters": [{"field": "company", "op": "contains", "value": "a.b (x)*"}]})
+    pattern = query["$and"][0]["attributes.company"]["$regex"]
+    assert re.search(pattern, "Company a.b (x)* Ltd")
+    # Regex syntax in the value is not interpreted
+    assert not re.search(pattern, "axb (x)")
+
+class FakeCollection:
+    """The files, file_blobs and list_contacts operations a file delete uses."""
+
+    def __init__(self, documents=()):
+        self.documents = {document["_id"]: dict(document) for document in documents}
+        self.deleted_filters = []
+
+    async def find_one_and_update(self, query, update, projection=None):
+        document = self.documents.get(query["_id"])
+        if document is None or document.get("user_id") != query["user_id"] or not document.get("is_active"):
+            return None
+        document.update(update["$set"])
+        return document
+
+    async def update_one(self, query, update):
+        document = self.documents.get(query["_id"])
+        if document is not None:
+            document["ref_count"] += update["$inc"]["ref_count"]
+
+    async def find_one_and_delete(self, query, projection=None):
+        document = self.documents.get(query["_id"])
+        if document is not None and document["ref_count"] <= query["ref_count"]["$lte"]:
+            return self.documents.pop(query["_id"])
+        return None
+
+    async def delete_many(self, query):
+        self.deleted_filters.append(query)
+
+def test_legacy_delete_removes_the_list_contacts(monkeypatch):
+    import main
+
+    user_id = ObjectId()
+    file_id = ObjectId()
+    collections = {
+        "files": FakeCollection([{"_id": file_id, "user_id": str(user_id), "is_active": True, "content_hash": "h1"}]),
+        "file_blobs": FakeCollection([{"_id": "h1", "ref_count": 1}]),
+        "list_contacts": FakeCollection()
+    }
+
+    class FakeDatabase:
+        class users:
+            @staticmethod
+            def find_one(query):
+                return {"_id": user_id, "email": query["email"]}
+
+    monkeypatch.setattr(main, "get_database", lambda: FakeDatabase)
+    monkeypatch.setattr(main, "get_user_from_token", lambda request: "owner@example.com")
+    monkeypatch.setattr(main.MongoDB, "database", object())
+    monkeypatch.setattr(main.MongoDB, "get_collection", lambda name: collections[name])
+
+    client = TestClient(main.app)
+    response = client.delete(f"/api/files/{file_id}")
+    assert response.status_code == 200
+    assert collections["files"].documents[file_id]["is_active"] is False
+    assert collections["file_blobs"].documents == {}
+    assert collections["list_contacts"].deleted_filters == [{"list_id": str(file_id)}]
+    # A second delete finds no active file
+    assert client.delete(f"/api/files/{file_id}").status_code == 404
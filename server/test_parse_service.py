@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for spreadsheet parsing in the process pool.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.parse_service import ParseService, read_table, write_table
+
+def test_tables_round_trip_through_the_pool():
+    service = ParseService(max_workers=1, max_queue=1, timeout=60)
+    df = pd.DataFrame({"name": ["Ana", "Bob"], "email": ["ana@example.com", "bob@example.com"]})
+
+    async def run():
+        data = await service.write_table(df, "csv")
+        return await service.read_table(data, "csv")
+
+    try:
+        pd.testing.assert_frame_equal(asyncio.run(run()), df)
+    finally:
+        service.shutdown()
+
+def test_unreadable_workbook_is_a_value_error():
+    with pytest.raises(ValueError):
+        read_table(b"not a workbook", "excel")
+
+def test_excel_round_trip():
+    df = pd.DataFrame({"email": ["ana@example.com"], "score": [3]})
+    pd.testing.assert_frame_equal(read_table(write_table(df, "excel"), "excel"), df)
+
+def test_full_queue_is_refused():
+    service = ParseService(max_workers=1, max_queue=0, timeout=60)
+
+    async def run():
+        service._slots = asyncio.Semaphore(1)
+        await service._slots.acquire()
+        await service.read_table(b"email\n", "csv")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 503
+
+def test_timed_out_job_recycles_the_pool():
+    service = ParseService(max_workers=1, max_queue=1, timeout=0.5)
+
+    async def run():
+        pool = service._get_pool()
+        started = time.monotonic()
+        with pytest.raises(HTTPException) as error:
+            await service._run(time.sleep, 30, description="sleeping")
+        return pool, error.value.status_code, time.monotonic() - started
+
+    try:
+        pool, status_code, elapsed = asyncio.run(run())
+        assert status_code == 408
+        assert elapsed < 10
+        # The stuck worker is killed with its pool; the next job gets a fresh one
+        assert service._pool is None and service._get_pool() is not pool
+    finally:
+        service.shutdown()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for dispatching scheduled campaigns: claims, lease renewal, capacity and failures.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import CampaignScheduler, next_run_after, normalize_run_at
+
+class FakeSchedules:
+    """The scheduled_campaigns operations the dispatcher uses, on equality filters."""
+
+    def __init__(self, *schedules):
+        self.documents = {schedule["_id"]: schedule for schedule in schedules}
+        self.renewals = 0
+
+    def _matches(self, document, query):
+        for field, expected in query.items():
+            if isinstance(expected, dict):
+                if "$lt" in expected and not (field in document and document[field] < expected["$lt"]):
+                    return False
+            elif document.get(field) != expected:
+                return False
+        return True
+
+    def _apply(self, document, update):
+        document.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            document.pop(field, None)
+        for field, count in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + count
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        for document in self.documents.values():
+            if self._matches(document, query):
+                self._apply(document, update)
+                return dict(document)
+        return None
+
+    async def update_one(self, query, update):
+        for document in self.documents.values():
+            if self._matches(document, query):
+                if set(update.get("$set", {})) == {"claimed_at"}:
+                    self.renewals += 1
+                self._apply(document, update)
+                return SimpleNamespace(matched_count=1)
+        return SimpleNamespace(matched_count=0)
+
+    async def update_many(self, query, update):
+        for document in self.documents.values():
+            if self._matches(document, query):
+                self._apply(document, update)
+
+def schedule(run_at: datetime, recurrence=None) -> dict:
+    return {"_id": ObjectId(), "status": "scheduled", "run_at": run_at, "recurrence": recurrence}
+
+def dispatcher(monkeypatch, collection, fire, **options) -> CampaignScheduler:
+    monkeypatch.setattr(scheduler_module.MongoDB, "get_collection", lambda name: collection)
+    scheduler = CampaignScheduler(**options)
+    scheduler._fire = fire
+    scheduler._wakeup = asyncio.Event()
+    return scheduler
+
+def test_next_run_skips_missed_occurrences():
+    run_at = datetime(2024, 1, 1, 9)
+    assert next_run_after(run_at, "daily", datetime(2024, 1, 3, 12)) == datetime(2024, 1, 4, 9)
+    assert next_run_after(run_at, None, datetime(2024, 1, 3)) is None
+    assert normalize_run_at(datetime(2024, 1, 1, 9, 0, 0, 123456)).microsecond == 123000
+
+def test_claim_is_renewed_while_a_long_send_runs(monkeypatch):
+    run_at = normalize_run_at(datetime.utcnow())
+    job = schedule(run_at)
+    collection = FakeSchedules(job)
+
+    async def fire(claimed):
+        await asyncio.sleep(0.35)
+        return "campaign-1"
+
+    async def run():
+        scheduler = dispatcher(monkeypatch, collection, fire, lease=timedelta(seconds=0.15))
+        scheduler._running = 1
+        await scheduler._dispatch(str(job["_id"]), run_at)
+        return scheduler
+    scheduler = asyncio.run(run())
+    assert collection.renewals >= 2
+    assert job["status"] == "completed" and job["last_campaign_id"] == "campaign-1"
+    assert "claim_id" not in job and "claimed_at" not in job
+    assert scheduler._running == 0
+
+def test_failed_send_is_recorded_and_recurring_schedules_move_on(monkeypatch):
+    run_at = normalize_run_at(datetime.utcnow())
+    one_off, daily = schedule(run_at), schedule(run_at, "daily")
+    collection = FakeSchedules(one_off, daily)
+
+    async def fire(claimed):
+        raise RuntimeError("SES quota exceeded")
+
+    async def run():
+        scheduler = dispatcher(monkeypatch, collection, fire)
+        for job in (one_off, daily):
+            scheduler._running += 1
+            await scheduler._dispatch(str(job["_id"]), run_at)
+    asyncio.run(run())
+    assert one_off["status"] == "failed" and one_off["last_error"] == "SES quota exceeded"
+    assert daily["status"] == "scheduled" and daily["run_at"] == run_at + timedelta(days=1)
+    assert daily["run_count"] == 1
+
+def test_lost_claim_is_not_completed(monkeypatch):
+    run_at = normalize_run_at(datetime.utcnow())
+    job = schedule(run_at)
+    collection = FakeSchedules(job)
+
+    async def fire(claimed):
+        # The lease ran out and another process re-claimed the occurrence
+        job["claim_id"] = "someone-else"
+        return "campaign-1"
+
+    async def run():
+        scheduler = dispatcher(monkeypatch, collection, fire)
+        scheduler._running = 1
+        await scheduler._dispatch(str(job["_id"]), run_at)
+    asyncio.run(run())
+    assert job["status"] == "dispatching" and job["claim_id"] == "someone-else"
+
+def test_due_schedules_wait_for_a_free_slot_unclaimed(monkeypatch):
+    run_at = normalize_run_at(datetime.utcnow() - timedelta(seconds=1))
+    first, second = schedule(run_at), schedule(run_at)
+    collection = FakeSchedules(first, second)
+    release = None
+
+    async def fire(claimed):
+        await release.wait()
+        return None
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        scheduler = dispatcher(monkeypatch, collection, fire, max_concurrent=1)
+        scheduler._horizon = datetime.utcnow() + timedelta(minutes=10)
+        scheduler._push(str(first["_id"]), run_at)
+        scheduler._push(str(second["_id"]), run_at)
+        task = asyncio.create_task(scheduler._run())
+        await asyncio.sleep(0.1)
+        statuses = sorted(job["status"] for job in (first, second))
+        release.set()
+        await asyncio.sleep(0.1)
+        task.cancel()
+        return statuses
+    statuses = asyncio.run(run())
+    # Only one claimed while the only slot was busy; the other left for any process
+    assert statuses == ["dispatching", "scheduled"]
+    assert first["status"] == second["status"] == "completed"
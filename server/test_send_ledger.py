@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the send ledger and how bulk sends claim and release messages.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import idempotency_service, ses_manager
+from app.services.idempotency_service import (
+    IdempotencyService, LEDGER_CLAIMED, LEDGER_IN_FLIGHT, LEDGER_SENT
+)
+from app.services.send_scheduler import SendScheduler
+from app.services.ses_manager import SESManager
+
+class FakeLedger:
+    """The few send_ledger operations the service uses, keyed on _id."""
+
+    def __init__(self):
+        self.entries = {}
+        self.fail_updates = 0
+
+    async def insert_one(self, document):
+        if document["_id"] in self.entries:
+            raise DuplicateKeyError("duplicate key")
+        self.entries[document["_id"]] = dict(document)
+
+    async def find_one_and_update(self, query, update):
+        entry = self.entries.get(query["_id"])
+        if entry is None or entry.get("sent", True) != query["sent"] or entry["claimed_at"] >= query["claimed_at"]["$lt"]:
+            return None
+        entry.update(update["$set"])
+        return entry
+
+    async def find_one(self, query, projection=None):
+        return self.entries.get(query["_id"])
+
+    async def update_one(self, query, update):
+        if self.fail_updates:
+            self.fail_updates -= 1
+            raise RuntimeError("write failed")
+        self.entries[query["_id"]].update(update["$set"])
+
+    async def delete_one(self, query):
+        entry = self.entries.get(query["_id"])
+        if entry is not None and entry.get("sent") is not True:
+            del self.entries[query["_id"]]
+
+def ledger(monkeypatch) -> FakeLedger:
+    collection = FakeLedger()
+    monkeypatch.setattr(idempotency_service.MongoDB, "get_collection", lambda name: collection)
+    return collection
+
+def test_claim_outcomes(monkeypatch):
+    collection = ledger(monkeypatch)
+    service = IdempotencyService()
+    key = service.message_key("c1", " A@Example.com")
+    assert key == service.message_key("c1", "a@example.com")
+
+    async def run():
+        assert await service.claim(key, "c1") == LEDGER_CLAIMED
+        assert await service.claim(key, "c1") == LEDGER_IN_FLIGHT
+        # A worker that died before sending loses its claim once the lease runs out
+        collection.entries[key]["claimed_at"] = datetime.utcnow() - timedelta(hours=1)
+        assert await service.claim(key, "c1") == LEDGER_CLAIMED
+        await service.mark_sent(key, "ses-1")
+        assert await service.claim(key, "c1") == LEDGER_SENT
+        # Sent entries are never released
+        await service.release(key)
+        assert collection.entries[key]["message_id"] == "ses-1"
+    asyncio.run(run())
+
+def test_released_claim_can_be_claimed_again(monkeypatch):
+    ledger(monkeypatch)
+    service = IdempotencyService()
+
+    async def run():
+        assert await service.claim("k", "c1") == LEDGER_CLAIMED
+        await service.release("k")
+        assert await service.claim("k", "c1") == LEDGER_CLAIMED
+    asyncio.run(run())
+
+def test_mark_sent_retries_transient_failures(monkeypatch):
+    collection = ledger(monkeypatch)
+    service = IdempotencyService()
+
+    async def run():
+        await service.claim("k", "c1")
+        collection.fail_updates = 2
+        assert await service.mark_sent("k", "ses-1")
+        collection.fail_updates = 3
+        await service.claim("k2", "c1")
+        assert not await service.mark_sent("k2", "ses-2")
+    asyncio.run(run())
+    assert collection.entries["k"]["sent"] is True
+    assert collection.entries["k2"]["sent"] is False
+
+def bulk_send(monkeypatch, send_email, emails, sent=()):
+    """Run send_bulk_emails for one campaign without SES, on a fast scheduler."""
+    collection = ledger(monkeypatch)
+    for address in sent:
+        key = IdempotencyService.message_key("c1", address)
+        collection.entries[key] = {"_id": key, "sent": True, "claimed_at": datetime.utcnow()}
+    scheduler = SendScheduler(max_send_rate=1000)
+    monkeypatch.setattr(ses_manager, "send_scheduler", scheduler)
+    manager = SESManager.__new__(SESManager)
+
+    async def get_send_quota():
+        return {"success": False}
+
+    monkeypatch.setattr(manager, "get_send_quota", get_send_quota)
+    monkeypatch.setattr(manager, "send_email", send_email)
+    results = asyncio.run(manager.send_bulk_emails(emails, "from@example.com", user_id="u1", campaign_id="c1"))
+    return results, collection, scheduler
+
+def emails(*addresses):
+    return [{"email": address, "subject": "Hi", "body": "Hello", "row_index": i} for i, address in enumerate(addresses)]
+
+def test_send_that_raises_releases_its_claim(monkeypatch):
+    async def send_email(to_email, **kwargs):
+        if to_email.startswith("boom"):
+            raise RuntimeError("connection reset")
+        return {"success": True, "message_id": f"ses-{to_email}"}
+
+    results, collection, _ = bulk_send(monkeypatch, send_email, emails("ok@a.example", "boom@b.example"))
+    assert results["successful"] == 1
+    key = IdempotencyService.message_key("c1", "ok@a.example")
+    assert list(collection.entries) == [key]
+    assert collection.entries[key]["sent"] is True
+
+def test_duplicates_do_not_take_scheduler_slots(monkeypatch):
+    async def send_email(to_email, **kwargs):
+        return {"success": True, "message_id": "ses-1"}
+
+    results, _, scheduler = bulk_send(
+        monkeypatch, send_email, emails("old@a.example", "new@b.example"), sent=["old@a.example"]
+    )
+    assert results["duplicates"] == 1 and results["successful"] == 1
+    assert scheduler.get_stats("u1")["dispatched"] == 1
+    # The duplicate's announced slot is handed back when the run ends
+    assert scheduler.get_stats("u1")["queue_depth"] == 0
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for weighted fair queuing of SES send slots across tenants.
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.send_scheduler import SendScheduler
+
+def grant_order(scheduler: SendScheduler, requests) -> list:
+    """Tenant ids in the order their slots were granted; ``requests`` is (tenant, weight, count)."""
+    order = []
+
+    async def request(tenant_id, weight):
+        await scheduler.acquire(tenant_id, weight)
+        order.append(tenant_id)
+
+    async def run():
+        await asyncio.gather(*[
+            request(tenant_id, weight)
+            for tenant_id, weight, count in requests
+            for _ in range(count)
+        ])
+        scheduler._dispatcher.cancel()
+    asyncio.run(run())
+    return order
+
+def test_backlogged_tenants_share_slots_by_weight():
+    order = grant_order(SendScheduler(max_send_rate=1000), [("pro", 2.0, 6), ("free", 1.0, 3)])
+    assert order == ["pro", "pro", "free", "pro", "pro", "free", "pro", "pro", "free"]
+
+def test_equal_weights_alternate():
+    order = grant_order(SendScheduler(max_send_rate=1000), [("a", 1.0, 3), ("b", 1.0, 3)])
+    assert order == ["a", "b", "a", "b", "a", "b"]
+
+def test_backlog_accounting():
+    scheduler = SendScheduler(max_send_rate=1000)
+    scheduler.register("a", 5)
+    scheduler.register("b", 2, weight=2.0)
+    grant_order(scheduler, [("a", 1.0, 2), ("b", 2.0, 2)])
+
+    stats = scheduler.get_stats()["tenants"]
+    assert stats["a"]["queue_depth"] == 3 and stats["a"]["dispatched"] == 2
+    assert stats["b"]["queue_depth"] == 0 and stats["b"]["weight"] == 2.0
+
+    # Slots that will never be requested are handed back, never below zero
+    scheduler.unregister("a", 3)
+    scheduler.unregister("b", 1)
+    scheduler.unregister("unknown", 1)
+    assert scheduler.get_stats("a")["queue_depth"] == 0
+    assert scheduler.get_stats("b")["queue_depth"] == 0
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for local-time send windows and the bucketed dispatcher.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.send_window import WindowedDispatcher, next_window_start, resolve_timezone, window_release_times
+
+def test_resolve_timezone():
+    assert resolve_timezone("Europe/Berlin") == ZoneInfo("Europe/Berlin")
+    assert resolve_timezone("+05:30") == timezone(timedelta(hours=5, minutes=30))
+    assert resolve_timezone("GMT-8") == timezone(timedelta(hours=-8))
+    assert resolve_timezone("utc+0200") == timezone(timedelta(hours=2))
+    fallback = timezone(timedelta(hours=1))
+    assert resolve_timezone("Not/AZone", fallback) is fallback
+    assert resolve_timezone(" ", fallback) is fallback
+
+def test_next_window_start():
+    now = datetime(2024, 7, 1, 12, 30)
+    # 09:00 in New York (UTC-4 in summer) is still ahead today
+    assert next_window_start(ZoneInfo("America/New_York"), 9, now) == datetime(2024, 7, 1, 13, 0)
+    # Already 14:30 in Berlin, so tomorrow's 09:00
+    assert next_window_start(ZoneInfo("Europe/Berlin"), 9, now) == datetime(2024, 7, 2, 7, 0)
+    # Inside the window hour right now: released immediately
+    assert next_window_start(timezone.utc, 12, now) == now
+
+def test_release_times_are_resolved_per_distinct_value():
+    now = datetime(2024, 7, 1, 12, 30)
+    zones = pd.Series(["+02:00", None, "+02:00", "Asia/Tokyo", "bogus"])
+    release = window_release_times(zones, 9, default_timezone="America/New_York", now=now)
+    assert list(release) == [
+        datetime(2024, 7, 2, 7, 0),
+        datetime(2024, 7, 1, 13, 0),
+        datetime(2024, 7, 2, 7, 0),
+        datetime(2024, 7, 2, 0, 0),
+        datetime(2024, 7, 1, 13, 0)
+    ]
+
+def test_dispatcher_releases_buckets_in_time_order():
+    now = datetime.utcnow()
+    release = pd.Series([now - timedelta(minutes=1), now - timedelta(minutes=5), now - timedelta(minutes=1)])
+    emails = [{"email": f"user{i}@example.com", "row_index": i} for i in range(3)]
+    dispatcher = WindowedDispatcher(emails, release)
+    assert dispatcher.bucket_count == 2
+    assert dispatcher.next_release() == (now - timedelta(minutes=5))
+
+    sent = []
+
+    async def send(batch):
+        sent.append([email["row_index"] for email in batch])
+
+    asyncio.run(dispatcher.run(send))
+    assert sent == [[1], [0, 2]]
+    assert dispatcher.next_release() is None
+
+def test_dispatcher_heartbeats_while_waiting():
+    release = pd.Series([datetime.utcnow() + timedelta(seconds=0.2)])
+    dispatcher = WindowedDispatcher([{"email": "a@example.com", "row_index": 0}], release)
+    beats, sent = [], []
+
+    async def heartbeat():
+        beats.append(datetime.utcnow())
+
+    async def send(batch):
+        sent.extend(batch)
+
+    asyncio.run(dispatcher.run(send, heartbeat=heartbeat, heartbeat_interval=0.05))
+    assert len(beats) >= 2
+    assert len(sent) == 1
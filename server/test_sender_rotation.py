@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-sender rotation and the verified-sender cache.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import sender_service
+from app.services.sender_rotation import SenderRotation
+from app.services.sender_service import SenderService, invalidate_verified_senders
+
+def test_rotation_takes_the_identity_with_most_budget():
+    rotation = SenderRotation(["a@x.example", "b@x.example", "c@x.example"], rate_per_identity=0.001, burst=2)
+
+    async def run():
+        return [await rotation.acquire() for _ in range(6)]
+
+    assert asyncio.run(run()) == ["a@x.example", "b@x.example", "c@x.example"] * 2
+    assert [identity["sent"] for identity in rotation.get_stats()] == [2, 2, 2]
+
+def test_rotation_needs_a_sender():
+    with pytest.raises(ValueError):
+        SenderRotation([])
+
+class FakeSenders:
+    """A senders collection whose verified senders can change between queries."""
+
+    def __init__(self, senders):
+        self.senders = senders
+        self.queries = 0
+
+    def find(self, query):
+        self.queries += 1
+        return self
+
+    def sort(self, keys):
+        return self
+
+    def __aiter__(self):
+        async def rows():
+            for sender in list(self.senders):
+                yield sender
+        return rows()
+
+def test_verified_senders_are_cached_until_invalidated(monkeypatch):
+    monkeypatch.setattr(sender_service, "_verified_senders_cache", {})
+    collection = FakeSenders([{"_id": "s1", "email": "a@x.example", "verification_status": "verified"}])
+    service = SenderService.__new__(SenderService)
+    service.collection = collection
+
+    async def emails():
+        return [sender["email"] for sender in await service.get_verified_senders("u1")]
+
+    assert asyncio.run(emails()) == ["a@x.example"]
+    collection.senders.append({"_id": "s2", "email": "b@x.example", "verification_status": "verified"})
+    assert asyncio.run(emails()) == ["a@x.example"]
+    assert collection.queries == 1
+    invalidate_verified_senders("u1")
+    assert asyncio.run(emails()) == ["a@x.example", "b@x.example"]
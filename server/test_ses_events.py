@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for the SES feedback webhook and the bulk event ingestor.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import uuid
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.routes import ses_events
+from app.services import ses_event_service
+from app.services.ses_event_service import SESEventIngestor
+from app.services.sns_verifier import sns_message_verifier, string_to_sign
+
+TOKEN = "webhook-secret"
+TOPIC_ARN = "arn:aws:sns:us-east-1:123456789012:ses-feedback"
+CERT_URL = "https://sns.us-east-1.amazonaws.com/SimpleNotificationService-test.pem"
+SIGNING_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+def bounce(message_id: str, email: str, bounce_type: str = "Permanent") -> dict:
+    return {
+        "notificationType": "Bounce",
+        "mail": {"messageId": message_id, "destination": [email]},
+        "bounce": {
+            "bounceType": bounce_type,
+            "bouncedRecipients": [{"emailAddress": email, "diagnosticCode": "550 5.1.1"}]
+        }
+    }
+
+def signed_notification(ses_message: dict, topic_arn: str = TOPIC_ARN) -> dict:
+    message = {
+        "Type": "Notification",
+        "MessageId": str(uuid.uuid4()),
+        "TopicArn": topic_arn,
+        "Message": json.dumps(ses_message),
+        "Timestamp": "2024-01-01T00:00:00.000Z",
+        "SignatureVersion": "2",
+        "SigningCertURL": CERT_URL
+    }
+    signature = SIGNING_KEY.sign(string_to_sign(message), padding.PKCS1v15(), hashes.SHA256())
+    message["Signature"] = base64.b64encode(signature).decode()
+    return message
+
+def webhook(monkeypatch):
+    monkeypatch.setattr(settings, "SES_WEBHOOK_TOKEN", TOKEN)
+    monkeypatch.setattr(settings, "SES_SNS_TOPIC_ARNS", TOPIC_ARN)
+    monkeypatch.setattr(settings, "SES_VERIFY_SNS_SIGNATURES", True)
+    # Trust the local key as if its certificate had been fetched from SNS
+    monkeypatch.setitem(sns_message_verifier._certificates, CERT_URL, SIGNING_KEY.public_key())
+    submitted = []
+    monkeypatch.setattr(ses_events.ses_event_ingestor, "submit", lambda events: submitted.extend(events) or len(events))
+    app = FastAPI()
+    app.include_router(ses_events.router, prefix="/api/ses")
+    return TestClient(app), submitted
+
+def test_queues_signed_notifications(monkeypatch):
+    client, submitted = webhook(monkeypatch)
+    body = [signed_notification(bounce("m-1", "a@example.com")), signed_notification(bounce("m-2", "b@example.com"))]
+    response = client.post(f"/api/ses/events?token={TOKEN}", content=json.dumps(body))
+    assert response.status_code == 202
+    assert response.json() == {"queued": 2}
+    assert [event["message_id"] for event in submitted] == ["m-1", "m-2"]
+    assert all(event["authenticated"] and event["hard_bounce"] for event in submitted)
+
+def test_skips_tampered_and_foreign_topic_messages(monkeypatch):
+    client, submitted = webhook(monkeypatch)
+    tampered = signed_notification(bounce("m-1", "a@example.com"))
+    tampered["Message"] = json.dumps(bounce("m-1", "victim@example.com"))
+    foreign = signed_notification(bounce("m-2", "b@example.com"), topic_arn="arn:aws:sns:us-east-1:999:other")
+    response = client.post(f"/api/ses/events?token={TOKEN}", content=json.dumps([tampered, foreign]))
+    assert response.json() == {"queued": 0}
+    assert submitted == []
+
+def test_rejects_bad_token(monkeypatch):
+    client, _ = webhook(monkeypatch)
+    body = json.dumps(signed_notification(bounce("m-1", "a@example.com")))
+    assert client.post("/api/ses/events?token=wrong", content=body).status_code == 401
+    monkeypatch.setattr(settings, "SES_WEBHOOK_TOKEN", "")
+    assert client.post(f"/api/ses/events?token={TOKEN}", content=body).status_code == 403
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    async def insert_one(self, document):
+        self.documents.append(document)
+
+def failing_ingestor(monkeypatch, failures: int):
+    """An ingestor whose writes fail ``failures`` times before succeeding."""
+    ingestor = SESEventIngestor(flush_size=2, max_attempts=3)
+    calls = {"plan": 0, "apply": 0}
+
+    async def plan(events):
+        calls["plan"] += 1
+        return {"count": len(events)}
+
+    async def apply(plan):
+        calls["apply"] += 1
+        if calls["apply"] <= failures:
+            raise RuntimeError("write failed")
+        return plan["count"]
+
+    dead_letters = FakeCollection()
+    monkeypatch.setattr(ingestor, "_plan", plan)
+    monkeypatch.setattr(ingestor, "_apply", apply)
+    monkeypatch.setattr(ses_event_service.MongoDB, "get_collection", lambda name: dead_letters)
+    ingestor._buffer.extend({"message_id": f"m-{i}", "status": "delivered"} for i in range(3))
+    return ingestor, calls, dead_letters
+
+def flush_until_done(ingestor: SESEventIngestor) -> int:
+    async def run():
+        for _ in range(10):
+            try:
+                return await ingestor.flush()
+            except RuntimeError:
+                continue
+    return asyncio.run(run())
+
+def test_failed_batch_is_retried_with_the_same_plan(monkeypatch):
+    ingestor, calls, dead_letters = failing_ingestor(monkeypatch, failures=2)
+    assert flush_until_done(ingestor) == 3
+    # Planned once per batch, so retried writes reuse the same batch id
+    assert calls["plan"] == 2
+    assert ingestor.get_stats()["buffered"] == 0
+    assert dead_letters.documents == []
+
+def test_batch_failing_every_attempt_is_dead_lettered(monkeypatch):
+    ingestor, _, dead_letters = failing_ingestor(monkeypatch, failures=3)
+    assert flush_until_done(ingestor) == 1
+    assert len(dead_letters.documents) == 1
+    assert [event["message_id"] for event in dead_letters.documents[0]["events"]] == ["m-0", "m-1"]
+    assert dead_letters.documents[0]["attempts"] == 3
+    stats = ingestor.get_stats()
+    assert stats["dead_lettered"] == 2 and stats["applied"] == 1 and stats["buffered"] == 0
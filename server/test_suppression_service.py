@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory suppression sets (exact set and Bloom filter).
+"""
+
+import asyncio
+import os
+import sys
+
+import pandas as pd
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.services.suppression_service import (
+    GLOBAL_SCOPE, BloomFilter, SuppressionService, SuppressionSet, normalize_email
+)
+
+def test_bloom_filter_has_no_false_negatives():
+    members = [f"user{i}@example.com" for i in range(5000)]
+    bloom = BloomFilter(len(members) * 2)
+    bloom.add_many(members)
+    assert bloom.contains_many(members).all()
+
+def test_bloom_filter_false_positive_rate_is_low():
+    bloom = BloomFilter(10000)
+    bloom.add_many(f"user{i}@example.com" for i in range(5000))
+    others = [f"other{i}@example.org" for i in range(20000)]
+    assert bloom.contains_many(others).mean() < 0.01
+
+def test_bloom_filter_single_values():
+    bloom = BloomFilter(10)
+    bloom.add("a@example.com")
+    assert "a@example.com" in bloom
+    assert "b@example.com" not in bloom
+    assert len(bloom.contains_many([])) == 0
+
+def test_suppression_set_switches_to_bloom_above_threshold():
+    threshold = settings.SUPPRESSION_BLOOM_THRESHOLD
+    exact = SuppressionSet("user", ["a@example.com"], 1)
+    assert exact.exact == {"a@example.com"} and exact.bloom is None
+    bloom = SuppressionSet("user", ["a@example.com"], threshold + 1)
+    assert bloom.exact is None and "a@example.com" in bloom.bloom
+
+def test_suppressed_mask_uses_user_and_global_sets():
+    service = SuppressionService()
+    service._cache["user-1"] = SuppressionSet("user-1", ["blocked@example.com"], 1)
+    service._cache[GLOBAL_SCOPE] = SuppressionSet(GLOBAL_SCOPE, ["bounced@example.com"], 1)
+    try:
+        emails = pd.Series([" Blocked@Example.com", "ok@example.com", "bounced@example.com"], index=[10, 11, 12])
+        mask = asyncio.run(service.suppressed_mask(emails, "user-1"))
+        assert mask.tolist() == [True, False, True]
+        assert mask.index.tolist() == [10, 11, 12]
+    finally:
+        service._cache.pop("user-1", None)
+        service._cache.pop(GLOBAL_SCOPE, None)
+
+def test_normalize_email():
+    assert normalize_email("  Someone@Example.COM ") == "someone@example.com"
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests for the signed open/click tracking tokens and link rewriting.
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+# Add the server directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.services import tracking_service
+from app.services.tracking_service import (
+    MAX_TRACKED_LINKS, CampaignLinkMap, TrackingRecorder, make_click_token, make_open_token,
+    read_click_token, read_open_token, render_html_body, tracking_configured
+)
+
+CAMPAIGN_ID = str(ObjectId())
+
+def _tamper(token: str) -> str:
+    return ("B" if token[0] == "A" else "A") + token[1:]
+
+def test_open_token_roundtrip():
+    token = make_open_token(CAMPAIGN_ID, 4_000_000_000)
+    assert read_open_token(token) == (CAMPAIGN_ID, 4_000_000_000)
+
+def test_open_token_is_url_safe():
+    token = make_open_token(CAMPAIGN_ID, 7)
+    assert "=" not in token and "/" not in token and "+" not in token
+
+def test_forged_or_malformed_open_tokens_are_rejected():
+    token = make_open_token(CAMPAIGN_ID, 7)
+    assert read_open_token(_tamper(token)) is None
+    assert read_open_token(token[:-2]) is None
+    assert read_open_token("not a token!") is None
+    assert read_open_token("") is None
+
+def test_open_token_depends_on_secret_key(monkeypatch):
+    token = make_open_token(CAMPAIGN_ID, 7)
+    monkeypatch.setattr(settings, "SECRET_KEY", settings.SECRET_KEY + "-rotated")
+    assert read_open_token(token) is None
+
+def test_tracking_configured(monkeypatch):
+    for url, expected in [
+        ("", False),
+        ("http://localhost:8000", False),
+        ("http://127.0.0.1", False),
+        ("ftp://mail.example.com", False),
+        ("https://mail.example.com", True),
+    ]:
+        monkeypatch.setattr(settings, "TRACKING_BASE_URL", url)
+        assert tracking_configured() is expected, url
+
+def test_open_pixel_only_when_tracking_opens(monkeypatch):
+    monkeypatch.setattr(settings, "TRACKING_BASE_URL", "https://mail.example.com")
+    tracked = render_html_body("Hi <there>", CAMPAIGN_ID, 3, track_opens=True)
+    untracked = render_html_body("Hi <there>", CAMPAIGN_ID, 3, track_opens=False)
+    assert f"https://mail.example.com/api/t/o/{make_open_token(CAMPAIGN_ID, 3)}.gif" in tracked
+    assert "<img" not in untracked
+    assert "Hi &lt;there&gt;" in untracked
+
+def test_click_token_roundtrip():
+    token = make_click_token(CAMPAIGN_ID, 12345, 999)
+    assert read_click_token(token) == (CAMPAIGN_ID, 12345, 999)
+
+def test_open_and_click_tokens_are_not_interchangeable():
+    assert read_click_token(make_open_token(CAMPAIGN_ID, 1)) is None
+    assert read_open_token(make_click_token(CAMPAIGN_ID, 1, 0)) is None
+    assert read_click_token(_tamper(make_click_token(CAMPAIGN_ID, 1, 0))) is None
+
+def test_link_map_indexes_distinct_urls_up_to_the_cap():
+    link_map = CampaignLinkMap(["https://a.example.com"])
+    assert link_map.index_for("https://b.example.com") == 1
+    assert link_map.index_for("https://a.example.com") == 0
+    for i in range(MAX_TRACKED_LINKS):
+        link_map.index_for(f"https://example.com/{i}")
+    assert len(link_map.urls) == MAX_TRACKED_LINKS
+    assert link_map.index_for("https://one-too-many.example.com") is None
+
+def test_links_are_rewritten_to_click_redirects(monkeypatch):
+    monkeypatch.setattr(settings, "TRACKING_BASE_URL", "https://mail.example.com")
+    link_map = CampaignLinkMap()
+    html = render_html_body("See https://example.com/offer.", CAMPAIGN_ID, 5, track_opens=False, link_map=link_map)
+    assert link_map.urls == ["https://example.com/offer"]
+    token = make_click_token(CAMPAIGN_ID, 5, 0)
+    assert f'<a href="https://mail.example.com/api/t/c/{token}">https://example.com/offer</a>.' in html
+
+class FakeBulkCollection:
+    """bulk_write over UpdateOne upserts, failing the next ``fail`` calls."""
+
+    def __init__(self, fail: int = 0, error=None):
+        self.documents = {}
+        self.fail = fail
+        self.error = error
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.fail:
+            self.fail -= 1
+            raise self.error or RuntimeError("write failed")
+        upserted = {}
+        for position, request in enumerate(requests):
+            query, update = request._filter, request._doc
+            document = self.documents.get(query["_id"])
+            if document is None:
+                document = self.documents[query["_id"]] = dict(update.get("$setOnInsert", {}))
+                if request._upsert:
+                    upserted[position] = query["_id"]
+            for field, count in update.get("$inc", {}).items():
+                document[field] = document.get(field, 0) + count
+        return SimpleNamespace(upserted_ids=upserted)
+
+def recorder_with(monkeypatch, **collections):
+    collections = {name: collections.get(name) or FakeBulkCollection()
+                   for name in ("tracking_opens", "tracking_clicks", "campaigns")}
+    monkeypatch.setattr(tracking_service.MongoDB, "get_collection", lambda name: collections[name])
+    return TrackingRecorder(), collections
+
+def record_events(recorder: TrackingRecorder) -> None:
+    recorder._ensure_flusher = lambda: None
+    recorder.record_open(CAMPAIGN_ID, 1)
+    recorder.record_open(CAMPAIGN_ID, 1)
+    recorder.record_click(CAMPAIGN_ID, 1, 0)
+
+def campaign(collections) -> dict:
+    return collections["campaigns"].documents[ObjectId(CAMPAIGN_ID)]
+
+def test_flush_writes_counters_and_unique_recipients(monkeypatch):
+    recorder, collections = recorder_with(monkeypatch)
+    record_events(recorder)
+    asyncio.run(recorder.flush())
+    counters = campaign(collections)
+    assert (counters["opens"], counters["unique_opens"], counters["clicks"], counters["unique_clicks"]) == (2, 1, 1, 1)
+    assert counters["link_clicks.0"] == 1
+
+def test_failed_campaign_write_keeps_events_for_the_next_flush(monkeypatch):
+    recorder, collections = recorder_with(monkeypatch, campaigns=FakeBulkCollection(fail=1))
+    record_events(recorder)
+    with pytest.raises(RuntimeError):
+        asyncio.run(recorder.flush())
+    recorder.record_open(CAMPAIGN_ID, 2)
+    asyncio.run(recorder.flush())
+    counters = campaign(collections)
+    # Markers written by the failed flush still count as unique exactly once
+    assert (counters["opens"], counters["unique_opens"], counters["clicks"], counters["unique_clicks"]) == (3, 2, 1, 1)
+
+def test_failed_marker_write_is_retried(monkeypatch):
+    recorder, collections = recorder_with(monkeypatch, tracking_clicks=FakeBulkCollection(fail=1))
+    record_events(recorder)
+    with pytest.raises(RuntimeError):
+        asyncio.run(recorder.flush())
+    asyncio.run(recorder.flush())
+    counters = campaign(collections)
+    assert (counters["opens"], counters["unique_opens"], counters["clicks"], counters["unique_clicks"]) == (2, 1, 1, 1)
+    assert f"{CAMPAIGN_ID}:1" in collections["tracking_clicks"].documents
+
+def test_markers_inserted_by_another_process_are_not_unique(monkeypatch):
+    race = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}], "upserted": []})
+    recorder, collections = recorder_with(monkeypatch, tracking_opens=FakeBulkCollection(fail=1, error=race))
+    record_events(recorder)
+    asyncio.run(recorder.flush())
+    counters = campaign(collections)
+    assert counters["opens"] == 2 and "unique_opens" not in counters
+    assert counters["unique_clicks"] == 1